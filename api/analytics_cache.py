@@ -0,0 +1,68 @@
+import threading
+import time
+
+from api.metrics import cache_event
+
+
+class AnalyticsCache:
+    # Materialized analytic results for one dataset version. Each analytic is
+    # computed at most once per version and served from memory afterwards; a
+    # new version drops everything computed for the old one.
+    def __init__(self, analytics):
+        self.analytics = dict(analytics)
+        self.version = None
+        self.results = {}
+        self.computed_at = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.name_locks = {name: threading.Lock() for name in self.analytics}
+
+    def _switch_version(self, version):
+        if version != self.version:
+            self.version = version
+            self.results = {}
+            self.computed_at = {}
+
+    def get(self, name, df, version):
+        if name not in self.analytics:
+            raise KeyError(f"Unknown analytic '{name}'")
+        with self.lock:
+            self._switch_version(version)
+            if name in self.results:
+                self.hits += 1
+                cache_event("analytics", True)
+                return self.results[name]
+        with self.name_locks[name]:
+            with self.lock:
+                if self.version == version and name in self.results:
+                    self.hits += 1
+                    cache_event("analytics", True)
+                    return self.results[name]
+                self.misses += 1
+            cache_event("analytics", False)
+            result = self.analytics[name](df)
+            with self.lock:
+                if self.version == version:
+                    self.results[name] = result
+                    self.computed_at[name] = time.time()
+            return result
+
+    def refresh(self, df, version):
+        for name in self.analytics:
+            self.get(name, df, version)
+
+    def invalidate(self):
+        with self.lock:
+            self.version = None
+            self.results = {}
+            self.computed_at = {}
+
+    def stats(self):
+        with self.lock:
+            return {
+                "version": self.version,
+                "materialized": sorted(self.results),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from api.inverted_index import keyword_mask
+
+
+def post_days(df):
+    # Calendar day of every post as datetime64[D]; NaT where the time is missing.
+    return df["datetime"].to_numpy().astype("datetime64[D]")
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).date(), "D")
+
+
+def select_rows(df, days=None, subreddits=None, authors=None, start=None, end=None, keyword=None, index=None):
+    # Positions of the posts matching every given filter. start and end are
+    # inclusive dates; `days` is post_days(df), needed only for them. With a
+    # keyword index row-aligned with df, the keyword is looked up in its
+    # posting lists instead of scanning the text.
+    mask = np.ones(len(df), dtype=bool)
+    if subreddits:
+        mask &= df["subreddit"].isin(subreddits).to_numpy()
+    if authors:
+        mask &= df["author"].isin(authors).to_numpy()
+    if start is not None:
+        mask &= days >= _day(start)
+    if end is not None:
+        mask &= days <= _day(end)
+    if keyword:
+        mask &= keyword_mask(df, keyword, index)
+    return np.flatnonzero(mask)
+
+
+def label_counts(values, rows, top_n=10):
+    # value_counts().head(top_n).to_dict() of values[rows]. Categorical
+    # columns are counted with a bincount over their codes instead of hashing
+    # strings; ties keep the order of first appearance among the rows.
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.iloc[rows].value_counts().head(top_n).to_dict()
+    codes = values.cat.codes.to_numpy()[rows]
+    codes = codes[codes >= 0]
+    order = pd.unique(codes)
+    counts = np.bincount(codes, minlength=len(values.cat.categories))[order]
+    labels = values.cat.categories
+    return {labels[order[i]]: int(counts[i]) for i in np.argsort(-counts, kind="stable")[:top_n]}
+
+
+def daily_spikes(days):
+    # flashpoint_detection from an array of post days: days with more posts
+    # than the mean plus one standard deviation.
+    days = days[~np.isnat(days)]
+    unique, counts = np.unique(days, return_counts=True)
+    daily = pd.Series(counts, index=unique.astype(object))
+    return daily[daily > daily.mean() + daily.std()].to_dict()
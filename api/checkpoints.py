@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+import time
+
+
+class CheckpointStore:
+    # Per-subreddit ingestion checkpoints: the newest post fullname/timestamp
+    # that has been ingested, plus the resumable cursor of an older-page backfill.
+    # A gap is a stretch of /new that a poll stopped reading because it hit its
+    # limit before the previous newest post: reading resumes after `cursor`
+    # and the gap is closed once the listing reaches `until_fullname`.
+    def __init__(self, db_path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "subreddit TEXT PRIMARY KEY, newest_fullname TEXT, newest_utc REAL, "
+            "backfill_cursor TEXT, backfill_done INTEGER DEFAULT 0, updated_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS gaps ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, subreddit TEXT, cursor TEXT, cursor_utc REAL, "
+            "until_fullname TEXT, until_utc REAL)"
+        )
+        self.conn.commit()
+
+    def get(self, subreddit):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT subreddit, newest_fullname, newest_utc, backfill_cursor, backfill_done, updated_at "
+                "FROM checkpoints WHERE subreddit = ?",
+                (subreddit.lower(),),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "subreddit": row[0],
+            "newest_fullname": row[1],
+            "newest_utc": row[2],
+            "backfill_cursor": row[3],
+            "backfill_done": bool(row[4]),
+            "updated_at": row[5],
+            "gaps": self.gaps(subreddit),
+        }
+
+    def all(self):
+        with self.lock:
+            names = [r[0] for r in self.conn.execute("SELECT subreddit FROM checkpoints ORDER BY subreddit")]
+        return [self.get(name) for name in names]
+
+    def _upsert(self, subreddit, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in fields)
+        with self.lock:
+            self.conn.execute(
+                f"INSERT INTO checkpoints (subreddit, {columns}) VALUES (?, {placeholders}) "
+                f"ON CONFLICT(subreddit) DO UPDATE SET {updates}",
+                (subreddit.lower(), *fields.values()),
+            )
+            self.conn.commit()
+
+    def advance_newest(self, subreddit, fullname, created_utc):
+        current = self.get(subreddit)
+        if current and current["newest_utc"] is not None and current["newest_utc"] > created_utc:
+            return
+        self._upsert(subreddit, newest_fullname=fullname, newest_utc=created_utc)
+
+    def set_backfill_cursor(self, subreddit, cursor, done=False):
+        self._upsert(subreddit, backfill_cursor=cursor, backfill_done=int(done))
+
+    def reset_backfill(self, subreddit):
+        self._upsert(subreddit, backfill_cursor=None, backfill_done=0)
+
+    def gaps(self, subreddit):
+        # Newest gap first.
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, cursor, cursor_utc, until_fullname, until_utc FROM gaps "
+                "WHERE subreddit = ? ORDER BY cursor_utc DESC",
+                (subreddit.lower(),),
+            ).fetchall()
+        return [
+            {"id": r[0], "cursor": r[1], "cursor_utc": r[2], "until_fullname": r[3], "until_utc": r[4]}
+            for r in rows
+        ]
+
+    def add_gap(self, subreddit, cursor, cursor_utc, until_fullname, until_utc):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO gaps (subreddit, cursor, cursor_utc, until_fullname, until_utc) VALUES (?, ?, ?, ?, ?)",
+                (subreddit.lower(), cursor, cursor_utc, until_fullname, until_utc),
+            )
+            self.conn.commit()
+
+    def move_gap(self, gap_id, cursor, cursor_utc):
+        with self.lock:
+            self.conn.execute("UPDATE gaps SET cursor = ?, cursor_utc = ? WHERE id = ?", (cursor, cursor_utc, gap_id))
+            self.conn.commit()
+
+    def close_gap(self, gap_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM gaps WHERE id = ?", (gap_id,))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
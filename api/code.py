@@ -1,19 +1,40 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import asynccontextmanager
+import asyncio
+import contextvars
 import json
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
-from langchain.schema import Document
-from sklearn.feature_extraction.text import TfidfVectorizer
 import re
+import threading
+import time
+from api.seen_index import SeenIndex
+from api.rate_limit import TokenBucket
+from api.checkpoints import CheckpointStore
+from api.analytics_cache import AnalyticsCache
+from api.metrics import MetricsMiddleware, registry, stage, timed
+
+# pandas, scikit-learn, langchain, google.generativeai and praw are imported
+# where they are first needed, and the clients and dataset are built lazily or
+# by the background warm-up, so the app can start serving immediately.
 
 load_dotenv()
 
-app = FastAPI()
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+readiness = {"dataset": False, "analytics": False, "error": None, "started_at": time.time(), "ready_at": None}
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=warm_up, daemon=True).start()
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,90 +44,403 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-import praw
-reddit = praw.Reddit(
-    client_id=os.getenv("REDDIT_CLIENT_ID", "9DliHvg8Kd9i7WXLpBNrQQ"),
-    client_secret=os.getenv("REDDIT_CLIENT_SECRET", "kNIr1Vby84IsUTz-PfIkQMSm1ASmKg"),
-    user_agent="script:Webscrap:v1.0 (by u/AnyEnvironment3975)"
-)
+# Request latency for /metrics, and a Server-Timing stage breakdown for
+# requests sent with "X-Profile: 1".
+app.add_middleware(MetricsMiddleware)
+
+reddit = None
+client_lock = threading.Lock()
+
+def get_reddit():
+    global reddit
+    if reddit is None:
+        with client_lock:
+            if reddit is None:
+                import praw
+                reddit = praw.Reddit(
+                    client_id=os.getenv("REDDIT_CLIENT_ID", "9DliHvg8Kd9i7WXLpBNrQQ"),
+                    client_secret=os.getenv("REDDIT_CLIENT_SECRET", "kNIr1Vby84IsUTz-PfIkQMSm1ASmKg"),
+                    user_agent="script:Webscrap:v1.0 (by u/AnyEnvironment3975)"
+                )
+    return reddit
 
 OUTPUT_FILE = "new_reddit_posts.jsonl"
+SEEN_INDEX_FILE = "new_reddit_posts.db"
+
+seen_index = None
+checkpoints = None
+archive_lock = threading.Lock()
+
+def get_seen_index():
+    global seen_index
+    if seen_index is None:
+        with client_lock:
+            if seen_index is None:
+                seen_index = SeenIndex(SEEN_INDEX_FILE, OUTPUT_FILE)
+    return seen_index
+
+def get_checkpoints():
+    global checkpoints
+    if checkpoints is None:
+        with client_lock:
+            if checkpoints is None:
+                checkpoints = CheckpointStore(SEEN_INDEX_FILE)
+    return checkpoints
+
+# Reddit's OAuth quota is 100 requests per minute; every listing page costs one token.
+REDDIT_REQUESTS_PER_MINUTE = float(os.getenv("REDDIT_REQUESTS_PER_MINUTE", "100"))
+REDDIT_PAGE_SIZE = 100
+rate_limiter = TokenBucket(REDDIT_REQUESTS_PER_MINUTE / 60, capacity=max(1, int(REDDIT_REQUESTS_PER_MINUTE // 6)))
 
 class SubredditRequest(BaseModel):
     subreddits: List[str]
     limit: int = 10
+    concurrent: bool = False
+    max_workers: int = 8
+    mode: str = "new"
+
+FETCH_MODES = ("new", "backfill")
 
 class QueryRequest(BaseModel):
     query: str
 
-def fetch_reddit_posts(subreddit_name: str, limit: int = 10):
-    subreddit = reddit.subreddit(subreddit_name)
-    seen_ids = set()
+class AnalyticsBatchRequest(BaseModel):
+    analytics: List[str] = []
+    subreddits: List[str] = []
+    authors: List[str] = []
+    start: str = None
+    end: str = None
+    keyword: str = None
 
-    if os.path.exists(OUTPUT_FILE):
-        with open(OUTPUT_FILE, "r") as f:
-            for line in f:
-                try:
-                    post = json.loads(line.strip())
-                    seen_ids.add(post.get("id"))
-                except json.JSONDecodeError:
-                    continue
+class ChartSpec(BaseModel):
+    plot_type: str
+    params: dict = {}
+
+class ChartsRequest(BaseModel):
+    charts: List[ChartSpec]
+    format: str = "png"
+
+def _rate_limited(listing, limit):
+    # PRAW pulls listings lazily, one request per page, so a token is taken
+    # right before each page boundary is crossed.
+    iterator = iter(listing)
+    count = 0
+    while count < limit:
+        if count % REDDIT_PAGE_SIZE == 0:
+            with stage("reddit.rate_limit_wait"):
+                rate_limiter.acquire()
+        try:
+            post = next(iterator)
+        except StopIteration:
+            return
+        count += 1
+        yield post
+
+def _post_record(post):
+    return {
+        "id": post.id,
+        "subreddit": post.subreddit.display_name,
+        "author": str(post.author),
+        "title": post.title,
+        "date": int(post.created_utc * 1000),
+        "score": post.score,
+        "ups": post.ups,
+        "downs": post.downs,
+        "num_comments": post.num_comments,
+        "url": post.url,
+        "permalink": post.permalink,
+        "word_count": len(post.title.split()) + len(post.selftext.split()),
+    }
 
+def _append_new_posts(fetched):
     posts = []
-    with open(OUTPUT_FILE, "a") as outfile:
-        for post in subreddit.new(limit=limit):
-            if post.id not in seen_ids:
-                post_data = {
-                    "id": post.id,
-                    "subreddit": post.subreddit.display_name,
-                    "author": str(post.author),
-                    "title": post.title,
-                    "date": int(post.created_utc * 1000),
-                    "score": post.score,
-                    "ups": post.ups,
-                    "downs": post.downs,
-                    "num_comments": post.num_comments,
-                    "url": post.url,
-                    "permalink": post.permalink,
-                    "word_count": len(post.title.split()) + len(post.selftext.split()),
-                }
-                outfile.write(json.dumps(post_data) + "\n")
-                posts.append(post_data) 
-    return posts  
+    seen_index = get_seen_index()
+    with archive_lock:
+        new_ids = set(seen_index.filter_new([post.id for post in fetched]))
+        with open(OUTPUT_FILE, "a") as outfile:
+            for post in fetched:
+                if post.id in new_ids:
+                    new_ids.discard(post.id)
+                    post_data = _post_record(post)
+                    outfile.write(json.dumps(post_data) + "\n")
+                    posts.append(post_data)
+            outfile.flush()
+            seen_index.add_many([post["id"] for post in posts], outfile.tell())
+            if posts and vector_index is not None:
+                import pandas as pd
+                with stage("vector_index.add", len(posts)):
+                    vector_index.add(pd.DataFrame(posts))
+                vector_index.extra["archive_offset"] = outfile.tell()
+                _persist_vector_index(vector_index)
+    return posts
+
+def _read_until(listing, limit, until_fullname, until_utc, seen_index):
+    # Reads a newest-first listing down to the first already-ingested post.
+    # Returns the posts before it and whether it was reached (or the listing
+    # ran out) within `limit` posts.
+    fetched = []
+    for post in _rate_limited(listing, limit):
+        if until_fullname is not None and (post.name == until_fullname or post.created_utc < until_utc):
+            return fetched, True
+        if post.id in seen_index:
+            return fetched, True
+        fetched.append(post)
+    return fetched, len(fetched) < limit
+
+def _fill_gaps(subreddit, checkpoints, seen_index, limit, updates):
+    # Works through the subreddit's gaps, newest first, reading at most
+    # `limit` posts in all. Gap changes are queued on `updates`, to be applied
+    # once the posts are stored.
+    fetched = []
+    for gap in checkpoints.gaps(subreddit.display_name):
+        budget = limit - len(fetched)
+        if budget <= 0:
+            break
+        listing = subreddit.new(limit=budget, params={"after": gap["cursor"]})
+        posts, closed = _read_until(listing, budget, gap["until_fullname"], gap["until_utc"], seen_index)
+        fetched.extend(posts)
+        if closed:
+            updates.append(lambda gap=gap: checkpoints.close_gap(gap["id"]))
+        else:
+            last = posts[-1]
+            updates.append(lambda gap=gap, last=last: checkpoints.move_gap(gap["id"], last.name, last.created_utc))
+    return fetched
+
+def fetch_reddit_posts(subreddit_name: str, limit: int = 10, mode: str = "new"):
+    subreddit = get_reddit().subreddit(subreddit_name)
+    checkpoints = get_checkpoints()
+    seen_index = get_seen_index()
+    checkpoint = checkpoints.get(subreddit_name)
+    fetched = []
+    # Checkpoint changes, applied only after the fetched posts are stored.
+    updates = []
+
+    if mode == "backfill":
+        # Gaps left by polls that hit their limit come before older pages.
+        with stage("reddit.listing") as listing:
+            fetched = _fill_gaps(subreddit, checkpoints, seen_index, limit, updates)
+            listing.rows = len(fetched)
+        budget = limit - len(fetched)
+        if budget > 0 and not (checkpoint and checkpoint["backfill_done"]):
+            cursor = checkpoint["backfill_cursor"] if checkpoint else None
+            params = {"after": cursor} if cursor else {}
+            with stage("reddit.listing") as listing:
+                older = list(_rate_limited(subreddit.new(limit=budget, params=params), budget))
+                listing.rows = len(older)
+            next_cursor = older[-1].name if older else cursor
+            updates.append(lambda: checkpoints.set_backfill_cursor(subreddit_name, next_cursor, done=len(older) < budget))
+            fetched.extend(older)
+    else:
+        # /new is newest first, so the first already-ingested post marks the
+        # point past which everything older has been stored before. When the
+        # limit runs out first, the rest down to that post is kept as a gap.
+        until_fullname = checkpoint["newest_fullname"] if checkpoint else None
+        until_utc = checkpoint["newest_utc"] if checkpoint else None
+        with stage("reddit.listing") as listing:
+            fetched, complete = _read_until(subreddit.new(limit=limit), limit, until_fullname, until_utc, seen_index)
+            listing.rows = len(fetched)
+        if fetched and not complete and until_fullname is not None:
+            last = fetched[-1]
+            updates.append(lambda: checkpoints.add_gap(subreddit_name, last.name, last.created_utc, until_fullname, until_utc))
+        if fetched:
+            newest = fetched[0]
+            updates.append(lambda: checkpoints.advance_newest(subreddit_name, newest.name, newest.created_utc))
+            if checkpoint is None or (checkpoint["backfill_cursor"] is None and not checkpoint["backfill_done"]):
+                # Backfill starts below the posts this first poll stored
+                # rather than walking through them again from the top.
+                oldest = fetched[-1].name
+                updates.append(lambda: checkpoints.set_backfill_cursor(subreddit_name, oldest))
+        if len(fetched) < limit:
+            with stage("reddit.listing") as listing:
+                gap_posts = _fill_gaps(subreddit, checkpoints, seen_index, limit - len(fetched), updates)
+                listing.rows = len(gap_posts)
+            fetched.extend(gap_posts)
+
+    with stage("posts.append") as append:
+        posts = _append_new_posts(fetched)
+        append.rows = len(posts)
+    for update in updates:
+        update()
+    if fetched and mode == "backfill" and (checkpoint is None or checkpoint["newest_utc"] is None):
+        checkpoints.advance_newest(subreddit_name, fetched[0].name, fetched[0].created_utc)
+    return posts
+
+def _fetch_or_error(subreddit, limit, mode="new"):
+    try:
+        return subreddit, fetch_reddit_posts(subreddit, limit=limit, mode=mode), None
+    except Exception as e:
+        print(f"Error fetching r/{subreddit}: {e}")
+        return subreddit, [], str(e)
 
 @app.post("/posts")
 def get_posts(req: SubredditRequest):
     subreddits = req.subreddits
+    if req.mode not in FETCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(FETCH_MODES)}")
+    if req.concurrent and len(subreddits) > 1:
+        workers = max(1, min(req.max_workers, len(subreddits)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Each fetch runs in a copy of the request's context so its stages
+            # land in the request's profile.
+            futures = [pool.submit(contextvars.copy_context().run, _fetch_or_error, s, req.limit, req.mode)
+                       for s in subreddits]
+            results = [future.result() for future in futures]
+    else:
+        results = [_fetch_or_error(subreddit, req.limit, req.mode) for subreddit in subreddits]
+
     all_posts = []
-    for subreddit in subreddits:
-        subreddit_posts = fetch_reddit_posts(subreddit, limit=req.limit)
-        all_posts.extend(subreddit_posts)  
+    errors = {}
+    for subreddit, subreddit_posts, error in results:
+        all_posts.extend(subreddit_posts)
+        if error is not None:
+            errors[subreddit] = error
+
+    return {"posts": all_posts, "errors": errors}
 
-    return {"posts": all_posts}
+@app.get("/search")
+def search_posts(q: str, k: int = 5, exact: bool = False):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="q must not be empty")
+    if not 1 <= k <= 100:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+    posts = retrieve_posts(q, k, exact)
+    return {"query": q, "results": [{**post.metadata, "text": post.page_content} for post in posts],
+            "index": vector_index.stats()}
 
-with open("data.jsonl", "r") as f:
-    data = [json.loads(line) for line in f]
+@app.get("/checkpoints")
+def list_checkpoints():
+    return {"checkpoints": get_checkpoints().all()}
 
-df = pd.DataFrame(data)
+DATA_FILE = "data.jsonl"
+ARROW_FILE = "data.arrow"
+DATASET_CHECK_INTERVAL = float(os.getenv("DATASET_CHECK_INTERVAL", "5"))
 
 def preprocess(df):
+    # The frame keeps only the columns the analytics read, with labels as
+    # categoricals and downcast numbers (api/preprocessing.py compact_posts).
+    import pandas as pd
+    from api.preprocessing import add_derived_columns, compact_posts
     try:
-        df = df.copy()
-        df["datetime"] = pd.to_datetime(df["created_utc"], unit='s')
-        df["text"] = df["title"].fillna("") + " " + df["selftext"].fillna("")
-        df["word_count"] = df["text"].apply(lambda x: len(str(x).split()))
-        df["domain"] = df["url"].apply(lambda x: x.split('/')[2] if pd.notna(x) and "http" in x else None)
-        return df
+        with stage("dataset.preprocess", len(df)):
+            df = df.copy()
+            return compact_posts(add_derived_columns(df))
     except Exception as e:
         print(f"Error preprocessing data: {e}")
         return pd.DataFrame()
 
-df = preprocess(df)
+def dataset_signature(path=DATA_FILE):
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def dataset_head(path=DATA_FILE, size=4096):
+    with open(path, "rb") as f:
+        return f.read(size)
+
+def read_records(path=DATA_FILE, offset=0):
+    # Parsed like the Arrow converter: a partially written last line is picked
+    # up on the next check, lines that are not JSON objects are skipped.
+    from api.columnar import iter_lines
+    records, skipped = [], 0
+    for record, offset in iter_lines(path, offset):
+        if record is None:
+            skipped += 1
+        else:
+            records.append(record)
+    if skipped:
+        print(f"Error reading {path}: skipped {skipped} malformed lines")
+    return records, offset
+
+def load_dataset(path=DATA_FILE):
+    import pandas as pd
+    from api.columnar import arrow_metadata, is_fresh, open_table
+    from api.preprocessing import append_posts, compact_from_arrow
+    # A fresh data.arrow (python -m api.columnar data.jsonl) is memory-mapped
+    # instead of parsing the JSONL and converted column by column into the
+    # compact frame; only lines appended after it are parsed.
+    if is_fresh(ARROW_FILE, path):
+        frame = compact_from_arrow(open_table(ARROW_FILE))
+        records, offset = read_records(path, arrow_metadata(ARROW_FILE)["source_size"])
+        if records:
+            frame = append_posts(frame, preprocess(pd.DataFrame(records)))
+        return frame, offset
+    records, offset = read_records(path)
+    return preprocess(pd.DataFrame(records)), offset
+
+FLASHPOINT_METHOD = os.getenv("FLASHPOINT_METHOD", "ewma")
+FLASHPOINT_THRESHOLD = float(os.getenv("FLASHPOINT_THRESHOLD", "3.0"))
+
+def build_flashpoint_detectors(current_df):
+    from api.flashpoints import build_detectors
+    return build_detectors(current_df, method=FLASHPOINT_METHOD, threshold=FLASHPOINT_THRESHOLD)
 
-genai.configure(api_key=os.getenv("YOUR_GEMINI_API_KEY"))
-model = genai.GenerativeModel('gemini-2.0-flash')
+ROLLUP_SENTIMENT = os.getenv("ROLLUP_SENTIMENT", "1") == "1"
+
+def rollup_sentiment(current_df):
+    if not ROLLUP_SENTIMENT:
+        return None
+    from api.sentiment_store import score_posts
+    return score_posts(current_df, get_sentiment_store())
+
+KEYWORD_INDEX = os.getenv("KEYWORD_INDEX", "1") == "1"
+
+def build_topic_model(current_df):
+    from api.term_stats import IncrementalTfidf
+    model = IncrementalTfidf(stop_words="english", max_features=1000)
+    model.add_documents(current_df["text"].fillna("").tolist())
+    return model
+
+df = None
+dataset_version = None
+dataset_offset = 0
+dataset_prefix = b""
+topic_model = None
+flashpoint_detectors = {}
+rollup_cube = None
+keyword_index = None
+# Bumped by every full reload, so work started on an earlier frame can tell
+# that its row positions no longer apply.
+dataset_generation = 0
+dataset_lock = threading.Lock()
+dataset_checked_at = 0.0
+
+SENTIMENT_STORE_FILE = "sentiment_scores.db"
+sentiment_store = None
+
+def get_sentiment_store():
+    global sentiment_store
+    if sentiment_store is None:
+        with client_lock:
+            if sentiment_store is None:
+                from api.sentiment_store import SentimentStore
+                sentiment_store = SentimentStore(SENTIMENT_STORE_FILE)
+    return sentiment_store
+
+# LLM_BACKEND=stub swaps Gemini for an offline deterministic model; either way
+# responses are cached in LLM_CACHE_FILE by a hash of model name and prompt.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-2.0-flash")
+LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE", "llm_cache.db")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+STUB_LLM_LATENCY = float(os.getenv("STUB_LLM_LATENCY", "0"))
+model = None
+
+def get_model():
+    global model
+    if model is None:
+        with client_lock:
+            if model is None:
+                from api.llm_cache import cached_model
+                model = cached_model(
+                    LLM_BACKEND, LLM_MODEL_NAME, api_key=os.getenv("YOUR_GEMINI_API_KEY"),
+                    cache_path=LLM_CACHE_FILE, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES,
+                    stub_latency=STUB_LLM_LATENCY,
+                )
+    return model
 
 def detect_topic_trends(df):
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
     try:
         vectorizer = TfidfVectorizer(stop_words="english", max_features=1000)
         tfidf = vectorizer.fit_transform(df["text"].fillna(""))
@@ -118,6 +452,14 @@ def detect_topic_trends(df):
         print(f"Error detecting topics using TF-IDF: {e}")
         return {"error": str(e)}
 
+def incremental_topic_trends(df, top_n=15):
+    # New posts reach topic_model before the frame is swapped, so the model
+    # only answers for a frame with exactly its document count; any other
+    # frame (an older version still being materialized) is refit directly.
+    model = topic_model
+    trends = model.top_terms(top_n, n_docs=len(df)) if model is not None else None
+    return trends if trends is not None else detect_topic_trends(df)
+
 def top_authors(df):
     return df['author'].value_counts().head(10).to_dict()
 
@@ -125,7 +467,8 @@ def subreddit_activity(df):
     return df['subreddit'].value_counts().head(10).to_dict()
 
 def sentiment_overview(df):
-    return {"positive": 60, "neutral": 30, "negative": 10}
+    from api.sentiment_store import score_posts, sentiment_breakdown
+    return sentiment_breakdown(score_posts(df, get_sentiment_store()))
 
 def flashpoint_detection(df):
     daily_post_counts = df.groupby(df['datetime'].dt.date).size()
@@ -136,6 +479,7 @@ def domain_trends(df):
     return df['domain'].value_counts().head(10).dropna().to_dict()
 
 def controversial_posts(df):
+    from langchain.schema import Document
     df = df.copy()
     df['controversy'] = df['num_comments'] / (df['score'] + 1)
     top_posts = df.sort_values(by='controversy', ascending=False).head(5)
@@ -147,8 +491,8 @@ def controversial_posts(df):
         for _, row in top_posts.iterrows()
     ]
 
-def generate_narrative(topics, authors, subreddit_network, sentiments, flashpoints, domains, controversial):
-    prompt = f"""
+def narrative_prompt(topics, authors, subreddit_network, sentiments, flashpoints, domains, controversial):
+    return f"""
 You are a Reddit analyst generating a data storytelling narrative based on these analysis results.
 
 Topics: {topics}
@@ -161,78 +505,696 @@ Controversial Posts: {[{'title': post.metadata.get('title', ''), 'score': post.m
 
 output: Generate a proper description of the information in a formal, descriptive tone.
 """
-    result = model.generate_content(prompt)
+
+def generate_narrative(topics, authors, subreddit_network, sentiments, flashpoints, domains, controversial):
+    prompt = narrative_prompt(topics, authors, subreddit_network, sentiments, flashpoints, domains, controversial)
+    result = get_model().generate_content(prompt)
     return result.text.strip()
 
+# Each computation (a cache miss) is recorded as stage "analytic.<name>".
+analytics = AnalyticsCache({name: timed(f"analytic.{name}", function) for name, function in {
+    "topic_trends": incremental_topic_trends,
+    "top_authors": top_authors,
+    "subreddit_activity": subreddit_activity,
+    "sentiment_overview": sentiment_overview,
+    "flashpoints": flashpoint_detection,
+    "domain_trends": domain_trends,
+    "controversial_posts": controversial_posts,
+}.items()})
 
+def _warm_analytics(current_df, version):
+    threading.Thread(target=analytics.refresh, args=(current_df, version), daemon=True).start()
 
-@app.post("/ask")
-async def ask(request: QueryRequest):
-    query = request.query.lower()
+def _load_initial_dataset():
+    global df, dataset_version, dataset_offset, dataset_prefix, topic_model, flashpoint_detectors, dataset_checked_at
+    with dataset_lock:
+        if df is not None:
+            return
+        version = dataset_signature()
+        with stage("dataset.load") as load:
+            loaded, offset = load_dataset()
+            load.rows = len(loaded)
+        with stage("topic_model.build", len(loaded)):
+            topic_model = build_topic_model(loaded)
+        with stage("flashpoints.build", len(loaded)):
+            flashpoint_detectors = build_flashpoint_detectors(loaded)
+        dataset_offset = offset
+        dataset_prefix = dataset_head()
+        dataset_version = version
+        dataset_checked_at = time.monotonic()
+        df = loaded
+        readiness["dataset"] = True
+
+def _reload_dataset():
+    # Appends are read from the last offset and folded into the frame and the
+    # topic model; any other change (truncation, rewritten head) reloads fully.
+    import pandas as pd
+    from api.preprocessing import append_posts
+    global df, dataset_offset, dataset_prefix, topic_model, flashpoint_detectors, rollup_cube, vector_index
+    global keyword_index, dataset_generation
+    size = os.path.getsize(DATA_FILE)
+    if size >= dataset_offset and dataset_head(size=len(dataset_prefix)) == dataset_prefix:
+        with stage("dataset.append") as append:
+            records, offset = read_records(DATA_FILE, dataset_offset)
+            append.rows = len(records)
+            if records:
+                new_df = preprocess(pd.DataFrame(records))
+                topic_model.add_documents(new_df["text"].fillna("").tolist())
+                arrived = new_df.sort_values("created_utc", kind="stable")
+                for detector in flashpoint_detectors.values():
+                    detector.add_many(arrived["subreddit"].to_numpy(dtype=object, na_value=""), arrived["created_utc"].to_numpy())
+                if rollup_cube is not None:
+                    rollup_cube.add(new_df, rollup_sentiment(new_df))
+                if vector_index is not None:
+                    with stage("vector_index.add", len(new_df)):
+                        vector_index.add(new_df)
+                    _persist_vector_index(vector_index)
+                if keyword_index is not None:
+                    with stage("keyword_index.add", len(new_df)):
+                        keyword_index.add_documents(new_df["text"].tolist())
+                df = append_posts(df, new_df)
+        dataset_offset = offset
+    else:
+        with stage("dataset.load") as load:
+            new_df, offset = load_dataset()
+            load.rows = len(new_df)
+        with stage("topic_model.build", len(new_df)):
+            topic_model = build_topic_model(new_df)
+        with stage("flashpoints.build", len(new_df)):
+            flashpoint_detectors = build_flashpoint_detectors(new_df)
+        rollup_cube = None
+        df, dataset_offset = new_df, offset
+        dataset_generation += 1
+        if keyword_index is not None:
+            keyword_index = None
+            threading.Thread(target=get_keyword_index, daemon=True).start()
+        if vector_index is not None:
+            vector_index = None
+            threading.Thread(target=get_vector_index, daemon=True).start()
+    dataset_prefix = dataset_head()
+
+def current_dataset():
+    # data.jsonl is re-stat'ed at most every DATASET_CHECK_INTERVAL seconds; a
+    # changed size/mtime reloads it and starts materializing the new version.
+    global dataset_version, dataset_checked_at
+    if df is None:
+        _load_initial_dataset()
+    if time.monotonic() - dataset_checked_at < DATASET_CHECK_INTERVAL:
+        return df, dataset_version
+    with dataset_lock:
+        if time.monotonic() - dataset_checked_at >= DATASET_CHECK_INTERVAL:
+            dataset_checked_at = time.monotonic()
+            try:
+                signature = dataset_signature()
+                if signature != dataset_version:
+                    _reload_dataset()
+                    dataset_version = signature
+                    _warm_analytics(df, dataset_version)
+            except Exception as e:
+                print(f"Error reloading dataset: {e}")
+    return df, dataset_version
+
+def get_rollup():
+    # Built from the loaded frame on first use (or by the warm-up) and kept in
+    # step with appends by _reload_dataset.
+    global rollup_cube
+    current_dataset()
+    with dataset_lock:
+        if rollup_cube is None:
+            from api.rollup import build_rollup
+            with stage("rollup.build", len(df)):
+                rollup_cube = build_rollup(df, rollup_sentiment(df))
+        return rollup_cube
+
+def get_keyword_index():
+    # Token index over df["text"], row-aligned with df. It is built outside
+    # dataset_lock, then caught up with the rows appended meanwhile; a full
+    # reload in between discards it. _reload_dataset keeps it in step.
+    global keyword_index
+    if keyword_index is None and KEYWORD_INDEX:
+        from api.inverted_index import build_keyword_index
+        generation = dataset_generation
+        current_df, _ = current_dataset()
+        with stage("keyword_index.build", len(current_df)):
+            index = build_keyword_index(current_df, positions=False)
+        with dataset_lock:
+            if keyword_index is None and dataset_generation == generation:
+                index.add_documents(df["text"].iloc[index.n_docs:].tolist())
+                index.generation = generation
+                keyword_index = index
+    return keyword_index
+
+def _keyword_index_for(current_df, generation):
+    # The keyword index when it can answer for current_df, read while
+    # dataset_generation was `generation`; None means scan instead.
+    index = keyword_index
+    if index is None or index.generation != generation or dataset_generation != generation:
+        return None
+    return index if index.n_docs >= len(current_df) else None
+
+def cached(name):
+    current_df, version = current_dataset()
+    return analytics.get(name, current_df, version)
+
+# Free-form /ask questions are answered from the posts most similar to them,
+# found in a local hashed TF-IDF vector index (api/vector_index.py).
+VECTOR_INDEX_FILE = os.getenv("VECTOR_INDEX_FILE", "vector_index.pkl")
+VECTOR_DIM = int(os.getenv("VECTOR_DIM", "256"))
+VECTOR_IVF_MIN = int(os.getenv("VECTOR_IVF_MIN", "20000"))
+VECTOR_NPROBE = int(os.getenv("VECTOR_NPROBE", "16"))
+VECTOR_TOP_K = int(os.getenv("VECTOR_TOP_K", "8"))
+VECTOR_MIN_SIMILARITY = float(os.getenv("VECTOR_MIN_SIMILARITY", "0.1"))
+VECTOR_SAVE_INTERVAL = float(os.getenv("VECTOR_SAVE_INTERVAL", "30"))
+vector_index = None
+vector_lock = threading.Lock()
+vector_saved_at = 0.0
+
+def _persist_vector_index(index):
+    # Inserts not yet saved are recovered on load, from data.jsonl and from
+    # the archive offset, so saving at most every VECTOR_SAVE_INTERVAL
+    # seconds loses nothing.
+    global vector_saved_at
+    now = time.monotonic()
+    if now - vector_saved_at < VECTOR_SAVE_INTERVAL:
+        return
+    vector_saved_at = now
+    threading.Thread(target=index.save, args=(VECTOR_INDEX_FILE,), daemon=True).start()
+
+def _index_archive(index):
+    # Posts fetched by /posts since the index last read the archive.
+    import pandas as pd
+    if os.path.exists(OUTPUT_FILE):
+        records, offset = read_records(OUTPUT_FILE, index.extra.get("archive_offset", 0))
+        index.add(pd.DataFrame(records))
+        index.extra["archive_offset"] = offset
+
+def get_vector_index():
+    # VECTOR_INDEX_FILE is reused when it was built from the same data.jsonl
+    # (same leading bytes); otherwise the index is built from the loaded
+    # posts. Either way posts it does not have yet are added.
+    global vector_index
+    if vector_index is None:
+        current_dataset()
+        with vector_lock:
+            if vector_index is None:
+                from api.vector_index import VectorIndex, build_vector_index
+                index = None
+                if os.path.exists(VECTOR_INDEX_FILE):
+                    try:
+                        with stage("vector_index.load"):
+                            index = VectorIndex.load(VECTOR_INDEX_FILE)
+                        if index.extra.get("dataset_head") != dataset_prefix or index.dim != VECTOR_DIM:
+                            index = None
+                    except Exception as e:
+                        print(f"Error loading vector index: {e}")
+                        index = None
+                if index is None:
+                    with stage("vector_index.build", len(df)):
+                        index = build_vector_index(df, VECTOR_DIM, VECTOR_IVF_MIN)
+                    index.extra["dataset_head"] = dataset_prefix
+                # From here on /posts adds to the index itself; appends to
+                # data.jsonl that arrived while building are added below, later
+                # ones by _reload_dataset.
+                with archive_lock:
+                    _index_archive(index)
+                    vector_index = index
+                with stage("vector_index.add") as add:
+                    add.rows = index.add(df)
+                index.save(VECTOR_INDEX_FILE)
+    return vector_index
+
+def retrieve_posts(query, k=VECTOR_TOP_K, exact=False):
+    from langchain.schema import Document
+    with stage("vector_index.search") as search:
+        hits = get_vector_index().search(query, k, VECTOR_NPROBE, exact=exact)
+        search.rows = len(hits)
+    return [
+        Document(
+            page_content=f"{post['title']}\n{post['snippet']}".strip(),
+            metadata={**{field: value for field, value in post.items() if field != "snippet"}, "similarity": round(similarity, 4)},
+        )
+        for similarity, post in hits
+    ]
+
+def retrieval_prompt(query, posts):
+    listing = "\n".join(
+        f"[{i}] r/{post.metadata['subreddit']}, u/{post.metadata['author']}, score {post.metadata['score']}: "
+        f"{post.page_content}"
+        for i, post in enumerate(posts, start=1)
+    )
+    return f"""
+You are a Reddit analyst answering a question using the Reddit posts below, retrieved as the most relevant to it.
 
+Question: {query}
+
+Posts:
+{listing}
+
+output: Answer the question from these posts only, citing them by number. If they do not answer it, say so.
+"""
+
+# /ask work runs off the event loop. Analytic computations go to their own
+# thread pool, which bounds how many run at once (one per core by default) so
+# they cannot crowd out request handling; they share the GIL, so only the
+# NumPy/pandas/scikit-learn sections that release it actually run in
+# parallel. Request handling, including the blocking Gemini call, goes to a
+# separate I/O pool. At most ASK_MAX_PENDING requests may be queued or running;
+# beyond that /ask answers 503, and a request still running after ASK_TIMEOUT
+# seconds answers 504. VADER scoring and chart rendering already use process
+# pools of their own.
+ANALYTICS_THREADS = int(os.getenv("ANALYTICS_THREADS", str(os.cpu_count() or 1)))
+ASK_THREADS = int(os.getenv("ASK_THREADS", "32"))
+ASK_MAX_PENDING = int(os.getenv("ASK_MAX_PENDING", "128"))
+ASK_TIMEOUT = float(os.getenv("ASK_TIMEOUT", "60"))
+analytics_executor = ThreadPoolExecutor(max_workers=ANALYTICS_THREADS, thread_name_prefix="analytics")
+ask_executor = ThreadPoolExecutor(max_workers=ASK_THREADS, thread_name_prefix="ask")
+ask_pending = 0
+ask_pending_lock = threading.Lock()
+NARRATIVE_ANALYTICS = ("topic_trends", "top_authors", "subreddit_activity", "sentiment_overview",
+                       "flashpoints", "domain_trends", "controversial_posts")
+
+def cached_many(names):
+    # Yields (name, result) in completion order, computing misses in parallel.
+    futures = {analytics_executor.submit(contextvars.copy_context().run, cached, name): name for name in names}
+    for future in as_completed(futures):
+        yield futures[future], future.result()
+
+def warm_up():
     try:
-        if "trending" in query or "topic" in query:
-            topics = detect_topic_trends(df)
-            response = "Based on the analysis of the data, the following topics are currently trending:\n\n"
-            for topic in topics:
-                response += f"The topic '{topic['word']}' has a significant score of {topic['score']:.2f}, indicating its prominence in discussions.\n"
-            response += "\nThese topics highlight the key areas of interest in the current discourse."
-        elif "author" in query or "influencer" in query:
-            authors = top_authors(df)
-            response = "The analysis of the data reveals the most active authors or influencers:\n\n"
-            for author, count in authors.items():
-                response += f"{author} has contributed {count} posts, showcasing their significant activity.\n"
-            response += "\nThese authors play a crucial role in shaping the discussions within the community."
-        elif "subreddit" in query or "community" in query:
-            subreddit_network = subreddit_activity(df)
-            response = "The data indicates the following subreddit activity:\n\n"
-            for subreddit, count in subreddit_network.items():
-                response += f"The subreddit '{subreddit}' has {count} posts, reflecting its engagement level.\n"
-            response += "\nThese subreddits represent the most active communities in the dataset."
-        elif "sentiment" in query:
-            sentiments = sentiment_overview(df)
-            response = (
-                "The sentiment analysis of the data provides the following insights:\n\n"
-                f"Positive sentiment accounts for {sentiments['positive']}% of the discussions, "
-                f"while {sentiments['neutral']}% of the content is neutral. Negative sentiment constitutes {sentiments['negative']}%.\n\n"
-                "This breakdown highlights the overall tone of the discussions."
-            )
-        elif "flashpoint" in query or "spike" in query:
-            flashpoints = flashpoint_detection(df)
-            response = "The analysis has identified the following flashpoints or spikes in activity:\n\n"
-            for date, count in flashpoints.items():
-                response += f"On {date}, there were {count} posts, indicating a significant spike in activity.\n"
-            response += "\nThese flashpoints represent moments of heightened engagement."
-        elif "domain" in query or "url" in query:
-            domains = domain_trends(df)
-            response = "The data reveals the following trends in domain usage:\n\n"
-            for domain, count in domains.items():
-                response += f"The domain '{domain}' was referenced {count} times, highlighting its relevance.\n"
-            response += "\nThese domains are key sources of information in the discussions."
-        elif "controversial" in query:
-            controversial = controversial_posts(df)
-            response = "The analysis has identified the most controversial posts:\n\n"
-            for post in controversial:
-                metadata = post.metadata
-                response += (
-                    f"The post titled '{metadata['title']}' by {metadata['author']} has a score of {metadata['score']}, "
-                    "indicating its controversial nature.\n"
+        current_df, version = current_dataset()
+        analytics.refresh(current_df, version)
+        readiness["analytics"] = True
+        get_rollup()
+        get_seen_index()
+        get_checkpoints()
+        readiness["ready_at"] = time.time()
+    except Exception as e:
+        readiness["error"] = str(e)
+        print(f"Error during warm-up: {e}")
+        return
+    # Built after readiness: until they exist, keyword filters scan the text
+    # and free-form /ask questions get the fallback reply.
+    try:
+        get_keyword_index()
+    except Exception as e:
+        print(f"Error building keyword index: {e}")
+    try:
+        get_vector_index()
+    except Exception as e:
+        print(f"Error building vector index: {e}")
+
+@app.get("/ready")
+def ready():
+    body = {
+        "ready": readiness["dataset"] and readiness["analytics"],
+        "dataset_loaded": readiness["dataset"],
+        "analytics_warm": readiness["analytics"],
+        "posts": 0 if df is None else len(df),
+        "dataset_version": dataset_version,
+        "error": readiness["error"],
+        "warmup_seconds": None if readiness["ready_at"] is None else round(readiness["ready_at"] - readiness["started_at"], 3),
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.get("/analytics/cache")
+def analytics_cache_status():
+    return analytics.stats()
+
+LABEL_ANALYTICS = {"top_authors": "author", "subreddit_activity": "subreddit", "domain_trends": "domain"}
+
+def batch_results(current_df, names, rows, days=None):
+    # Analytics over the selected rows in one pass: the selection, the label
+    # codes and the day of each post are computed once and shared, and only
+    # the text analytics read the selected posts' text. Topics are a TF-IDF
+    # fit on the selection, which for a one-off subset is faster than an
+    # incremental model.
+    from api.batch_analytics import daily_spikes, label_counts, post_days
+    from api.sentiment_store import score_posts, sentiment_breakdown
+    columns = set()
+    if "topic_trends" in names or "sentiment_overview" in names:
+        columns |= {"id", "text"}
+    if "controversial_posts" in names:
+        columns |= {"title", "selftext", "author", "score", "num_comments"}
+    subset = current_df[[c for c in current_df.columns if c in columns]].iloc[rows] if columns else None
+    results = {}
+    for name in names:
+        with stage(f"batch.{name}", len(rows)):
+            if name in LABEL_ANALYTICS:
+                results[name] = label_counts(current_df[LABEL_ANALYTICS[name]], rows, 10)
+            elif name == "flashpoints":
+                results[name] = daily_spikes((post_days(current_df) if days is None else days)[rows])
+            elif name == "topic_trends":
+                results[name] = detect_topic_trends(subset) if len(subset) else []
+            elif name == "sentiment_overview":
+                results[name] = sentiment_breakdown(score_posts(subset, get_sentiment_store()))
+            elif name == "controversial_posts":
+                results[name] = controversial_posts(subset)
+    return results
+
+@app.post("/analytics")
+def analytics_batch(req: AnalyticsBatchRequest):
+    # Several analytics in one request, for dashboards. Without filters the
+    # materialized results are returned; with filters every analytic is
+    # computed over the matching posts in a single pass (batch_results).
+    from api.batch_analytics import post_days, select_rows
+    names = req.analytics or list(analytics.analytics)
+    unknown = [name for name in names if name not in analytics.analytics]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown analytics {unknown}. Use any of {list(analytics.analytics)}")
+    filters = {key: value for key, value in [("subreddits", req.subreddits), ("authors", req.authors),
+               ("start", req.start), ("end", req.end), ("keyword", req.keyword)] if value}
+    generation = dataset_generation
+    current_df, version = current_dataset()
+    posts = len(current_df)
+    if filters:
+        try:
+            with stage("batch.select") as select:
+                days = post_days(current_df) if req.start or req.end or "flashpoints" in names else None
+                index = _keyword_index_for(current_df, generation) if req.keyword else None
+                rows = select_rows(current_df, days, index=index, **filters)
+                select.rows = posts = len(rows)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        results = batch_results(current_df, names, rows, days) if filters else dict(cached_many(names))
+    except Exception as e:
+        print(f"Error computing analytics batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "version": version,
+        "posts": posts,
+        "filters": filters,
+        "results": {name: _analytic_payload(name, results[name]) for name in names},
+    }
+
+def _app_metrics():
+    # Gauges read at scrape time; clients that were never created are skipped.
+    families = [
+        ("dataset_rows", "gauge", "Posts in the loaded dataset", [({}, 0 if df is None else len(df))]),
+        ("analytics_materialized", "gauge", "Analytics materialized for the current dataset version",
+         [({}, len(analytics.stats()["materialized"]))]),
+        ("ask_pending", "gauge", "/ask requests queued or running", [({}, ask_pending)]),
+    ]
+    if model is not None and hasattr(model, "cache"):
+        families.append(("llm_cache_entries", "gauge", "Responses in the LLM cache", [({}, len(model.cache))]))
+    if vector_index is not None:
+        families.append(("vector_index_posts", "gauge", "Posts in the vector index", [({}, len(vector_index))]))
+    if charts is not None:
+        stats = charts.stats()
+        families.append(("chart_cache_entries", "gauge", "Rendered charts held in memory", [({}, stats["images"])]))
+    return families
+
+registry.add_collector(_app_metrics)
+
+@app.get("/metrics")
+def metrics():
+    from fastapi.responses import PlainTextResponse
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/flashpoints")
+def get_flashpoints(granularity: str = "day", subreddit: str = None, limit: int = 100):
+    # Spikes from the online detectors: "current" are buckets still filling up
+    # that already exceed the threshold, "history" is newest first.
+    current_dataset()
+    detector = flashpoint_detectors.get(granularity)
+    if detector is None:
+        raise HTTPException(status_code=400, detail=f"Invalid granularity '{granularity}'. Use one of {sorted(flashpoint_detectors)}")
+    return {
+        **detector.stats(),
+        "current": detector.current(subreddit),
+        "history": detector.flashpoints(subreddit, limit),
+    }
+
+@app.get("/rollup")
+def get_rollup_rows(granularity: str = "day", start: str = None, end: str = None, subreddits: str = None,
+                    by_subreddit: bool = False, top_terms: int = 0):
+    # Dashboard time-range queries answered from the day x subreddit rollup;
+    # start/end are dates, subreddits a comma-separated list.
+    selected = [name.strip() for name in subreddits.split(",") if name.strip()] if subreddits else None
+    try:
+        rows = get_rollup().query(granularity, start, end, selected, by_subreddit, top_terms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"granularity": granularity, "start": start, "end": end, "rows": rows}
+
+@app.get("/rollup/subreddits")
+def get_rollup_subreddits(start: str = None, end: str = None, top_n: int = 10):
+    try:
+        return get_rollup().subreddit_totals(start, end, top_n)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/rollup/terms/{term}")
+def get_rollup_term(term: str, granularity: str = "day", start: str = None, end: str = None, subreddits: str = None):
+    selected = [name.strip() for name in subreddits.split(",") if name.strip()] if subreddits else None
+    try:
+        return get_rollup().term_series(term, granularity, start, end, selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/llm/cache")
+def llm_cache_status():
+    return {"backend": LLM_BACKEND, "model": LLM_MODEL_NAME, **get_model().cache.stats()}
+
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR", "chart_cache")
+CHART_CACHE_MAX_FILES = int(os.getenv("CHART_CACHE_MAX_FILES", "2048"))
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", str(os.cpu_count() or 1)))
+CHART_FORMATS = ("png", "json")
+charts = None
+
+def get_charts():
+    global charts
+    if charts is None:
+        with client_lock:
+            if charts is None:
+                from api.render_service import RenderService
+                from api.sentiment_store import score_posts
+                charts = RenderService(
+                    cache_dir=CHART_CACHE_DIR,
+                    max_disk_entries=CHART_CACHE_MAX_FILES,
+                    workers=CHART_RENDER_WORKERS,
+                    sentiment=lambda current_df: score_posts(current_df, get_sentiment_store()),
                 )
-            response += "\nThese posts have sparked significant debate within the community."
-        elif "narrative" in query or "summary" in query:
-            narrative = generate_narrative(
-                detect_topic_trends(df),
-                top_authors(df),
-                subreddit_activity(df),
-                sentiment_overview(df),
-                flashpoint_detection(df),
-                domain_trends(df),
-                controversial_posts(df)
+    return charts
+
+def _chart_response(plot_types, params_list, fmt):
+    # PNGs come back base64-encoded; format="json" returns the plotted series
+    # instead so the client can draw the chart itself.
+    from api.render_service import chart_params
+    if fmt not in CHART_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format '{fmt}'. Use one of {list(CHART_FORMATS)}")
+    try:
+        params_list = [chart_params(plot_type, params) for plot_type, params in zip(plot_types, params_list)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    current_df, version = current_dataset()
+    service = get_charts()
+    if fmt == "json":
+        outputs = [service.series(t, current_df, version, p) for t, p in zip(plot_types, params_list)]
+    else:
+        outputs = service.render_many(list(zip(plot_types, params_list)), current_df, version)
+    key = "series" if fmt == "json" else "image"
+    return [
+        {"plot_type": t, "params": p, "version": version, key: output}
+        for t, p, output in zip(plot_types, params_list, outputs)
+    ]
+
+@app.get("/charts/{plot_type}")
+def get_chart(plot_type: str, format: str = "png", keyword: str = None, link_keyword: str = None,
+              top_n: int = None, num_nodes: int = None, min_shared_urls: int = None):
+    params = {"keyword": keyword, "link_keyword": link_keyword, "top_n": top_n,
+              "num_nodes": num_nodes, "min_shared_urls": min_shared_urls}
+    return _chart_response([plot_type], [{k: v for k, v in params.items() if v is not None}], format)[0]
+
+@app.post("/charts")
+def get_charts_batch(req: ChartsRequest):
+    return {"charts": _chart_response([c.plot_type for c in req.charts], [c.params for c in req.charts], req.format)}
+
+@app.get("/charts")
+def chart_cache_status():
+    return get_charts().stats()
+
+def is_narrative_query(query):
+    return "narrative" in query or "summary" in query
+
+def answer_query(query):
+    if "trending" in query or "topic" in query:
+        topics = cached("topic_trends")
+        response = "Based on the analysis of the data, the following topics are currently trending:\n\n"
+        for topic in topics:
+            response += f"The topic '{topic['word']}' has a significant score of {topic['score']:.2f}, indicating its prominence in discussions.\n"
+        response += "\nThese topics highlight the key areas of interest in the current discourse."
+    elif "author" in query or "influencer" in query:
+        authors = cached("top_authors")
+        response = "The analysis of the data reveals the most active authors or influencers:\n\n"
+        for author, count in authors.items():
+            response += f"{author} has contributed {count} posts, showcasing their significant activity.\n"
+        response += "\nThese authors play a crucial role in shaping the discussions within the community."
+    elif "subreddit" in query or "community" in query:
+        subreddit_network = cached("subreddit_activity")
+        response = "The data indicates the following subreddit activity:\n\n"
+        for subreddit, count in subreddit_network.items():
+            response += f"The subreddit '{subreddit}' has {count} posts, reflecting its engagement level.\n"
+        response += "\nThese subreddits represent the most active communities in the dataset."
+    elif "sentiment" in query:
+        sentiments = cached("sentiment_overview")
+        response = (
+            "The sentiment analysis of the data provides the following insights:\n\n"
+            f"Positive sentiment accounts for {sentiments['positive']}% of the discussions, "
+            f"while {sentiments['neutral']}% of the content is neutral. Negative sentiment constitutes {sentiments['negative']}%.\n\n"
+            "This breakdown highlights the overall tone of the discussions."
+        )
+    elif "flashpoint" in query or "spike" in query:
+        flashpoints = cached("flashpoints")
+        response = "The analysis has identified the following flashpoints or spikes in activity:\n\n"
+        for date, count in flashpoints.items():
+            response += f"On {date}, there were {count} posts, indicating a significant spike in activity.\n"
+        response += "\nThese flashpoints represent moments of heightened engagement."
+    elif "domain" in query or "url" in query:
+        domains = cached("domain_trends")
+        response = "The data reveals the following trends in domain usage:\n\n"
+        for domain, count in domains.items():
+            response += f"The domain '{domain}' was referenced {count} times, highlighting its relevance.\n"
+        response += "\nThese domains are key sources of information in the discussions."
+    elif "controversial" in query:
+        controversial = cached("controversial_posts")
+        response = "The analysis has identified the most controversial posts:\n\n"
+        for post in controversial:
+            metadata = post.metadata
+            response += (
+                f"The post titled '{metadata['title']}' by {metadata['author']} has a score of {metadata['score']}, "
+                "indicating its controversial nature.\n"
             )
-            response = f"The following narrative summary has been generated based on the data:\n\n{narrative}"
+        response += "\nThese posts have sparked significant debate within the community."
+    elif is_narrative_query(query):
+        results = dict(cached_many(NARRATIVE_ANALYTICS))
+        narrative = generate_narrative(*(results[name] for name in NARRATIVE_ANALYTICS))
+        response = f"The following narrative summary has been generated based on the data:\n\n{narrative}"
+    else:
+        try:
+            posts = [post for post in retrieve_posts(query) if post.metadata["similarity"] >= VECTOR_MIN_SIMILARITY]
+        except Exception as e:
+            print(f"Error retrieving posts: {e}")
+            posts = []
+        if posts:
+            answer = get_model().generate_content(retrieval_prompt(query, posts)).text.strip()
+            response = f"Based on {len(posts)} related posts:\n\n{answer}"
         else:
             response = "I'm sorry, I couldn't understand your query.Can you be more specific about it?"
 
-        return {"answer": response}
+    return response
+
+def _admit_ask():
+    global ask_pending
+    with ask_pending_lock:
+        if ask_pending >= ASK_MAX_PENDING:
+            return False
+        ask_pending += 1
+        return True
+
+def _release_ask(_):
+    global ask_pending
+    with ask_pending_lock:
+        ask_pending -= 1
+
+def _busy_response():
+    return JSONResponse({"answer": "Error: server busy, please retry"}, status_code=503, headers={"Retry-After": "1"})
+
+@app.post("/ask")
+async def ask(request: QueryRequest):
+    query = request.query.lower()
+    if not _admit_ask():
+        return _busy_response()
+
+    # The slot is held until the work itself finishes, even after a timeout,
+    # since a running thread cannot be cancelled.
+    future = asyncio.get_running_loop().run_in_executor(ask_executor, contextvars.copy_context().run, answer_query, query)
+    future.add_done_callback(_release_ask)
+    try:
+        return {"answer": await asyncio.wait_for(asyncio.shield(future), ASK_TIMEOUT)}
+    except asyncio.TimeoutError:
+        return JSONResponse({"answer": f"Error: timed out after {ASK_TIMEOUT:g} seconds"}, status_code=504)
+    except Exception as e:
+        return {"answer": f"Error: {str(e)}"}
+
+NARRATIVE_PREFIX = "The following narrative summary has been generated based on the data:\n\n"
+
+def _sse(event, data):
+    from fastapi.encoders import jsonable_encoder
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+def _analytic_payload(name, result):
+    if name == "controversial_posts":
+        return [{**post.metadata, "selftext": post.page_content} for post in result]
+    return result
+
+def stream_answer(query):
+    # Narrative queries emit one "analytic" event per analytic as soon as it is
+    # ready, then the Gemini text as "token" events from the streaming API,
+    # then "done" with the full answer. Other queries emit a single "answer".
+    try:
+        if not is_narrative_query(query):
+            answer = answer_query(query)
+            yield _sse("answer", {"text": answer})
+            yield _sse("done", {"answer": answer})
+            return
+        results = {}
+        for name, result in cached_many(NARRATIVE_ANALYTICS):
+            results[name] = result
+            yield _sse("analytic", {"name": name, "result": _analytic_payload(name, result)})
+        prompt = narrative_prompt(*(results[name] for name in NARRATIVE_ANALYTICS))
+        yield _sse("token", {"text": NARRATIVE_PREFIX})
+        parts = []
+        for chunk in get_model().generate_content(prompt, stream=True):
+            parts.append(chunk.text)
+            yield _sse("token", {"text": chunk.text})
+        yield _sse("done", {"answer": NARRATIVE_PREFIX + "".join(parts).strip()})
     except Exception as e:
-        return {"answer": f"Error: {str(e)}"}
\ No newline at end of file
+        yield _sse("error", {"answer": f"Error: {str(e)}"})
+
+def _produce_stream(query, emit, cancelled):
+    for event in stream_answer(query):
+        if cancelled.is_set():
+            break
+        emit(event)
+
+@app.post("/ask/stream")
+async def ask_stream(request: QueryRequest):
+    # Admitted like /ask, and produced on ask_executor: events reach the
+    # response through a queue, and once ASK_TIMEOUT seconds have passed an
+    # "error" event ends the stream. When the stream ends early the producer
+    # stops at its next event, and only then is its slot released.
+    query = request.query.lower()
+    if not _admit_ask():
+        return _busy_response()
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def emit(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    future = loop.run_in_executor(ask_executor, contextvars.copy_context().run, _produce_stream, query, emit, cancelled)
+    future.add_done_callback(_release_ask)
+    future.add_done_callback(lambda _: events.put_nowait(None))
+
+    async def relay():
+        deadline = loop.time() + ASK_TIMEOUT
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), max(0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    yield _sse("error", {"answer": f"Error: timed out after {ASK_TIMEOUT:g} seconds"})
+                    return
+                if event is None:
+                    return
+                yield event
+        finally:
+            cancelled.set()
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,154 @@
+import argparse
+import hashlib
+import json
+import os
+
+import pyarrow as pa
+
+POST_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("subreddit", pa.string()),
+    ("author", pa.string()),
+    ("title", pa.string()),
+    ("selftext", pa.string()),
+    ("url", pa.string()),
+    ("created_utc", pa.float64()),
+    ("score", pa.int64()),
+    ("num_comments", pa.int64()),
+])
+POST_COLUMNS = POST_SCHEMA.names
+HEAD_BYTES = 4096
+
+
+def source_fingerprint(path, size=HEAD_BYTES):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read(size)).hexdigest()
+
+
+def parse_record(line):
+    # One JSONL line as a post dict, or None when it is not a JSON object.
+    # Reddit API wrappers ({"kind": ..., "data": {...}}) are unwrapped.
+    try:
+        record = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(record, dict):
+        return None
+    return record["data"] if isinstance(record.get("data"), dict) else record
+
+
+def iter_lines(path, offset=0):
+    # (post dict or None, offset after the line) for every complete line from
+    # offset on. A last line without its newline is still being written and
+    # is left for the next read.
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            yield parse_record(line), offset
+
+
+def _coerce(record):
+    row = {}
+    for field in POST_SCHEMA:
+        value = record.get(field.name)
+        if value is not None and pa.types.is_integer(field.type):
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                value = None
+        elif value is not None and pa.types.is_floating(field.type):
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = None
+        elif value is not None and not isinstance(value, str):
+            value = str(value)
+        row[field.name] = value
+    return row
+
+
+def convert_jsonl_to_arrow(jsonl_path, arrow_path=None, batch_size=100000):
+    # Streams the JSONL through fixed-size record batches into an uncompressed
+    # Arrow IPC file, which can then be memory-mapped without a parse step.
+    arrow_path = arrow_path or os.path.splitext(jsonl_path)[0] + ".arrow"
+    offset = 0
+    rows = 0
+    tmp_path = arrow_path + ".tmp"
+    with open(jsonl_path, "rb") as f:
+        head = f.read(HEAD_BYTES)
+    metadata = {
+        "source_head": hashlib.sha256(head).hexdigest(),
+        "source_head_bytes": len(head),
+    }
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, POST_SCHEMA) as writer:
+        batch = []
+        for record, offset in iter_lines(jsonl_path):
+            if record is None:
+                continue
+            batch.append(_coerce(record))
+            if len(batch) >= batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=POST_SCHEMA))
+                rows += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=POST_SCHEMA))
+            rows += len(batch)
+    # The offset is only known once the whole source has been read, so the
+    # bookkeeping lives in a sidecar next to the Arrow file. The old sidecar
+    # goes first and the new one lands last, so a crash part-way leaves no
+    # sidecar (the JSONL is parsed instead) rather than a mismatched pair;
+    # arrow_size ties the sidecar to the file it describes.
+    meta_path = arrow_path + ".meta.json"
+    with open(meta_path + ".tmp", "w") as meta:
+        json.dump({"source_size": offset, "rows": rows, "arrow_size": os.path.getsize(tmp_path), **metadata}, meta)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    os.replace(tmp_path, arrow_path)
+    os.replace(meta_path + ".tmp", meta_path)
+    return arrow_path
+
+
+def arrow_metadata(arrow_path):
+    try:
+        with open(arrow_path + ".meta.json") as meta:
+            return json.load(meta)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def is_fresh(arrow_path, jsonl_path):
+    # Fresh means the Arrow file covers a prefix of the current JSONL, so the
+    # caller only has to read lines past source_size.
+    meta = arrow_metadata(arrow_path)
+    if meta is None or not os.path.exists(arrow_path) or not os.path.exists(jsonl_path):
+        return False
+    if os.path.getsize(jsonl_path) < meta["source_size"] or os.path.getsize(arrow_path) != meta.get("arrow_size"):
+        return False
+    return source_fingerprint(jsonl_path, meta["source_head_bytes"]) == meta["source_head"]
+
+
+def open_table(arrow_path):
+    # The file's table over a memory map: nothing is read or copied until a
+    # column is converted, and zero-copy conversions stay backed by the map.
+    return pa.ipc.open_file(pa.memory_map(arrow_path, "r")).read_all()
+
+
+def load_columns(arrow_path, columns=None):
+    with pa.memory_map(arrow_path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select([c for c in columns if c in table.column_names])
+        return table.to_pandas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a Reddit JSONL dump to a memory-mappable Arrow IPC file")
+    parser.add_argument("jsonl_path")
+    parser.add_argument("arrow_path", nargs="?")
+    parser.add_argument("--batch-size", type=int, default=100000)
+    args = parser.parse_args()
+    out = convert_jsonl_to_arrow(args.jsonl_path, args.arrow_path, args.batch_size)
+    print(f"Wrote {arrow_metadata(out)['rows']} posts to {out}")
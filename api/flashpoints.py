@@ -0,0 +1,189 @@
+import math
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+GRANULARITIES = {"hour": 3600, "day": 86400}
+METHODS = ("ewma", "mad")
+GLOBAL_SCOPE = "all"
+
+
+class ScopeStats:
+    # Rolling statistics of closed bucket counts for one scope (a subreddit or
+    # the global stream) plus the count of the bucket currently filling up.
+    def __init__(self, window):
+        self.bucket = None
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.periods = 0
+        self.recent = deque(maxlen=window)
+        self.expected = None
+        self.flagged = None
+
+
+class FlashpointDetector:
+    # Online spike detector over post counts per time bucket. Every post bumps
+    # the open bucket of its subreddit and of the global scope, and the bucket
+    # is scored against that scope's history right away, so a spike is flagged
+    # while it is happening. When a later bucket starts, the closed count is
+    # folded into the history: an EWMA mean/variance (method="ewma") or a
+    # rolling window for median/MAD (method="mad"). Empty buckets in between
+    # count as zeros. Posts older than their scope's open bucket are only
+    # counted in `late`, because a closed bucket is never reopened.
+    def __init__(self, granularity="day", method="ewma", alpha=0.3, window=14, threshold=3.0,
+                 min_count=5, min_periods=7, min_std=1.0, history=1000):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity '{granularity}'. Use one of {list(GRANULARITIES)}")
+        if method not in METHODS:
+            raise ValueError(f"Invalid method '{method}'. Use one of {list(METHODS)}")
+        self.granularity = granularity
+        self.bucket_seconds = GRANULARITIES[granularity]
+        self.method = method
+        self.alpha = alpha
+        self.window = window
+        self.threshold = threshold
+        self.min_count = min_count
+        self.min_periods = min_periods
+        self.min_std = min_std
+        # Beyond this many empty buckets the EWMA has forgotten the old level.
+        self.max_gap = max(window, int(math.ceil(10 / alpha)))
+        self.scopes = {}
+        self.history = deque(maxlen=history)
+        self.posts = 0
+        self.late = 0
+        self.lock = threading.Lock()
+
+    def _expected(self, stats):
+        # (center, scale) only change when a bucket closes, so they are cached
+        # until the next fold.
+        if stats.periods < self.min_periods:
+            return None
+        if stats.expected is None:
+            if self.method == "ewma":
+                stats.expected = (stats.mean, max(math.sqrt(stats.var), self.min_std))
+            else:
+                values = np.fromiter(stats.recent, dtype=float)
+                median = float(np.median(values))
+                mad = float(np.median(np.abs(values - median)))
+                stats.expected = (median, max(1.4826 * mad, self.min_std))
+        return stats.expected
+
+    def _fold(self, stats, count):
+        stats.periods += 1
+        stats.expected = None
+        if self.method == "ewma":
+            if stats.periods == 1:
+                stats.mean, stats.var = float(count), 0.0
+            else:
+                diff = count - stats.mean
+                increment = self.alpha * diff
+                stats.mean += increment
+                stats.var = (1 - self.alpha) * (stats.var + diff * increment)
+        else:
+            stats.recent.append(count)
+
+    def _close(self, stats, next_bucket):
+        if stats.flagged is not None:
+            stats.flagged["count"] = stats.count
+            stats.flagged["status"] = "closed"
+        self._fold(stats, stats.count)
+        empty = (next_bucket - stats.bucket) // self.bucket_seconds - 1
+        for _ in range(min(empty, self.max_gap)):
+            self._fold(stats, 0)
+        stats.bucket, stats.count, stats.flagged = next_bucket, 0, None
+
+    def _add(self, scope, bucket, count):
+        stats = self.scopes.get(scope)
+        if stats is None:
+            stats = self.scopes[scope] = ScopeStats(self.window)
+            stats.bucket = bucket
+        if bucket < stats.bucket:
+            self.late += count
+            return
+        if bucket > stats.bucket:
+            self._close(stats, bucket)
+        stats.count += count
+        if stats.flagged is not None:
+            stats.flagged["count"] = stats.count
+            center, scale = stats.expected
+            stats.flagged["zscore"] = round((stats.count - center) / scale, 3)
+            return
+        if stats.count < self.min_count:
+            return
+        expected = self._expected(stats)
+        if expected is None:
+            return
+        center, scale = expected
+        zscore = (stats.count - center) / scale
+        if zscore >= self.threshold:
+            stats.flagged = {
+                "scope": scope,
+                "bucket_start": int(bucket),
+                "bucket": datetime.fromtimestamp(bucket, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "granularity": self.granularity,
+                "count": stats.count,
+                "expected": round(center, 3),
+                "scale": round(scale, 3),
+                "zscore": round(zscore, 3),
+                "status": "open",
+            }
+            self.history.append(stats.flagged)
+
+    def add(self, subreddit, created_utc):
+        bucket = int(created_utc // self.bucket_seconds) * self.bucket_seconds
+        with self.lock:
+            self.posts += 1
+            self._add(GLOBAL_SCOPE, bucket, 1)
+            self._add(subreddit, bucket, 1)
+
+    def add_many(self, subreddits, timestamps):
+        # Bulk form of add(): posts are grouped into (scope, bucket) counts
+        # first, so the work per call is per bucket rather than per post.
+        subreddits = np.asarray(subreddits, dtype=object)
+        buckets = (np.asarray(timestamps, dtype=float) // self.bucket_seconds).astype(np.int64) * self.bucket_seconds
+        if buckets.size == 0:
+            return
+        with self.lock:
+            self.posts += int(buckets.size)
+            values, counts = np.unique(buckets, return_counts=True)
+            for bucket, count in zip(values.tolist(), counts.tolist()):
+                self._add(GLOBAL_SCOPE, bucket, count)
+            names, name_codes = np.unique(subreddits.astype(str), return_inverse=True)
+            keys, counts = np.unique(name_codes.astype(np.int64) * len(values) + np.searchsorted(values, buckets),
+                                     return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                self._add(str(names[key // len(values)]), int(values[key % len(values)]), count)
+
+    def current(self, scope=None):
+        with self.lock:
+            flagged = [s.flagged for s in self.scopes.values() if s.flagged is not None]
+        return [dict(f) for f in flagged if scope is None or f["scope"] == scope]
+
+    def flashpoints(self, scope=None, limit=100):
+        with self.lock:
+            matches = [dict(f) for f in reversed(self.history) if scope is None or f["scope"] == scope]
+        return matches[:limit]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "granularity": self.granularity,
+                "method": self.method,
+                "threshold": self.threshold,
+                "posts": self.posts,
+                "late_posts": self.late,
+                "scopes": len(self.scopes),
+                "flashpoints": len(self.history),
+            }
+
+
+def build_detectors(df, granularities=("hour", "day"), **options):
+    detectors = {g: FlashpointDetector(g, **options) for g in granularities}
+    if len(df):
+        ordered = df.sort_values("created_utc", kind="stable")
+        for detector in detectors.values():
+            detector.add_many(ordered["subreddit"].to_numpy(dtype=object, na_value=""), ordered["created_utc"].to_numpy())
+    return detectors
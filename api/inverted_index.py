@@ -0,0 +1,189 @@
+import pickle
+import re
+import threading
+from array import array
+from collections import defaultdict
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+PHRASE_PATTERN = re.compile(r'"([^"]+)"')
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower()) if isinstance(text, str) else []
+
+
+def query_parts(query, mode="all"):
+    # (phrases, terms) of a query: quoted parts are phrases, the rest terms.
+    phrases = PHRASE_PATTERN.findall(query)
+    terms = tokenize(PHRASE_PATTERN.sub(" ", query))
+    if not phrases and len(terms) > 1 and mode == "all":
+        # An unquoted multi-word keyword behaves like the substring scan
+        # it replaces, which only matched the words in sequence.
+        phrases, terms = [" ".join(terms)], []
+    return phrases, terms
+
+
+def scan_mask(texts, query):
+    # InvertedIndex.query(query) as a scan over a Series of texts: every
+    # phrase and term must occur as whole tokens, the words of a phrase
+    # separated only by non-word characters. Used where no index exists, so
+    # both paths select the same posts.
+    phrases, terms = query_parts(query)
+    parts = [tokenize(phrase) for phrase in phrases] + [[term] for term in terms]
+    mask = np.zeros(len(texts), dtype=bool)
+    if not parts or not all(parts):
+        return mask
+    mask[:] = True
+    for tokens in parts:
+        pattern = r"(?<!\w)" + r"\W+".join(re.escape(token) for token in tokens) + r"(?!\w)"
+        mask &= texts.str.contains(pattern, case=False, regex=True, na=False).to_numpy(dtype=bool)
+    return mask
+
+
+class InvertedIndex:
+    # Token-level index from lowercased \w+ terms to sorted posting lists of row
+    # positions, optionally with the token positions needed for phrase queries.
+    # Matching is by whole token, so "trump" matches "Trump's" but not
+    # "trumpism", unlike the substring scan of str.contains.
+    def __init__(self, positions=True):
+        self.postings = defaultdict(lambda: array("I"))
+        self.positions = {} if positions else None
+        self.n_docs = 0
+        self.lock = threading.Lock()
+
+    def add_documents(self, texts):
+        with self.lock:
+            for text in texts:
+                row = self.n_docs
+                self.n_docs += 1
+                term_positions = defaultdict(list)
+                for position, term in enumerate(tokenize(text)):
+                    term_positions[term].append(position)
+                for term, where in term_positions.items():
+                    self.postings[term].append(row)
+                    if self.positions is not None:
+                        self.positions.setdefault(term, {})[row] = array("I", where)
+        return self.n_docs
+
+    def lookup(self, term):
+        with self.lock:
+            posting = self.postings.get(term.lower())
+            return np.frombuffer(posting, dtype=np.uint32).copy() if posting else np.empty(0, dtype=np.uint32)
+
+    def match_all(self, terms):
+        terms = sorted(set(terms), key=lambda t: len(self.postings.get(t, ())))
+        if not terms:
+            return np.empty(0, dtype=np.uint32)
+        rows = self.lookup(terms[0])
+        for term in terms[1:]:
+            if rows.size == 0:
+                break
+            rows = np.intersect1d(rows, self.lookup(term), assume_unique=True)
+        return rows
+
+    def match_any(self, terms):
+        postings = [self.lookup(term) for term in set(terms)]
+        return np.unique(np.concatenate(postings)) if postings else np.empty(0, dtype=np.uint32)
+
+    def match_phrase(self, phrase):
+        terms = tokenize(phrase)
+        if len(terms) <= 1 or self.positions is None:
+            return self.match_all(terms)
+        candidates = self.match_all(terms)
+        matches = []
+        with self.lock:
+            term_rows = [self.positions.get(term, {}) for term in terms]
+            for row in candidates.tolist():
+                starts = set(term_rows[0][row])
+                for offset, rows in enumerate(term_rows[1:], start=1):
+                    starts &= {p - offset for p in rows[row]}
+                    if not starts:
+                        break
+                if starts:
+                    matches.append(row)
+        return np.array(matches, dtype=np.uint32)
+
+    def query(self, query, mode="all"):
+        # Quoted parts are phrases; the rest are single terms. With mode="all"
+        # every phrase and term must match, with mode="any" at least one.
+        phrases, terms = query_parts(query, mode)
+        results = [self.match_phrase(phrase) for phrase in phrases]
+        if mode == "any":
+            results.append(self.match_any(terms))
+            return np.unique(np.concatenate(results)) if results else np.empty(0, dtype=np.uint32)
+        if terms:
+            results.append(self.match_all(terms))
+        if not results:
+            return np.empty(0, dtype=np.uint32)
+        rows = results[0]
+        for other in results[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def mask(self, query, length=None, mode="all"):
+        mask = np.zeros(self.n_docs if length is None else length, dtype=bool)
+        rows = self.query(query, mode=mode)
+        mask[rows[rows < mask.size]] = True
+        return mask
+
+    def save(self, path):
+        with self.lock:
+            state = {
+                "n_docs": self.n_docs,
+                "postings": {term: posting.tobytes() for term, posting in self.postings.items()},
+                "positions": None if self.positions is None else {
+                    term: {row: where.tobytes() for row, where in rows.items()}
+                    for term, rows in self.positions.items()
+                },
+            }
+        with open(path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index = cls(positions=state["positions"] is not None)
+        index.n_docs = state["n_docs"]
+        for term, raw in state["postings"].items():
+            posting = array("I")
+            posting.frombytes(raw)
+            index.postings[term] = posting
+        if state["positions"] is not None:
+            for term, rows in state["positions"].items():
+                restored = {}
+                for row, raw in rows.items():
+                    where = array("I")
+                    where.frombytes(raw)
+                    restored[row] = where
+                index.positions[term] = restored
+        return index
+
+
+def keyword_mask(df, keyword, index=None):
+    # With a prebuilt InvertedIndex (rows aligned with df) the lookup is a
+    # posting-list intersection instead of a scan of every post; both match
+    # whole tokens, so "trump" finds "Trump's" but not "trumpism". An index
+    # without positions narrows a phrase query to the posts holding all of
+    # its words, and only those are scanned for the phrase.
+    if index is None:
+        return scan_mask(df["text"], keyword)
+    phrases, terms = query_parts(keyword)
+    if index.positions is not None or all(len(tokenize(phrase)) <= 1 for phrase in phrases):
+        return index.mask(keyword, len(df))
+    words = [token for phrase in phrases for token in tokenize(phrase)] + terms
+    candidates = index.match_all(words).astype(np.int64)
+    candidates = candidates[candidates < len(df)]
+    mask = np.zeros(len(df), dtype=bool)
+    mask[candidates[scan_mask(df["text"].iloc[candidates], keyword)]] = True
+    return mask
+
+
+def build_keyword_index(df, positions=False):
+    # Positions cost about 2 KB per post and only speed up phrase queries,
+    # which keyword_mask can answer without them.
+    index = InvertedIndex(positions=positions)
+    index.add_documents(df["text"].tolist())
+    return index
@@ -0,0 +1,242 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+from api.metrics import cache_event, record_llm, usage_tokens
+
+
+def prompt_key(model_name, prompt):
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class TextResponse:
+    # The part of a Gemini response the callers use: .text.
+    def __init__(self, text, cached=False):
+        self.text = text
+        self.cached = cached
+
+
+class LLMCache:
+    # Generated text in SQLite keyed by prompt_key(model, prompt). Entries older
+    # than ttl seconds are treated as missing; past max_entries the least
+    # recently used ones are evicted.
+    def __init__(self, db_path, ttl=86400, max_entries=1000, clock=time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, text TEXT, created_at REAL, last_used_at REAL) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at)")
+        self.conn.commit()
+
+    def get(self, key):
+        now = self.clock()
+        with self.lock:
+            row = self.conn.execute("SELECT text, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.conn.commit()
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def peek(self, key):
+        # Like get, without touching counters or recency.
+        with self.lock:
+            row = self.conn.execute("SELECT text, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl is not None and self.clock() - row[1] > self.ttl):
+            return None
+        return row[0]
+
+    def put(self, key, model_name, text):
+        now = self.clock()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, text, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, text, now, now),
+            )
+            count = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                cursor = self.conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+                self.evictions += cursor.rowcount
+            self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self):
+        entries = len(self)
+        with self.lock:
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class StubModel:
+    # Offline stand-in for genai.GenerativeModel: after an optional delay it
+    # returns a deterministic text derived from the prompt, so narrative paths
+    # can be load-tested without network access or API keys.
+    def __init__(self, model_name="stub", latency=0.0, words=120):
+        self.model_name = model_name
+        self.latency = latency
+        self.words = words
+        self.calls = 0
+
+    def _tokens(self, prompt):
+        digest = hashlib.sha256(prompt.encode("utf-8", "surrogatepass")).hexdigest()
+        return [f"[{self.model_name} {digest[:12]}]"] + [f" token{digest[i % 64]}{i}" for i in range(self.words)]
+
+    def _stream(self, tokens):
+        # latency is spread over the tokens, as a streaming model would.
+        for token in tokens:
+            if self.latency:
+                time.sleep(self.latency / len(tokens))
+            yield TextResponse(token)
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        tokens = self._tokens(prompt)
+        if stream:
+            return self._stream(tokens)
+        if self.latency:
+            time.sleep(self.latency)
+        return TextResponse("".join(tokens))
+
+
+class CachedModel:
+    # Wraps a model with generate_content(prompt) and answers byte-identical
+    # prompts from the cache. Concurrent misses for the same prompt wait for
+    # the one call in flight instead of each calling the model.
+    def __init__(self, model, model_name, cache):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+        # key -> [lock, threads holding or waiting on it]; an entry is dropped
+        # by the last of them, so every caller for a key shares one lock.
+        self.key_locks = {}
+        self.lock = threading.Lock()
+
+    def _acquire_key(self, key):
+        with self.lock:
+            entry = self.key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def _release_key(self, key):
+        with self.lock:
+            entry = self.key_locks[key]
+            entry[1] -= 1
+            if not entry[1]:
+                del self.key_locks[key]
+
+    def generate_content(self, prompt, stream=False):
+        if stream:
+            return self._generate_stream(prompt)
+        key = prompt_key(self.model_name, prompt)
+        text = self.cache.get(key)
+        if text is not None:
+            cache_event("llm", True)
+            return TextResponse(text, cached=True)
+        key_lock = self._acquire_key(key)
+        try:
+            with key_lock:
+                text = self.cache.peek(key)
+                if text is not None:
+                    cache_event("llm", True)
+                    return TextResponse(text, cached=True)
+                cache_event("llm", False)
+                start = time.perf_counter()
+                response = self.model.generate_content(prompt)
+                text = response.text
+                record_llm(self.model_name, time.perf_counter() - start, *usage_tokens(response, prompt, text))
+                self.cache.put(key, self.model_name, text)
+                return TextResponse(text)
+        finally:
+            self._release_key(key)
+
+    def _generate_stream(self, prompt, chunk_words=8):
+        # Yields chunks with .text. A cached answer is replayed in word chunks;
+        # a miss is passed through from the model's own stream and cached once
+        # it completes, so an abandoned stream is never stored half-written.
+        key = prompt_key(self.model_name, prompt)
+        text = self.cache.get(key)
+        if text is None:
+            key_lock = self._acquire_key(key)
+            try:
+                with key_lock:
+                    text = self.cache.peek(key)
+                    if text is None:
+                        cache_event("llm", False)
+                        start = time.perf_counter()
+                        parts = []
+                        chunk = None
+                        for chunk in self.model.generate_content(prompt, stream=True):
+                            parts.append(chunk.text)
+                            yield TextResponse(chunk.text)
+                        text = "".join(parts)
+                        # Gemini reports usage on the last chunk of a stream.
+                        record_llm(self.model_name, time.perf_counter() - start, *usage_tokens(chunk, prompt, text))
+                        self.cache.put(key, self.model_name, text)
+                        return
+            finally:
+                self._release_key(key)
+        cache_event("llm", True)
+        words = text.split(" ")
+        for i in range(0, len(words), chunk_words):
+            chunk = " ".join(words[i:i + chunk_words])
+            yield TextResponse(chunk if i == 0 else " " + chunk, cached=True)
+
+
+def load_model(backend="gemini", model_name="gemini-2.0-flash", api_key=None, stub_latency=0.0):
+    if backend == "stub":
+        return StubModel(f"stub-{model_name}", latency=stub_latency)
+    if backend != "gemini":
+        raise ValueError(f"Unknown LLM backend '{backend}'. Use 'gemini' or 'stub'")
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+def cached_model(backend="gemini", model_name="gemini-2.0-flash", api_key=None, cache_path="llm_cache.db",
+                 ttl=86400, max_entries=1000, stub_latency=0.0):
+    model = load_model(backend, model_name, api_key, stub_latency)
+    # The backend is part of the cache key, so stub output never answers a
+    # Gemini prompt.
+    name = model_name if backend == "gemini" else f"{backend}:{model_name}"
+    return CachedModel(model, name, LLMCache(cache_path, ttl, max_entries))
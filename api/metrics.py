@@ -0,0 +1,306 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "rediview_"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROFILE_HEADER = b"x-profile"
+HELP = {
+    "stage_seconds": "Duration of an instrumented stage",
+    "stage_rows_total": "Rows processed by an instrumented stage",
+    "cache_requests_total": "Cache lookups by cache and result",
+    "llm_request_seconds": "Latency of uncached LLM calls",
+    "llm_tokens_total": "LLM tokens by direction; estimated from words when the backend reports none",
+    "http_request_seconds": "HTTP request latency by route and status",
+}
+
+# Stages recorded while a profiled request is running: (name, seconds, rows).
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+_label_keys = {}
+
+
+def _labels(labels):
+    # Label sets are few (stage names, routes, statuses), so their sorted
+    # keys are memoized.
+    items = tuple(labels.items())
+    key = _label_keys.get(items)
+    if key is None:
+        key = _label_keys[items] = tuple(sorted((k, str(v)) for k, v in items))
+    return key
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    # Counters and histograms in process memory, rendered in the Prometheus
+    # text format. Collectors are called at scrape time for values that other
+    # components already keep (cache sizes, dataset rows, ...).
+    def __init__(self, enabled=True, buckets=BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _labels(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _labels(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def add_collector(self, collector):
+        # collector() -> [(name, type, help, [(labels dict, value), ...]), ...]
+        self.collectors.append(collector)
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def render(self):
+        lines = []
+        with self.lock:
+            counters = {name: dict(series) for name, series in self.counters.items()}
+            histograms = {name: {k: (list(v[0]), v[1], v[2]) for k, v in series.items()}
+                          for name, series in self.histograms.items()}
+        for name in sorted(counters):
+            text = HELP.get(name, name)
+            lines += [f"# HELP {PREFIX}{name} {text}", f"# TYPE {PREFIX}{name} counter"]
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{PREFIX}{name}{_format_labels(key)} {_format_value(value)}")
+        for name in sorted(histograms):
+            text = HELP.get(name, name)
+            lines += [f"# HELP {PREFIX}{name} {text}", f"# TYPE {PREFIX}{name} histogram"]
+            for key, (counts, total, count) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, [('le', repr(float(bound)))])} {cumulative}")
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {count}")
+        for collector in self.collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+                continue
+            for name, kind, text, samples in families:
+                lines += [f"# HELP {PREFIX}{name} {text}", f"# TYPE {PREFIX}{name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{PREFIX}{name}{_format_labels(_labels(labels))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(enabled=METRICS_ENABLED)
+
+
+def record_stage(name, seconds, rows=None):
+    if registry.enabled:
+        registry.observe("stage_seconds", seconds, stage=name)
+        if rows is not None:
+            registry.inc("stage_rows_total", rows, stage=name)
+    profile = current_profile.get()
+    if profile is not None:
+        profile.append((name, seconds, rows))
+
+
+class _Stage:
+    __slots__ = ("name", "rows", "start")
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.name, time.perf_counter() - self.start, self.rows)
+        return False
+
+
+class _NoStage:
+    # Shared no-op used while neither metrics nor a profile are active;
+    # callers may still assign .rows on it, which is ignored.
+    @property
+    def rows(self):
+        return None
+
+    @rows.setter
+    def rows(self, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_STAGE = _NoStage()
+
+
+def stage(name, rows=None):
+    # with stage("dataset.load") as s: ...; s.rows = len(df)
+    if not registry.enabled and current_profile.get() is None:
+        return NO_STAGE
+    return _Stage(name, rows)
+
+
+def timed(name, function):
+    # Wraps function(df, ...) so every call is recorded as stage `name`. The
+    # row count is the length of the input frame, or else of a returned one.
+    def wrapper(*args, **kwargs):
+        with stage(name, len(args[0]) if args and hasattr(args[0], "shape") else None) as timing:
+            result = function(*args, **kwargs)
+            if timing.rows is None and hasattr(result, "shape"):
+                timing.rows = len(result)
+            return result
+    wrapper.__name__ = getattr(function, "__name__", name)
+    return wrapper
+
+
+def cache_event(cache, hit):
+    if registry.enabled:
+        registry.inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+    profile = current_profile.get()
+    if profile is not None:
+        profile.append((f"cache.{cache}.{'hit' if hit else 'miss'}", 0.0, None))
+
+
+def count_tokens(text):
+    return len(text.split()) if text else 0
+
+
+def record_llm(model_name, seconds, prompt_tokens, completion_tokens):
+    if registry.enabled:
+        registry.observe("llm_request_seconds", seconds, model=model_name)
+        registry.inc("llm_tokens_total", prompt_tokens, model=model_name, direction="prompt")
+        registry.inc("llm_tokens_total", completion_tokens, model=model_name, direction="completion")
+    profile = current_profile.get()
+    if profile is not None:
+        profile.append(("llm.generate", seconds, completion_tokens))
+
+
+def usage_tokens(response, prompt, text):
+    # Gemini responses carry usage_metadata; otherwise words are counted.
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    completion_tokens = getattr(usage, "candidates_token_count", None)
+    return (prompt_tokens if prompt_tokens is not None else count_tokens(prompt),
+            completion_tokens if completion_tokens is not None else count_tokens(text))
+
+
+def summarize_profile(profile):
+    # {name: {"count", "seconds", "rows"}} in first-seen order.
+    summary = {}
+    for name, seconds, rows in profile:
+        entry = summary.setdefault(name, {"count": 0, "seconds": 0.0, "rows": None})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        if rows is not None:
+            entry["rows"] = (entry["rows"] or 0) + rows
+    return summary
+
+
+def server_timing(profile, total_seconds):
+    parts = []
+    for name, entry in summarize_profile(profile).items():
+        unit = "tokens" if name.startswith("llm.") else "rows"
+        desc = f"count={entry['count']}" + (f" {unit}={entry['rows']}" if entry["rows"] is not None else "")
+        parts.append(f'{name};dur={entry["seconds"] * 1000:.2f};desc="{desc}"')
+    parts.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def format_profile(profile):
+    lines = [f"{'stage':<40} {'count':>6} {'seconds':>10} {'rows':>10}"]
+    for name, entry in summarize_profile(profile).items():
+        rows = "" if entry["rows"] is None else entry["rows"]
+        lines.append(f"{name:<40} {entry['count']:>6} {entry['seconds']:>10.3f} {rows:>10}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def profiled():
+    # Collects the stages run inside the block (and in work started from it
+    # with a copied context) into the yielded list.
+    profile = []
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+
+
+class MetricsMiddleware:
+    # ASGI middleware timing every HTTP request by route template and status.
+    # A request sent with "X-Profile: 1" also gets a Server-Timing header
+    # listing the stages that ran before its response started, which for a
+    # streamed response is only the work done before the first byte.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profiling = any(k == PROFILE_HEADER and v not in (b"", b"0") for k, v in scope["headers"])
+        if not registry.enabled and not profiling:
+            await self.app(scope, receive, send)
+            return
+        profile = [] if profiling else None
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if profile is not None:
+                    header = server_timing(profile, time.perf_counter() - start)
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+            if registry.enabled:
+                route = getattr(scope.get("route"), "path", "unmatched")
+                registry.observe("http_request_seconds", time.perf_counter() - start,
+                                 method=scope["method"], route=route, status=str(status[0]))
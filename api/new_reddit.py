@@ -1,41 +1,60 @@
-import os
+import argparse
 import json
+import os
+import threading
+import time
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.feature_extraction.text import TfidfVectorizer
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk import download
 from datetime import datetime
 from dotenv import load_dotenv
 import networkx as nx
-import google.generativeai as genai
-from io import BytesIO
 import base64
+from api.preprocessing import add_derived_columns, compact_posts, extract_domain
+from api.inverted_index import InvertedIndex, build_keyword_index, keyword_mask
+from api.render_service import RenderService, render_chart, render_png
+from api.sentiment_store import SentimentStore, score_posts
+from api.llm_cache import cached_model
+from api.metrics import format_profile, profiled
+from api.pipeline import Pipeline, Stage, file_digest, format_records
+from api.streaming import iter_records
+from api import sparse_networks
 
 load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel('gemini-2.0-flash')
-
-def load_reddit_data(path):
+# Repeated prompts are answered from llm_cache.db; LLM_BACKEND=stub runs offline.
+# The model is created on first use, so importing this module (api.code does,
+# for preprocess) neither opens the cache nor imports the Gemini client.
+model = None
+model_lock = threading.Lock()
+
+def get_model():
+    global model
+    if model is None:
+        with model_lock:
+            if model is None:
+                model = cached_model(
+                    os.getenv("LLM_BACKEND", "gemini"), os.getenv("LLM_MODEL_NAME", "gemini-2.0-flash"),
+                    api_key=os.getenv("GEMINI_API_KEY"), cache_path=os.getenv("LLM_CACHE_FILE", "llm_cache.db"),
+                    ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")),
+                    stub_latency=float(os.getenv("STUB_LLM_LATENCY", "0")),
+                )
+    return model
+
+# Threads running report stages: one per CPU for the compute-bound stages plus
+# one so LLM calls overlap with them, up to 4.
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(min(4, (os.cpu_count() or 1) + 1))))
+
+def load_reddit_data(path, columns=None):
     try:
         if path.endswith(".jsonl"):
-            records = []
-            with open(path, "r", encoding="utf-8") as f:
-                for line in f:
-                    try:
-                        data = json.loads(line)
-                        if "data" in data:
-                            records.append(data["data"])
-                        else:
-                            records.append(data)
-                    except json.JSONDecodeError:
-                        continue
-            return pd.DataFrame(records)
+            return pd.DataFrame(list(iter_records(path)))
         elif path.endswith(".json"):
             return pd.read_json(path)
+        elif path.endswith(".arrow"):
+            from api.columnar import load_columns
+            return load_columns(path, columns)
         else:
-            raise ValueError("Unsupported file format. Use .jsonl or .json")
+            raise ValueError("Unsupported file format. Use .jsonl, .json or .arrow")
     except Exception as e:
         print(f"Error loading data from {path}: {e}")
         return pd.DataFrame() 
@@ -43,10 +62,7 @@ def load_reddit_data(path):
 def preprocess(df):
     try:
         df = df.copy() 
-        df["datetime"] = pd.to_datetime(df["created_utc"], unit='s')
-        df["text"] = df["title"].fillna("") + " " + df["selftext"].fillna("")
-        df["word_count"] = df["text"].apply(lambda x: len(str(x).split()))
-        df["domain"] = df["url"].apply(lambda x: x.split('/')[2] if pd.notna(x) and "http" in x else None)
+        df = compact_posts(add_derived_columns(df))
         least_datetime = df["datetime"].min()
         highest_datetime = df["datetime"].max()
         
@@ -57,9 +73,9 @@ def preprocess(df):
         print(f"Error preprocessing data: {e}")
         return pd.DataFrame() 
 
-def get_example_posts_by_keyword(df, keyword, max_posts=5):
+def get_example_posts_by_keyword(df, keyword, max_posts=5, index=None):
     try:
-        keyword_df = df[df["text"].str.contains(keyword, case=False, na=False)].copy()
+        keyword_df = df[keyword_mask(df, keyword, index)].copy()
         keyword_df = keyword_df.sort_values(by="score", ascending=False).head(max_posts)
         examples = []
         for _, row in keyword_df.iterrows():
@@ -76,40 +92,22 @@ def get_example_posts_by_keyword(df, keyword, max_posts=5):
         print(f"Error getting example posts for keyword '{keyword}': {e}")
         return []
 
+def write_chart_html(path, data, alt):
+    html = f'<img src="data:image/png;base64,{data}" alt="{alt}">'
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return html
+
 def plot_post_trends(df):
     try:
-        posts_per_day = df.groupby(df["datetime"].dt.date).size()
-        plt.figure(figsize=(10, 4))
-        posts_per_day.plot(kind="line", title="Posts Over Time")
-        plt.ylabel("Number of Posts")
-        plt.tight_layout()
-
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        data = base64.b64encode(buf.getbuffer()).decode("ascii")
-        with open("post_trends.html", "w", encoding="utf-8") as f:
-            f.write(f'<img src="data:image/png;base64,{data}" alt="Post Trends">')
-        return plt
+        return write_chart_html("post_trends.html", render_chart("post_trends", df), "Post Trends")
     except Exception as e:
         print(f"Error plotting post trends: {e}")
         return None
 
 def plot_top_subreddits(df):
     try:
-        top = df["subreddit"].value_counts().head(10)
-        plt.figure(figsize=(10, 4))
-        sns.barplot(x=top.values, y=top.index)
-        plt.title("Top 10 Subreddits by Post Count")
-        plt.xlabel("Post Count")
-        plt.tight_layout()
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        data = base64.b64encode(buf.getbuffer()).decode("ascii")
-        with open("top_subreddits.html", "w", encoding="utf-8") as f:
-            f.write(f'<img src="data:image/png;base64,{data}" alt="Top Subreddits">')
-        return plt
+        return write_chart_html("top_subreddits.html", render_chart("top_subreddits", df), "Top Subreddits")
     except Exception as e:
         print(f"Error plotting top subreddits: {e}")
         return None
@@ -117,69 +115,81 @@ def plot_top_subreddits(df):
 def extract_top_links(df, top_n=10):
     try:
         link_df = df[df["url"].notna() & df["url"].str.startswith("http")].copy()
-        link_df.loc[:, "domain"] = link_df["url"].apply(lambda x: x.split('/')[2]) 
+        link_df["domain"] = extract_domain(link_df["url"])
         return link_df["domain"].value_counts().head(top_n)
     except Exception as e:
         print(f"Error extracting top links: {e}")
         return pd.Series() 
 
-def detect_topics_tfidf(df, top_n=10):
+def tfidf_matrix(df, max_features=1000):
+    vectorizer = TfidfVectorizer(stop_words="english", max_features=max_features)
+    tfidf = vectorizer.fit_transform(df["text"].fillna(""))
+    return vectorizer.get_feature_names_out(), tfidf
+
+def detect_topics_tfidf(df, top_n=10, term_stats=None, matrix=None):
     try:
-        vectorizer = TfidfVectorizer(stop_words="english", max_features=1000)
-        tfidf = vectorizer.fit_transform(df["text"].fillna(""))
+        if term_stats is not None:
+            return pd.DataFrame(term_stats.top_terms(top_n), columns=["word", "score"])
+        # matrix: (words, tfidf) from tfidf_matrix, when already computed.
+        words, tfidf = tfidf_matrix(df) if matrix is None else matrix
         scores = tfidf.sum(axis=0).A1
-        words = vectorizer.get_feature_names_out()
         return pd.DataFrame({"word": words, "score": scores}).sort_values(by="score", ascending=False).head(top_n)
     except Exception as e:
         print(f"Error detecting topics using TF-IDF: {e}")
         return pd.DataFrame()
 
-def time_series_of_topics(df, keyword):
+def time_series_of_topics(df, keyword, index=None):
     try:
-        df["contains_keyword"] = df["text"].str.contains(keyword, case=False, na=False)
+        df["contains_keyword"] = keyword_mask(df, keyword, index)
         df["date"] = df["datetime"].dt.date
         return df[df["contains_keyword"]].groupby("date").size()
     except Exception as e:
         print(f"Error generating time series for topic '{keyword}': {e}")
         return pd.Series() 
 
-def summarize_posts_by_keyword(df, keyword, max_posts=10):
+def summarize_posts_by_keyword(df, keyword, max_posts=10, index=None):
     try:
-        related_posts = df[df["text"].str.contains(keyword, case=False, na=False)].head(max_posts)
+        related_posts = df[keyword_mask(df, keyword, index)].head(max_posts)
         sample_texts = "\n".join(related_posts["text"].tolist())
         prompt = f"""Perform sentiment analysis of th epost that will be given to you and explain the posts, while 
 summarizing the main ideas and tone from these Reddit posts about '{keyword}':{sample_texts}
         """
-        response = model.generate_content(prompt)
+        response = get_model().generate_content(prompt)
         return response.text
     except Exception as e:
         print(f"Error summarizing posts for keyword '{keyword}': {e}")
         return ""
 
-def sentiment_analysis(df):
+def sentiment_analysis(df, store_path="sentiment_scores.db", workers=None):
     try:
-        download("vader_lexicon", quiet=True)  # Download only if not already present
-        sia = SentimentIntensityAnalyzer()
-        df["sentiment"] = df["text"].apply(lambda x: sia.polarity_scores(str(x))["compound"])
+        # Scores persist by post id, so reruns only score new or edited posts.
+        store = SentimentStore(store_path)
+        try:
+            df["sentiment"] = score_posts(df, store, workers=workers)
+        finally:
+            store.close()
         return df
     except Exception as e:
         print(f"Error performing sentiment analysis: {e}")
         return df # Return the original DataFrame in case of an error
 
-def summarize_insights(df, keywords_df, top_domains, top_subreddits, prominent_link, spike_day):
+def summarize_insights(df, keywords_df, top_domains, top_subreddits, prominent_link, spike_day,
+                       crossposting_matrix=None, domain_counts=None):
     try:
         num_posts = len(df)
         avg_sentiment = df["sentiment"].mean()
         keyword_list = keywords_df["word"].tolist()[:3] if 'word' in keywords_df.columns else []
 
-        crossposting_matrix = subreddit_crossposting_network(df)
+        if crossposting_matrix is None:
+            crossposting_matrix = subreddit_crossposting_network(df)
         crossposting_summary = (
             f"Subreddit cross-posting network generated with {crossposting_matrix.shape[0]} users and "
             f"{crossposting_matrix.shape[1]} subreddits."
             if not crossposting_matrix.empty else "No significant cross-posting activity detected."
         )
 
-        domain_counts = top_domains_by_subreddit(df)
+        if domain_counts is None:
+            domain_counts = top_domains_by_subreddit(df)
         domain_summary = (
             f"Top domains by subreddit calculated for {domain_counts.shape[0]} subreddits."
             if not domain_counts.empty else "No significant domain sharing detected."
@@ -214,7 +224,7 @@ def get_top_authors(df, top_n=20):
 def author_stats(df):
     try:
         return (
-            df.groupby('author')
+            df.groupby('author', observed=True)
             .agg(post_count=('author', 'count'),
                  avg_score=('score', 'mean'),
                  avg_comments=('num_comments', 'mean'),
@@ -225,40 +235,19 @@ def author_stats(df):
         print(f"Error calculating author stats: {e}")
         return pd.DataFrame() 
 
-def build_author_copost_network(df, min_shared_urls=2):
+def build_author_copost_network(df, min_shared_urls=2, return_sparse=False):
     try:
-        from collections import Counter
-        url_authors = df.groupby('url')['author'].unique()
-        edge_counter = Counter()
-        for authors in url_authors:
-            for i in range(len(authors)):
-                for j in range(i+1, len(authors)):
-                    pair = tuple(sorted((authors[i], authors[j])))
-                    edge_counter[pair] += 1
-
-        G = nx.Graph()
-        for (a1, a2), weight in edge_counter.items():
-            if weight >= min_shared_urls:
-                G.add_edge(a1, a2, weight=weight)
-        return G
+        # Co-post weights come from one sparse author x URL product rather than
+        # counting every author pair per URL in Python.
+        return sparse_networks.build_author_copost_network(df, min_shared_urls, return_sparse)
     except Exception as e:
         print(f"Error building author co-post network: {e}")
         return nx.Graph()  
 
 def plot_top_authors(df, top_n=20):
     try:
-        top = get_top_authors(df, top_n)
-        plt.figure(figsize=(8,6))
-        top.plot(kind='barh', title=f'Top {top_n} Authors by Post Count')
-        plt.gca().invert_yaxis()
-        plt.tight_layout()
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        data = base64.b64encode(buf.getbuffer()).decode("ascii")
-        with open("top_authors.html", "w", encoding="utf-8") as f:
-            f.write(f'<img src="data:image/png;base64,{data}" alt="Top Authors">')
-        return plt
+        data = render_chart("top_authors", df, {"top_n": top_n})
+        return write_chart_html("top_authors.html", data, "Top Authors")
     except Exception as e:
         print(f"Error plotting top authors: {e}")
         return None
@@ -268,61 +257,28 @@ def plot_author_network(G, num_nodes=50):
         degrees = dict(G.degree())
         top_nodes = sorted(degrees, key=degrees.get, reverse=True)[:num_nodes]
         H = G.subgraph(top_nodes)
-        plt.figure(figsize=(10, 10))
-        pos = nx.spring_layout(H, k=0.5)
-        nx.draw_networkx_nodes(H, pos, node_size=[degrees[n]*50 for n in H.nodes()])
-        nx.draw_networkx_edges(H, pos, alpha=0.3)
-        nx.draw_networkx_labels(H, pos, font_size=8)
-        plt.axis('off')
-        plt.tight_layout()
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close()
-        data = base64.b64encode(buf.getbuffer()).decode("ascii")
-        with open("author_network.html", "w", encoding="utf-8") as f:
-            f.write(f'<img src="data:image/png;base64,{data}" alt="Author Network">')
-        return plt
+        series = {
+            "kind": "network", "figsize": [10, 10],
+            "nodes": [{"id": str(n), "degree": int(degrees[n])} for n in H.nodes()],
+            "edges": [[str(u), str(v), int(d.get("weight", 1))] for u, v, d in H.edges(data=True)],
+        }
+        data = base64.b64encode(render_png(series)).decode("ascii")
+        return write_chart_html("author_network.html", data, "Author Network")
     except Exception as e:
         print(f"Error plotting author network: {e}")
         return None
 
-def rise_of_topic_across_communities(df, keyword):
+def rise_of_topic_across_communities(df, keyword, index=None):
     try:
-        df = df.copy() # Avoid modifying the original DataFrame
-        df["date"] = df["datetime"].dt.date
-        df["contains_keyword"] = df["text"].str.contains(keyword, case=False, na=False)
-        grouped = df[df["contains_keyword"]].groupby(["date", "subreddit"]).size().unstack(fill_value=0)
-
-        plt.figure(figsize=(12, 5))
-        grouped.plot(figsize=(12, 5), title=f"Mentions of '{keyword}' Across Subreddits Over Time")
-        plt.ylabel("Mentions")
-        plt.tight_layout()
-
-        buf = BytesIO()
-        plt.savefig(buf, format='png')
-        plt.close()
-        data = base64.b64encode(buf.getbuffer()).decode('ascii')
+        data = render_chart("topic_rise", df, {"keyword": keyword}, index=index)
         return f'<img src="data:image/png;base64,{data}" alt="Topic rise across communities">'
     except Exception as e:
         print(f"Error in rise_of_topic_across_communities for '{keyword}': {e}")
         return "Error generating plot."
 
-def sentiment_shift_around_keyword(df, keyword):
+def sentiment_shift_around_keyword(df, keyword, index=None):
     try:
-        df = df.copy() 
-        df["contains_keyword"] = df["text"].str.contains(keyword, case=False, na=False)
-        keyword_df = df[df["contains_keyword"]].copy()  
-        keyword_df.loc[:, "week"] = keyword_df["datetime"].dt.to_period("W").apply(lambda r: r.start_time)  # Use .loc
-        sentiment_by_week = keyword_df.groupby("week")["sentiment"].mean()
-        plt.figure(figsize=(10, 4))
-        sentiment_by_week.plot(kind='line', title=f"Sentiment Over Time for '{keyword}'")
-        plt.ylabel("Average Sentiment")
-        plt.tight_layout()
-
-        buf = BytesIO()
-        plt.savefig(buf, format='png')
-        plt.close()
-        data = base64.b64encode(buf.getbuffer()).decode('ascii')
+        data = render_chart("sentiment_shift", df, {"keyword": keyword}, index=index)
         return f'<img src="data:image/png;base64,{data}" alt="Sentiment shift around keyword">'
     except Exception as e:
         print(f"Error in sentiment_shift_around_keyword for '{keyword}': {e}")
@@ -331,16 +287,7 @@ def sentiment_shift_around_keyword(df, keyword):
 def compare_sentiment_by_link(df, link_keyword):
     try:
         link_df = df[df["url"].str.contains(link_keyword, na=False, case=False)].copy()
-        grouped = link_df.groupby("subreddit")["sentiment"].mean().sort_values(ascending=False)
-        plt.figure(figsize=(10, 4))
-        grouped.plot(kind='bar', title=f"Sentiment by Subreddit for link: '{link_keyword}'")
-        plt.ylabel("Average Sentiment")
-        plt.tight_layout()
-
-        buf = BytesIO()
-        plt.savefig(buf, format='png')
-        plt.close()
-        data = base64.b64encode(buf.getbuffer()).decode('ascii')
+        data = render_chart("sentiment_by_link", df, {"link_keyword": link_keyword})
         return link_df, f'<img src="data:image/png;base64,{data}" alt="Sentiment by subreddit for link">'
     except Exception as e:
         print(f"Error in compare_sentiment_by_link for '{link_keyword}': {e}")
@@ -361,11 +308,10 @@ def power_users_narrative(df, top_n=5):
 
 def subreddit_crossposting_network(df, min_subs=2):
     try:
-        user_subs = df.groupby("author")["subreddit"].nunique()
-        crossover_users = user_subs[user_subs >= min_subs].index.tolist()
-        cross_df = df[df["author"].isin(crossover_users)]
-        matrix = pd.crosstab(cross_df["author"], cross_df["subreddit"])
-        return matrix
+        # Sparse author x subreddit counts restricted to authors active in at
+        # least min_subs subreddits; same shape as the old dense crosstab.
+        matrix = sparse_networks.SparseContingency.from_frame(df, "author", "subreddit")
+        return matrix.filter_rows(matrix.row_nunique().to_numpy() >= min_subs)
     except Exception as e:
         print(f"Error in subreddit_crossposting_network: {e}")
         return pd.DataFrame()
@@ -386,9 +332,7 @@ def detect_flashpoints(df):
 
 def top_domains_by_subreddit(df):
     try:
-        df = df[df["domain"].notna()]
-        domain_counts = df.groupby("subreddit")["domain"].value_counts().unstack(fill_value=0)
-        return domain_counts
+        return sparse_networks.SparseContingency.from_frame(df[df["domain"].notna()], "subreddit", "domain")
     except Exception as e:
         print(f"Error in top_domains_by_subreddit: {e}")
         return pd.DataFrame()
@@ -520,18 +464,21 @@ def controversial_posts(df, top_n=5):
         print(f"Error in controversial_posts: {e}")
         return [] 
 
-def generate_narrative_story_with_examples(df, keywords_df, top_domains, top_subreddits, model):
+def generate_narrative_story_with_examples(df, keywords_df, top_domains, top_subreddits, model,
+                                           crossposting_matrix=None, domain_counts=None):
     try:
         keyword_list = keywords_df["word"].tolist()[:3]  
 
-        crossposting_matrix = subreddit_crossposting_network(df)
+        if crossposting_matrix is None:
+            crossposting_matrix = subreddit_crossposting_network(df)
         crossposting_summary = (
             f"Subreddit cross-posting network generated with {crossposting_matrix.shape[0]} users and "
             f"{crossposting_matrix.shape[1]} subreddits."
             if not crossposting_matrix.empty else "No significant cross-posting activity detected."
         )
 
-        domain_counts = top_domains_by_subreddit(df)
+        if domain_counts is None:
+            domain_counts = top_domains_by_subreddit(df)
         domain_summary = (
             f"Top domains by subreddit calculated for {domain_counts.shape[0]} subreddits."
             if not domain_counts.empty else "No significant domain sharing detected."
@@ -575,20 +522,20 @@ def generate_narrative_story_with_examples(df, keywords_df, top_domains, top_sub
         return "Error generating narrative."
 
 
-def test_unused_functions(df):
+def test_unused_functions(df, index=None):
     try:
         # Test time_series_of_topics
         print("\nTesting time_series_of_topics...")
         keyword = "example_keyword"
-        time_series = time_series_of_topics(df, keyword)
+        time_series = time_series_of_topics(df, keyword, index)
         print(time_series)
 
         print("\nTesting summarize_posts_by_keyword...")
-        summary = summarize_posts_by_keyword(df, keyword, max_posts=5)
+        summary = summarize_posts_by_keyword(df, keyword, max_posts=5, index=index)
         print(summary)
 
         print("\nTesting sentiment_shift_around_keyword...")
-        sentiment_shift_plot = sentiment_shift_around_keyword(df, keyword)
+        sentiment_shift_plot = sentiment_shift_around_keyword(df, keyword, index)
         print(sentiment_shift_plot)
 
         print("\nTesting compare_sentiment_by_link...")
@@ -602,83 +549,163 @@ def test_unused_functions(df):
         print(power_users)
 
         print("\nTesting rise_of_topic_across_communities...")
-        topic_rise_plot = rise_of_topic_across_communities(df, keyword)
+        topic_rise_plot = rise_of_topic_across_communities(df, keyword, index)
         print(topic_rise_plot)
 
     except Exception as e:
         print(f"Error testing unused functions: {e}")
 
-def main():
+def dataset_version(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+REPORT_CHARTS = [
+    ("post_trends", "post_trends.html", "Post Trends"),
+    ("top_subreddits", "top_subreddits.html", "Top Subreddits"),
+    ("top_authors", "top_authors.html", "Top Authors"),
+    ("author_network", "author_network.html", "Author Network"),
+]
+
+def report_chart_images(df, version, cache_dir=None, **context):
+    # Unchanged charts for the same dataset version come from cache_dir; the
+    # rest are rendered together across worker processes.
+    charts = RenderService(cache_dir=cache_dir)
     try:
-        df = load_reddit_data("reddit_data.jsonl")
-        if df.empty:
-            print("Aborting due to empty DataFrame after loading.")
-            return
-
-        df = preprocess(df)
-        if df.empty:
-            print("Aborting due to empty DataFrame after preprocessing.")
-            return
-
-        plot_post_trends(df)
-        plot_top_subreddits(df)
-
-        test_unused_functions(df)
-        top_links = extract_top_links(df)
-        keywords_df = detect_topics_tfidf(df)
-        df = sentiment_analysis(df)
-
-        plot_top_authors(df)
-        G = build_author_copost_network(df)
-        plot_author_network(G)
-        for kw in keywords_df["word"].head(3):
-            get_example_posts_by_keyword(df, kw)
-
-        try:
-            top_links_list = top_links.index.tolist() if not top_links.empty else []
-            top_subreddits_list = df["subreddit"].value_counts().head(5).index.tolist()
-
-            spike_day ="2024-01-01"
-            if not top_links_list:
-                prominent_link = "example.com"
-            else:
-                prominent_link = top_links_list[0]
-
-            spike_day_safe = "2024-01-01"
-            spike_day, spike_posts = detect_flashpoints(df)
-            if spike_day is None:
-                spike_day = spike_day_safe
-            summary = summarize_insights(df, keywords_df, top_links_list, top_subreddits_list, prominent_link, spike_day) #needs to be defined
-            narrative = generate_narrative_story_with_examples(df, keywords_df, top_links_list, top_subreddits_list, model) #needs to be defined
-        except Exception as e:
-            print(f"Gemini integration error: {e}")
-            summary = "Gemini summary failed."
-            narrative = "Gemini narrative generation failed."
+        return charts.render_many([(plot_type, None) for plot_type, _, _ in REPORT_CHARTS], df, version, **context)
+    finally:
+        charts.close()
 
-        try:
-            with open("gemini_summary.txt", "w", encoding="utf-8") as f:
-                f.write(str(summary)) 
-        except Exception as e:
-            print(f"Error saving Gemini summary: {e}")
-
-        try:
-            with open("narrative_story_with_examples.txt", "w", encoding="utf-8") as f:
-                f.write(str(narrative)) 
-        except Exception as e:
-            print(f"Error saving narrative story: {e}")
+def render_report_charts(df, version, cache_dir="chart_cache"):
+    try:
+        images = report_chart_images(df, version, cache_dir)
+        for (_, path, alt), data in zip(REPORT_CHARTS, images):
+            write_chart_html(path, data, alt)
+        return images
+    except Exception as e:
+        print(f"Error rendering report charts: {e}")
+        return []
 
-        results = controversial_posts(df, top_n=5)
-        
-        if results:
-            print("Successfully processed controversial posts.")
-        else:
-            print("No controversial posts found or error occurred.")
+def load_posts(path):
+    df = preprocess(load_reddit_data(path))
+    if df.empty:
+        raise ValueError(f"No posts left after loading and preprocessing {path}")
+    return df
+
+def post_texts(df):
+    # Stages that only read the text are keyed on this projection, so a
+    # rerun where only scores or comment counts changed skips them.
+    return df[["id", "text"]]
+
+def report_summary(sentiment, keywords_df, top_links, top_subreddits, flashpoints, crossposting_matrix, domain_counts):
+    top_links_list = top_links.index.tolist() if not top_links.empty else []
+    prominent_link = top_links_list[0] if top_links_list else "example.com"
+    spike_day = flashpoints[0] if flashpoints[0] is not None else "2024-01-01"
+    # summarize_insights reads only the sentiment column and the row count
+    # once the cross-posting and domain tables are passed in.
+    return summarize_insights(sentiment.to_frame(), keywords_df, top_links_list, top_subreddits, prominent_link,
+                              spike_day, crossposting_matrix, domain_counts)
+
+def report_stages(path="reddit_data.jsonl", sentiment_store="sentiment_scores.db"):
+    # The report as a DAG of cached stages (see api/pipeline.py). Stages that
+    # call the LLM are keyed on the backend and model as well.
+    digest = file_digest(path) if os.path.exists(path) else None
+    llm = [os.getenv("LLM_BACKEND", "gemini"), os.getenv("LLM_MODEL_NAME", "gemini-2.0-flash")]
+    return [
+        Stage("posts", load_posts, kwargs={"path": path}, version=digest, hash_output=False),
+        Stage("texts", post_texts, ["posts"], store=False),
+        Stage("keyword_index", build_keyword_index, ["texts"], hash_output=False,
+              save=lambda index, file: index.save(file), load=InvertedIndex.load),
+        Stage("tfidf", tfidf_matrix, ["texts"], hash_output=False),
+        Stage("topics", lambda matrix: detect_topics_tfidf(None, matrix=matrix), ["tfidf"]),
+        Stage("sentiment", lambda texts: sentiment_analysis(texts.copy(), sentiment_store)["sentiment"], ["texts"]),
+        Stage("top_links", extract_top_links, ["posts"]),
+        Stage("top_subreddits", lambda df: df["subreddit"].value_counts().head(5).index.tolist(), ["posts"]),
+        Stage("flashpoints", detect_flashpoints, ["posts"]),
+        Stage("crossposting", subreddit_crossposting_network, ["posts"]),
+        Stage("domains", top_domains_by_subreddit, ["posts"]),
+        Stage("author_network", build_author_copost_network, ["posts"]),
+        Stage("charts", lambda df, graph: report_chart_images(df, "report", author_graph=graph),
+              ["posts", "author_network"], hash_output=False),
+        Stage("examples", lambda df, index, topics: [
+            get_example_posts_by_keyword(df, kw, index=index) for kw in topics["word"].head(3)
+        ], ["posts", "keyword_index", "topics"]),
+        # test_unused_functions adds columns to the frame it is given.
+        Stage("unused_checks", lambda df, index: test_unused_functions(df.copy(), index), ["posts", "keyword_index"],
+              version=llm),
+        Stage("summary", report_summary,
+              ["sentiment", "topics", "top_links", "top_subreddits", "flashpoints", "crossposting", "domains"],
+              cache_if=lambda text: text != "Error generating summary."),
+        Stage("narrative", lambda df, keywords_df, top_links, top_subreddits, crossposting_matrix, domain_counts:
+              generate_narrative_story_with_examples(
+                  df, keywords_df, top_links.index.tolist() if not top_links.empty else [], top_subreddits, get_model(),
+                  crossposting_matrix, domain_counts),
+              ["posts", "topics", "top_links", "top_subreddits", "crossposting", "domains"], version=llm,
+              cache_if=lambda text: text != "Error generating narrative."),
+        Stage("controversial", lambda df: controversial_posts(df, top_n=5), ["posts"]),
+    ]
+
+def write_report(pipeline, records):
+    status = {r["stage"]: r["status"] for r in records}
+
+    def output(name, default):
+        return pipeline.value(name) if status[name] in ("ran", "cached") else default
+
+    for (_, path, alt), data in zip(REPORT_CHARTS, output("charts", [])):
+        write_chart_html(path, data, alt)
+    try:
+        with open("gemini_summary.txt", "w", encoding="utf-8") as f:
+            f.write(str(output("summary", "Gemini summary failed.")))
+    except Exception as e:
+        print(f"Error saving Gemini summary: {e}")
 
+    try:
+        with open("narrative_story_with_examples.txt", "w", encoding="utf-8") as f:
+            f.write(str(output("narrative", "Gemini narrative generation failed.")))
+    except Exception as e:
+        print(f"Error saving narrative story: {e}")
 
-        # print("\nAnalysis complete. Results saved:\n- post_trends.html\n- top_subreddits.html\n- top_authors.html\n- author_network.html\n- gemini_summary.txt\n- narrative_story_with_examples.txt")
+    if output("controversial", []):
+        print("Successfully processed controversial posts.")
+    else:
+        print("No controversial posts found or error occurred.")
 
+def report(path="reddit_data.jsonl", cache_dir="pipeline_cache", workers=None, force=()):
+    # Reruns only the stages whose inputs or code changed since the last run
+    # and rewrites the report files. Returns one record per stage.
+    try:
+        pipeline = Pipeline(report_stages(path), cache_dir, workers or REPORT_WORKERS)
+        records = pipeline.run(force)
+        if records[0]["status"] == "failed":
+            print("Aborting due to empty DataFrame after loading.")
+            return records
+        write_report(pipeline, records)
+        return records
     except Exception as e:
         print(f"A critical error occurred: {e}")
+        return []
+
+def main(path="reddit_data.jsonl", cache_dir="pipeline_cache", workers=None, force=(), profile=True):
+    # Prints which stages ran or came from the cache and how long each took;
+    # with profile, also every timed step inside them, LLM calls and cache hits.
+    start = time.perf_counter()
+    with profiled() as stages:
+        records = report(path, cache_dir, workers, force)
+    print(format_records(records, time.perf_counter() - start))
+    if profile:
+        print(format_profile(stages))
+    return records
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the Reddit report, reusing cached stage outputs")
+    parser.add_argument("--data", default="reddit_data.jsonl")
+    parser.add_argument("--cache-dir", default="pipeline_cache")
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS)
+    parser.add_argument("--force", default="", help="comma-separated stages to rerun, or 'all'")
+    parser.add_argument("--no-profile", action="store_true")
+    parser.add_argument("--output", help="write the stage records as JSON")
+    args = parser.parse_args()
+    force = True if args.force == "all" else [name for name in args.force.split(",") if name]
+    records = main(args.data, args.cache_dir, args.workers, force, profile=not args.no_profile)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(records, f, indent=2)
@@ -0,0 +1,275 @@
+import contextvars
+import glob
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from api.metrics import stage as metric_stage
+
+
+class Stage:
+    # One node of a Pipeline: function(*dependency values, **kwargs) returns
+    # the stage's artifact. `version` is extra key material that is not passed
+    # to the function (a file digest, the LLM in use). store=False keeps only
+    # the stage's key and output hash, and recomputes the value when a later
+    # stage needs it. With hash_output the artifact is content-hashed, so
+    # stages after it are skipped when it comes out the same as last time;
+    # otherwise its key stands in for its content. cache_if(value) can refuse
+    # to persist a result, such as an LLM error message.
+    def __init__(self, name, function, deps=(), kwargs=None, version=None, store=True, hash_output=True,
+                 cache_if=None, save=None, load=None):
+        self.name = name
+        self.function = function
+        self.deps = tuple(deps)
+        self.kwargs = kwargs or {}
+        self.version = version
+        self.store = store
+        self.hash_output = hash_output
+        self.cache_if = cache_if
+        self.save = save
+        self.load = load
+
+
+def file_digest(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _update_hash(h, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        columns = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        dtypes = value.dtypes.tolist() if isinstance(value, pd.DataFrame) else [value.dtype]
+        h.update(repr((type(value).__name__, columns, [str(d) for d in dtypes])).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}:{len(value)}".encode())
+        for item in value:
+            _update_hash(h, item)
+    else:
+        h.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def content_hash(value):
+    # Frames and series are hashed row by row rather than pickled, so the
+    # same content gives the same hash however it was built.
+    h = hashlib.sha256()
+    _update_hash(h, value)
+    return h.hexdigest()
+
+
+def _code_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def _references(obj):
+    if inspect.ismodule(obj):
+        return list(vars(obj).values())
+    if inspect.isclass(obj):
+        return [ref for member in vars(obj).values() if inspect.isfunction(member) for ref in _references(member)]
+    if inspect.isfunction(obj):
+        return [obj.__globals__[name] for name in _code_names(obj.__code__) if name in obj.__globals__]
+    return []
+
+
+def _module_name(obj):
+    return obj.__name__ if inspect.ismodule(obj) else getattr(obj, "__module__", None) or ""
+
+
+_fingerprints = {}
+
+
+def code_fingerprint(function, package="api"):
+    # Hash of the function's source and of every function, class and module
+    # of `package` it reaches by global name, so editing a helper invalidates
+    # the stages that call it.
+    if function in _fingerprints:
+        return _fingerprints[function]
+    sources = {}
+    todo = [function]
+    while todo:
+        obj = todo.pop()
+        module = _module_name(obj)
+        if obj is not function and not (module == package or module.startswith(f"{package}.") or module == "__main__"):
+            continue
+        if not (inspect.ismodule(obj) or inspect.isclass(obj) or inspect.isfunction(obj)):
+            continue
+        name = module if inspect.ismodule(obj) else f"{module}.{obj.__qualname__}"
+        if name in sources:
+            continue
+        try:
+            sources[name] = inspect.getsource(obj)
+        except (OSError, TypeError):
+            sources[name] = name
+        todo.extend(_references(obj))
+    digest = hashlib.sha256(json.dumps(sorted(sources.items())).encode("utf-8")).hexdigest()
+    _fingerprints[function] = digest
+    return digest
+
+
+class Pipeline:
+    # Runs a DAG of Stages on a thread pool: a stage starts as soon as its
+    # dependencies are done, so independent stages overlap (LLM calls, the
+    # sentiment and chart process pools, NumPy and scikit-learn work). A
+    # stage's key hashes its code, kwargs, version and the output hashes of
+    # its dependencies; when it matches the manifest in cache_dir the stage
+    # is skipped, and its artifact is only loaded if a stage that does run
+    # needs it.
+    def __init__(self, stages, cache_dir="pipeline_cache", workers=4):
+        self.stages = {}
+        for s in stages:
+            missing = [dep for dep in s.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{s.name}' depends on {missing}, which must be declared before it")
+            if s.name in self.stages:
+                raise ValueError(f"Duplicate stage '{s.name}'")
+            self.stages[s.name] = s
+        self.cache_dir = cache_dir
+        self.workers = max(1, workers)
+        self.keys = {}
+        self.hashes = {}
+        self.values = {}
+        self.locks = {name: threading.Lock() for name in self.stages}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _manifest_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _artifact_path(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key[:16]}.pkl")
+
+    def _read_manifest(self, name):
+        try:
+            with open(self._manifest_path(name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_atomic(self, path, write):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write(tmp)
+        os.replace(tmp, path)
+
+    def _persist(self, s, key, output_hash, value, seconds):
+        if s.store:
+            path = self._artifact_path(s.name, key)
+            if s.save is not None:
+                self._write_atomic(path, lambda tmp: s.save(value, tmp))
+            else:
+                def dump(tmp):
+                    with open(tmp, "wb") as f:
+                        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                self._write_atomic(path, dump)
+        manifest = {"key": key, "output_hash": output_hash, "seconds": round(seconds, 3), "stored": s.store}
+
+        def write_manifest(tmp):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+        self._write_atomic(self._manifest_path(s.name), write_manifest)
+        for stale in glob.glob(os.path.join(self.cache_dir, f"{glob.escape(s.name)}-*.pkl")):
+            if not s.store or stale != self._artifact_path(s.name, key):
+                os.remove(stale)
+
+    def key(self, s):
+        parts = [s.name, code_fingerprint(s.function), s.kwargs, s.version, [self.hashes[dep] for dep in s.deps]]
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def value(self, name):
+        # The artifact of a finished stage: in memory if it ran, else read from
+        # cache_dir, or recomputed when the stage does not store its value.
+        with self.locks[name]:
+            if name not in self.values:
+                s = self.stages[name]
+                if s.store:
+                    path = self._artifact_path(name, self.keys[name])
+                    if s.load is not None:
+                        self.values[name] = s.load(path)
+                    else:
+                        with open(path, "rb") as f:
+                            self.values[name] = pickle.load(f)
+                else:
+                    self.values[name] = s.function(*[self.value(dep) for dep in s.deps], **s.kwargs)
+            return self.values[name]
+
+    def _run_stage(self, name, force):
+        s = self.stages[name]
+        start = time.perf_counter()
+        key = self.key(s)
+        self.keys[name] = key
+        manifest = None if force else self._read_manifest(name)
+        if (manifest is not None and manifest.get("key") == key
+                and (not s.store or os.path.exists(self._artifact_path(name, key)))):
+            self.hashes[name] = manifest["output_hash"]
+            return {"stage": name, "status": "cached", "seconds": time.perf_counter() - start, "key": key[:12]}
+
+        with metric_stage(f"pipeline.{name}"):
+            inputs = [self.value(dep) for dep in s.deps]
+            value = s.function(*inputs, **s.kwargs)
+        output_hash = content_hash(value) if s.hash_output else key
+        with self.locks[name]:
+            self.values[name] = value
+        self.hashes[name] = output_hash
+        if s.cache_if is None or s.cache_if(value):
+            self._persist(s, key, output_hash, value, time.perf_counter() - start)
+        return {"stage": name, "status": "ran", "seconds": time.perf_counter() - start, "key": key[:12]}
+
+    def run(self, force=()):
+        # force: stage names to rerun regardless of the cache, or True for all.
+        # Returns one record per stage, in declaration order. A stage that
+        # raises is "failed" and the stages that depend on it are "skipped".
+        pending = {name: set(s.deps) for name, s in self.stages.items()}
+        finished, failed, records, running = set(), set(), {}, {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pipeline") as pool:
+            while pending or running:
+                for name in [n for n, deps in pending.items() if deps <= finished]:
+                    del pending[name]
+                    broken = sorted(failed.intersection(self.stages[name].deps))
+                    if broken:
+                        records[name] = {"stage": name, "status": "skipped", "seconds": 0.0, "key": None,
+                                         "error": f"{broken[0]} failed"}
+                        failed.add(name)
+                        finished.add(name)
+                        continue
+                    # Each task gets a copy of the caller's context, so a
+                    # profiled() run also records what happens in the pool.
+                    future = pool.submit(contextvars.copy_context().run, self._run_stage, name,
+                                         force is True or name in force)
+                    running[future] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        records[name] = future.result()
+                    except Exception as e:
+                        print(f"Error in pipeline stage '{name}': {e}")
+                        records[name] = {"stage": name, "status": "failed", "seconds": 0.0, "key": None, "error": str(e)}
+                        failed.add(name)
+                    finished.add(name)
+        return [records[name] for name in self.stages]
+
+
+def format_records(records, total=None):
+    lines = [f"{'stage':<16} {'status':<8} {'seconds':>9}  key"]
+    for r in records:
+        lines.append(f"{r['stage']:<16} {r['status']:<8} {r['seconds']:>9.3f}  {r.get('key') or r.get('error', '')}")
+    counts = {}
+    for r in records:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+    lines.append(summary if total is None else f"{summary} in {total:.2f}s")
+    return "\n".join(lines)
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from api.columnar import POST_COLUMNS
+
+# Every character for which str.isspace() is true. The ASCII ones are matched
+# byte-wise below; the rest are rewritten to a plain space first.
+ASCII_WHITESPACE = b"\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f "
+NON_ASCII_WHITESPACE = "[\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]"
+WHITESPACE_BYTES = np.zeros(256, dtype=bool)
+WHITESPACE_BYTES[list(ASCII_WHITESPACE)] = True
+
+# Columns kept in the analytics frame; any other raw fields are dropped.
+DERIVED_COLUMNS = ["datetime", "text", "word_count", "domain"]
+# Repeated labels become categoricals with categories in order of first
+# appearance, so value_counts() ranks ties the same way as on object columns.
+# URLs are close to unique, so they are packed into one Arrow string buffer
+# instead of one Python object per row.
+CATEGORICAL_COLUMNS = ["author", "subreddit", "domain"]
+STRING_COLUMNS = ["url"]
+# int32 rather than the smallest type that fits, so arithmetic such as
+# score + 1 cannot wrap around. Epoch seconds fit in uint32 until 2106.
+INT_COLUMNS = {"score": np.int32, "num_comments": np.int32, "word_count": np.int32, "created_utc": np.uint32}
+
+# split('/')[2] of a URL: everything between the second and third slash.
+URL_HOST_PATTERN = r"^[^/]*/[^/]*/(?P<host>[^/]*)"
+
+
+def _to_arrow(values):
+    return pa.array(values.to_numpy(dtype=object), type=pa.large_string(), from_pandas=True)
+
+
+def _join_text(title, selftext):
+    title = pc.fill_null(title.cast(pa.large_string()), "")
+    selftext = pc.fill_null(selftext.cast(pa.large_string()), "")
+    return pc.binary_join_element_wise(title, selftext, pa.scalar(" ", pa.large_string()))
+
+
+def concat_text(df):
+    return _join_text(_to_arrow(df["title"]), _to_arrow(df["selftext"]))
+
+
+def word_count(text):
+    # Counts the starts of non-whitespace runs directly on the UTF-8 buffer,
+    # which equals len(x.split()) for every row without a per-row Python call.
+    if not isinstance(text, pa.Array):
+        text = pc.fill_null(_to_arrow(text), "")
+    if not pc.all(pc.string_is_ascii(text)).as_py():
+        text = pc.replace_substring_regex(text, NON_ASCII_WHITESPACE, " ")
+    offsets = np.frombuffer(text.buffers()[1], dtype=np.int64)[text.offset:text.offset + len(text) + 1]
+    data_buffer = text.buffers()[2]
+    if data_buffer is None or offsets[-1] == offsets[0]:
+        return np.zeros(len(text), dtype=np.int64)
+    data = np.frombuffer(data_buffer, dtype=np.uint8)[:offsets[-1]]
+    is_space = WHITESPACE_BYTES[data]
+    starts = ~is_space
+    starts[1:] &= is_space[:-1]
+    row_starts = offsets[:-1][offsets[:-1] < offsets[1:]]
+    starts[row_starts] = ~is_space[row_starts]
+    positions = np.flatnonzero(starts)
+    return np.searchsorted(positions, offsets[1:]) - np.searchsorted(positions, offsets[:-1])
+
+
+def extract_domain(urls):
+    # Same as `x.split('/')[2] if pd.notna(x) and "http" in x else None`, except
+    # that URLs with fewer than two slashes give None instead of raising.
+    try:
+        arr = _to_arrow(urls)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        urls = urls.astype(object).where(urls.map(lambda x: isinstance(x, str)), None)
+        arr = _to_arrow(urls)
+    hosts = _hosts(arr)
+    return pd.Series(hosts.to_numpy(zero_copy_only=False), index=urls.index, dtype=object)
+
+
+def _hosts(urls):
+    urls = urls.cast(pa.large_string())
+    hosts = pc.struct_field(pc.extract_regex(urls, URL_HOST_PATTERN), "host")
+    is_http = pc.fill_null(pc.match_substring(urls, "http"), False)
+    return pc.if_else(is_http, hosts, pa.scalar(None, pa.large_string()))
+
+
+def add_derived_columns(df):
+    df["datetime"] = pd.to_datetime(df["created_utc"], unit='s')
+    text = concat_text(df)
+    df["text"] = pd.Series(text.to_numpy(zero_copy_only=False), index=df.index, dtype=object)
+    df["word_count"] = pd.Series(word_count(text), index=df.index)
+    df["domain"] = extract_domain(df["url"])
+    return df
+
+
+def _categorical(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    codes, uniques = pd.factorize(values)
+    return pd.Series(pd.Categorical.from_codes(codes, uniques), index=values.index, name=values.name)
+
+
+def _downcast(values, dtype):
+    # Only whole, non-missing values that fit in `dtype` are converted.
+    if values.dtype == dtype or values.dtype.kind not in "iuf" or values.isna().any():
+        return values
+    info = np.iinfo(dtype)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        return values
+    if values.dtype.kind == "f" and not (values % 1 == 0).all():
+        return values
+    return values.astype(dtype)
+
+
+def compact_posts(df):
+    columns = {}
+    for column in POST_COLUMNS + DERIVED_COLUMNS:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if column in CATEGORICAL_COLUMNS:
+            values = _categorical(values)
+        elif column in STRING_COLUMNS and values.dtype == object:
+            values = values.astype("string[pyarrow]")
+        elif column in INT_COLUMNS:
+            values = _downcast(values, INT_COLUMNS[column])
+        columns[column] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def _arrow_categorical(values, name):
+    # dictionary_encode keeps first-seen order like pd.factorize, and the
+    # chunks of a ChunkedArray share one dictionary.
+    encoded = pc.dictionary_encode(values)
+    if isinstance(encoded, pa.ChunkedArray):
+        encoded = encoded.combine_chunks()
+    codes = pc.fill_null(encoded.indices, -1).to_numpy()
+    categories = pd.Index(encoded.dictionary.to_numpy(zero_copy_only=False), dtype=object)
+    return pd.Series(pd.Categorical.from_codes(codes, categories), name=name)
+
+
+def compact_from_arrow(table):
+    # compact_posts(add_derived_columns(table.to_pandas())) built column by
+    # column from the Arrow table, so the raw frame is never materialised:
+    # labels go straight to categoricals, URLs stay in Arrow buffers (memory
+    # mapped ones included) and title/selftext are only read to build text.
+    columns = {}
+    for column in POST_COLUMNS:
+        values = table.column(column)
+        if column in CATEGORICAL_COLUMNS:
+            columns[column] = _arrow_categorical(values, column)
+        elif column in STRING_COLUMNS:
+            columns[column] = pd.Series(pd.arrays.ArrowStringArray(values), name=column)
+        elif column in INT_COLUMNS:
+            columns[column] = _downcast(values.to_pandas(), INT_COLUMNS[column]).rename(column)
+        else:
+            columns[column] = values.to_pandas().rename(column)
+    columns["datetime"] = pd.to_datetime(table.column("created_utc").to_pandas(), unit='s').rename("datetime")
+    text = _join_text(table.column("title"), table.column("selftext"))
+    text = text.combine_chunks() if isinstance(text, pa.ChunkedArray) else text
+    columns["text"] = pd.Series(text.to_numpy(zero_copy_only=False), dtype=object, name="text")
+    columns["word_count"] = _downcast(pd.Series(word_count(text), name="word_count"), INT_COLUMNS["word_count"])
+    columns["domain"] = _arrow_categorical(_hosts(table.column("url")), "domain")
+    del text
+    # The joined text and the other scratch arrays are freed by now; hand
+    # their pages back instead of leaving them cached in Arrow's allocator.
+    pa.default_memory_pool().release_unused()
+    return pd.DataFrame(columns, copy=False)
+
+
+def append_posts(df, new_df):
+    # Both frames come from compact_posts. Categories are extended with labels
+    # seen for the first time so the result stays categorical.
+    new_df = compact_posts(new_df)
+    if df is None or df.empty:
+        return new_df.reset_index(drop=True)
+    if new_df.empty:
+        return df
+    df = df.copy(deep=False)
+    for column in CATEGORICAL_COLUMNS:
+        if column not in df.columns or column not in new_df.columns:
+            continue
+        old = df[column].cat.categories
+        categories = old.append(new_df[column].cat.categories.difference(old, sort=False))
+        df[column] = df[column].cat.set_categories(categories)
+        new_df[column] = new_df[column].cat.set_categories(categories)
+    return pd.concat([df, new_df], ignore_index=True)
@@ -0,0 +1,400 @@
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from api.inverted_index import keyword_mask
+
+# Each chart is split into a series step, which runs in the calling process on
+# the DataFrame and returns a small JSON-able dict, and a render step, which
+# turns that dict into a PNG in a worker process. Only the series crosses the
+# process boundary, and the JSON form can be drawn client-side instead.
+
+
+def _points(series):
+    return {"x": [str(x) for x in series.index], "y": [float(y) for y in series.values]}
+
+
+def post_trends_series(df, **context):
+    posts_per_day = df.groupby(df["datetime"].dt.date).size()
+    return {"kind": "line", "title": "Posts Over Time", "ylabel": "Number of Posts", "figsize": [10, 4],
+            **_points(posts_per_day)}
+
+
+def top_subreddits_series(df, top_n=10, **context):
+    top = df["subreddit"].value_counts().head(top_n)
+    return {"kind": "seaborn_barh", "title": f"Top {top_n} Subreddits by Post Count", "xlabel": "Post Count",
+            "figsize": [10, 4], **_points(top)}
+
+
+def top_authors_series(df, top_n=20, **context):
+    top = df["author"].value_counts().head(top_n)
+    return {"kind": "barh", "title": f"Top {top_n} Authors by Post Count", "figsize": [8, 6], **_points(top)}
+
+
+def author_network_series(df, num_nodes=50, min_shared_urls=2, author_graph=None, **context):
+    # author_graph: a co-post network of df built with the same min_shared_urls.
+    from api.sparse_networks import build_author_copost_network
+    G = build_author_copost_network(df, min_shared_urls) if author_graph is None else author_graph
+    degrees = dict(G.degree())
+    top_nodes = sorted(degrees, key=degrees.get, reverse=True)[:num_nodes]
+    H = G.subgraph(top_nodes)
+    return {
+        "kind": "network", "figsize": [10, 10],
+        "nodes": [{"id": str(n), "degree": int(degrees[n])} for n in H.nodes()],
+        "edges": [[str(u), str(v), int(d.get("weight", 1))] for u, v, d in H.edges(data=True)],
+    }
+
+
+def topic_rise_series(df, keyword, index=None, **context):
+    matches = df[keyword_mask(df, keyword, index)]
+    grouped = matches.groupby([matches["datetime"].dt.date, "subreddit"], observed=True).size().unstack(fill_value=0)
+    return {
+        "kind": "multiline", "title": f"Mentions of '{keyword}' Across Subreddits Over Time", "ylabel": "Mentions",
+        "figsize": [12, 5], "x": [str(x) for x in grouped.index],
+        "series": {str(name): [int(v) for v in grouped[name].values] for name in grouped.columns},
+    }
+
+
+def sentiment_shift_series(df, keyword, index=None, sentiment=None, **context):
+    mask = keyword_mask(df, keyword, index)
+    scores = _sentiment(df, sentiment)[mask]
+    weeks = df.loc[mask, "datetime"].dt.to_period("W").dt.start_time
+    by_week = scores.groupby(weeks).mean()
+    return {"kind": "line", "title": f"Sentiment Over Time for '{keyword}'", "ylabel": "Average Sentiment",
+            "figsize": [10, 4], **_points(by_week)}
+
+
+def sentiment_by_link_series(df, link_keyword, sentiment=None, **context):
+    mask = df["url"].str.contains(link_keyword, na=False, case=False).to_numpy()
+    scores = _sentiment(df, sentiment)[mask]
+    grouped = scores.groupby(df.loc[mask, "subreddit"], observed=True).mean().sort_values(ascending=False)
+    return {"kind": "bar", "title": f"Sentiment by Subreddit for link: '{link_keyword}'",
+            "ylabel": "Average Sentiment", "figsize": [10, 4], **_points(grouped)}
+
+
+def _sentiment(df, sentiment):
+    if "sentiment" in df.columns:
+        return df["sentiment"]
+    if sentiment is None:
+        raise ValueError("Chart needs a 'sentiment' column or a sentiment source")
+    return sentiment(df)
+
+
+# plot type -> (series function, default parameters). Parameters are part of
+# the cache key; anything passed through **context (index, sentiment) is not.
+CHARTS = {
+    "post_trends": (post_trends_series, {}),
+    "top_subreddits": (top_subreddits_series, {"top_n": 10}),
+    "top_authors": (top_authors_series, {"top_n": 20}),
+    "author_network": (author_network_series, {"num_nodes": 50, "min_shared_urls": 2}),
+    "topic_rise": (topic_rise_series, {"keyword": None}),
+    "sentiment_shift": (sentiment_shift_series, {"keyword": None}),
+    "sentiment_by_link": (sentiment_by_link_series, {"link_keyword": None}),
+}
+
+
+def chart_params(plot_type, params=None):
+    if plot_type not in CHARTS:
+        raise ValueError(f"Unknown plot type '{plot_type}'. Use one of {sorted(CHARTS)}")
+    defaults = CHARTS[plot_type][1]
+    params = {k: v for k, v in (params or {}).items() if v is not None}
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown parameters for '{plot_type}': {sorted(unknown)}")
+    merged = {**defaults, **params}
+    missing = [k for k, v in merged.items() if v is None]
+    if missing:
+        raise ValueError(f"Missing parameters for '{plot_type}': {missing}")
+    return merged
+
+
+def chart_series(plot_type, df, params=None, **context):
+    params = chart_params(plot_type, params)
+    return CHARTS[plot_type][0](df, **params, **context)
+
+
+def _warm_worker():
+    # Plotting imports dominate a worker's first render; pay them at start-up.
+    import matplotlib.figure
+    import networkx
+    import seaborn
+
+
+def render_png(series):
+    # Object-oriented matplotlib on a fresh Figure, so renders do not share
+    # pyplot's global state and can run in any thread or process.
+    from io import BytesIO
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=tuple(series["figsize"]))
+    ax = fig.subplots()
+    kind = series["kind"]
+    if kind == "line":
+        ax.plot(series["x"], series["y"])
+    elif kind == "multiline":
+        for name, values in series["series"].items():
+            ax.plot(series["x"], values, label=name)
+        if series["series"]:
+            ax.legend(title="subreddit")
+    elif kind == "bar":
+        ax.bar(series["x"], series["y"])
+        ax.tick_params(axis="x", labelrotation=90)
+    elif kind == "barh":
+        ax.barh(series["x"], series["y"])
+        ax.invert_yaxis()
+    elif kind == "seaborn_barh":
+        import seaborn as sns
+        sns.barplot(x=series["y"], y=series["x"], ax=ax)
+    elif kind == "network":
+        import networkx as nx
+        H = nx.Graph()
+        H.add_nodes_from(node["id"] for node in series["nodes"])
+        H.add_weighted_edges_from(series["edges"])
+        pos = nx.spring_layout(H, k=0.5, seed=0)
+        nx.draw_networkx_nodes(H, pos, ax=ax, node_size=[node["degree"] * 50 for node in series["nodes"]])
+        nx.draw_networkx_edges(H, pos, ax=ax, alpha=0.3)
+        nx.draw_networkx_labels(H, pos, ax=ax, font_size=8)
+        ax.axis("off")
+    else:
+        raise ValueError(f"Unknown chart kind '{kind}'")
+    if kind in ("line", "multiline") and len(series["x"]) > 10:
+        ax.set_xticks(ax.get_xticks()[::max(1, len(series["x"]) // 10)])
+        ax.tick_params(axis="x", labelrotation=30)
+    if "title" in series:
+        ax.set_title(series["title"])
+    if "xlabel" in series:
+        ax.set_xlabel(series["xlabel"])
+    if "ylabel" in series:
+        ax.set_ylabel(series["ylabel"])
+    fig.tight_layout()
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def render_chart(plot_type, df, params=None, **context):
+    # Uncached, in-process render returning a base64 PNG.
+    png = render_png(chart_series(plot_type, df, params, **context))
+    return base64.b64encode(png).decode("ascii")
+
+
+def chart_key(version, plot_type, params):
+    raw = json.dumps([version, plot_type, params], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RenderService:
+    # Charts cached by (dataset version, plot type, parameters) in an LRU in
+    # memory and, with cache_dir, as files on disk. The disk cache holds at
+    # most max_disk_entries files; beyond that the least recently used are
+    # deleted (reads touch their file), which also clears out the charts of
+    # earlier dataset versions. Misses are rendered in a spawn process pool
+    # (workers=0 renders in the calling thread), and a chart already being
+    # rendered is shared rather than rendered twice.
+    def __init__(self, cache_dir=None, max_entries=256, workers=None, sentiment=None, max_disk_entries=2048):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.sentiment = sentiment
+        self.images = OrderedDict()
+        self.series_cache = OrderedDict()
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.pool = None
+        self.lock = threading.Lock()
+        self.prune_lock = threading.Lock()
+        self.disk_entries = 0
+        self.evicted = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.disk_entries = len(self._disk_files())
+
+    def _remember(self, store, key, value):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.max_entries:
+            store.popitem(last=False)
+
+    def _disk_path(self, key, suffix):
+        return os.path.join(self.cache_dir, f"{key}{suffix}") if self.cache_dir else None
+
+    def _disk_files(self):
+        with os.scandir(self.cache_dir) as entries:
+            return [e for e in entries if e.is_file() and e.name.endswith((".png", ".json"))]
+
+    def _read_disk(self, key, suffix):
+        # Called without self.lock held. A file may be evicted at any time, so
+        # a failed read is a miss.
+        path = self._disk_path(key, suffix)
+        if not path:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def _write_disk(self, key, suffix, data):
+        path = self._disk_path(key, suffix)
+        if path:
+            existed = os.path.exists(path)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            if not existed:
+                with self.lock:
+                    self.disk_entries += 1
+                    full = self.disk_entries > self.max_disk_entries
+                if full:
+                    self._prune_disk()
+
+    def _prune_disk(self):
+        # Deletes the least recently used files down to 90% of the cap, so
+        # the directory is listed once per many writes rather than every one.
+        if not self.prune_lock.acquire(blocking=False):
+            return
+        try:
+            files = []
+            for entry in self._disk_files():
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+            files.sort()
+            excess = len(files) - int(self.max_disk_entries * 0.9)
+            removed = 0
+            for _, path in files[:max(0, excess)]:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            with self.lock:
+                self.disk_entries = len(files) - removed
+                self.evicted += removed
+        finally:
+            self.prune_lock.release()
+
+    def _get_pool(self):
+        if self.pool is None:
+            context = multiprocessing.get_context("spawn")
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_warm_worker)
+        return self.pool
+
+    def series(self, plot_type, df, version, params=None, **context):
+        params = chart_params(plot_type, params)
+        key = chart_key(version, plot_type, params)
+        with self.lock:
+            if key in self.series_cache:
+                self.series_cache.move_to_end(key)
+                return self.series_cache[key]
+        raw = self._read_disk(key, ".json")
+        series = json.loads(raw) if raw is not None else CHARTS[plot_type][0](
+            df, **params, sentiment=self.sentiment, **context
+        )
+        if raw is None:
+            self._write_disk(key, ".json", json.dumps(series).encode("utf-8"))
+        with self.lock:
+            self._remember(self.series_cache, key, series)
+        return series
+
+    def render_many(self, requests, df, version, **context):
+        # requests is a list of (plot_type, params); returns base64 PNGs in the
+        # same order. Series for all misses are computed first, then rendered
+        # together so they spread across the pool.
+        keys = []
+        for plot_type, params in requests:
+            params = chart_params(plot_type, params)
+            keys.append((plot_type, params, chart_key(version, plot_type, params)))
+
+        images = {}
+        waiting = {}
+        owned = {}
+        for plot_type, params, key in keys:
+            if key in images or key in waiting or key in owned:
+                continue
+            with self.lock:
+                if key in self.images:
+                    self.images.move_to_end(key)
+                    self.hits += 1
+                    images[key] = self.images[key]
+                    continue
+                if key in self.inflight:
+                    self.hits += 1
+                    waiting[key] = self.inflight[key]
+                    continue
+                future = Future()
+                self.inflight[key] = future
+            # The disk is read outside the lock; the inflight entry stops
+            # other requests from rendering the same chart meanwhile.
+            disk = self._read_disk(key, ".png")
+            if disk is not None:
+                images[key] = base64.b64encode(disk).decode("ascii")
+                with self.lock:
+                    self.hits += 1
+                    self._remember(self.images, key, images[key])
+                    del self.inflight[key]
+                future.set_result(images[key])
+                continue
+            with self.lock:
+                self.misses += 1
+            owned[key] = (plot_type, params, future)
+
+        try:
+            renders = {}
+            for key, (plot_type, params, future) in owned.items():
+                series = self.series(plot_type, df, version, params, **context)
+                if self.workers == 0:
+                    renders[key] = render_png(series)
+                else:
+                    renders[key] = self._get_pool().submit(render_png, series)
+            for key, (_, _, future) in owned.items():
+                png = renders[key] if isinstance(renders[key], bytes) else renders[key].result()
+                self._write_disk(key, ".png", png)
+                images[key] = base64.b64encode(png).decode("ascii")
+                with self.lock:
+                    self._remember(self.images, key, images[key])
+                    del self.inflight[key]
+                future.set_result(images[key])
+        except Exception as e:
+            with self.lock:
+                for key, (_, _, future) in owned.items():
+                    if self.inflight.get(key) is future:
+                        del self.inflight[key]
+                    if not future.done():
+                        future.set_exception(e)
+            raise
+
+        for key, future in waiting.items():
+            images[key] = future.result()
+        return [images[key] for _, _, key in keys]
+
+    def render(self, plot_type, df, version, params=None, **context):
+        return self.render_many([(plot_type, params)], df, version, **context)[0]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "images": len(self.images),
+                "series": len(self.series_cache),
+                "disk_entries": self.disk_entries,
+                "disk_evicted": self.evicted,
+                "inflight": len(self.inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "workers": self.workers,
+            }
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
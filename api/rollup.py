@@ -0,0 +1,278 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+GRANULARITIES = ("day", "week", "month")
+METRICS = ["posts", "score_sum", "comments_sum", "sentiment_sum", "sentiment_posts"]
+CELL = ["day", "subreddit"]
+
+
+def _days(created_utc):
+    return (pd.to_numeric(created_utc, errors="coerce").fillna(0) // 86400).astype(np.int64)
+
+
+def _sums(values):
+    # Compact frames hold int32 counts; cell totals are kept in 64 bits.
+    values = pd.to_numeric(values, errors="coerce").fillna(0)
+    return values.astype(np.int64 if values.dtype.kind in "iu" else np.float64).to_numpy()
+
+
+def _period_labels(days, granularity):
+    # "YYYY-MM-DD" of each day's period start (Monday for weeks), computed once
+    # per distinct day and broadcast back to the rows.
+    unique, inverse = np.unique(np.asarray(days, dtype=np.int64), return_inverse=True)
+    dates = pd.Series(pd.to_datetime(unique * 86400, unit="s"))
+    if granularity != "day":
+        dates = dates.dt.to_period("W" if granularity == "week" else "M").dt.start_time
+    labels = dates.dt.strftime("%Y-%m-%d").to_numpy()
+    return pd.Series(labels[inverse], index=getattr(days, "index", None))
+
+
+def _day_number(value):
+    return None if value is None else int(pd.Timestamp(value).timestamp() // 86400)
+
+
+def _grow(array, size):
+    # Doubles the array's capacity until it holds `size` rows.
+    if size <= len(array):
+        return array
+    grown = np.zeros((max(size, 2 * len(array), 16),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class RollupCube:
+    # Pre-aggregated day x subreddit cells holding post counts, score, comment
+    # and sentiment sums, plus the term_limit most frequent terms of each cell.
+    # Queries filter and regroup cells, never posts, to day, week or month.
+    # add() folds in a new batch of posts by summing into the touched cells:
+    # cells are rows of growable arrays found through a (day, subreddit) dict,
+    # and each cell's terms are one block of rows in append-only term arrays.
+    # A touched cell's block is marked dead and its merged terms appended;
+    # dead rows are compacted away once they outnumber live ones, so an
+    # append costs the touched cells and term rows, not the whole cube.
+    #
+    # Term counts are exact while a term stays in its cell's top list; a term
+    # that drops out of it loses its count, so rare per-cell terms are
+    # under-counted in long ranges.
+    def __init__(self, term_limit=100, stop_words="english"):
+        self.term_limit = term_limit
+        self.stop_words = stop_words
+        self.cell_rows = {}
+        self.cell_days = np.zeros(0, dtype=np.int64)
+        self.cell_subreddits = np.zeros(0, dtype=object)
+        self.metrics = np.zeros((0, len(METRICS)), dtype=np.float64)
+        self.term_blocks = {}
+        self.term_days = np.zeros(0, dtype=np.int64)
+        self.term_subreddits = np.zeros(0, dtype=object)
+        self.term_words = np.zeros(0, dtype=object)
+        self.term_counts = np.zeros(0, dtype=np.int64)
+        self.term_live = np.zeros(0, dtype=bool)
+        self.term_size = 0
+        self.dead_terms = 0
+        self.posts = 0
+        self.lock = threading.Lock()
+
+    def _cell_terms(self, days, subreddits, texts):
+        from sklearn.feature_extraction.text import CountVectorizer
+        vectorizer = CountVectorizer(stop_words=self.stop_words)
+        try:
+            counts = vectorizer.fit_transform(texts.fillna("").astype(str))
+        except ValueError:
+            return self._term_frame(np.zeros(0, dtype=np.int64))
+        cell_codes, cell_keys = pd.factorize(pd.MultiIndex.from_arrays([days, subreddits]))
+        indicator = sparse.csr_matrix(
+            (np.ones(len(cell_codes), dtype=np.int64), (cell_codes, np.arange(len(cell_codes)))),
+            shape=(len(cell_keys), len(cell_codes)),
+        )
+        per_cell = (indicator @ counts).tocoo()
+        vocabulary = vectorizer.get_feature_names_out()
+        long = pd.DataFrame({
+            "day": cell_keys.get_level_values(0).to_numpy()[per_cell.row],
+            "subreddit": cell_keys.get_level_values(1).to_numpy()[per_cell.row],
+            "term": vocabulary[per_cell.col],
+            "count": per_cell.data.astype(np.int64),
+        })
+        return self._truncate(long)
+
+    def _truncate(self, long):
+        long = long.sort_values(["day", "subreddit", "count", "term"], ascending=[True, True, False, True])
+        return long.groupby(CELL, sort=False).head(self.term_limit).reset_index(drop=True)
+
+    def add(self, df, sentiment=None):
+        if len(df) == 0:
+            return
+        days = _days(df["created_utc"]).to_numpy()
+        subreddits = df["subreddit"].astype(object).fillna("").astype(str).to_numpy()
+        scores = sentiment if sentiment is not None else df.get("sentiment")
+        batch = pd.DataFrame({
+            "day": days,
+            "subreddit": subreddits,
+            "posts": 1,
+            "score_sum": _sums(df["score"]),
+            "comments_sum": _sums(df["num_comments"]),
+            "sentiment_sum": 0.0 if scores is None else pd.Series(scores).fillna(0).to_numpy(),
+            "sentiment_posts": 0 if scores is None else pd.Series(scores).notna().astype(int).to_numpy(),
+        })
+        cells = batch.groupby(CELL).sum()
+        text = df["text"] if "text" in df.columns else df["title"].fillna("") + " " + df["selftext"].fillna("")
+        terms = self._cell_terms(days, subreddits, text.reset_index(drop=True))
+
+        with self.lock:
+            self._add_cells(cells)
+            if len(terms):
+                self._add_terms(terms)
+            self.posts += len(df)
+
+    def _add_cells(self, cells):
+        rows = np.empty(len(cells), dtype=np.int64)
+        for i, key in enumerate(cells.index):
+            row = self.cell_rows.get(key)
+            if row is None:
+                row = self.cell_rows[key] = len(self.cell_rows)
+            rows[i] = row
+        size = len(self.cell_rows)
+        self.cell_days = _grow(self.cell_days, size)
+        self.cell_subreddits = _grow(self.cell_subreddits, size)
+        self.metrics = _grow(self.metrics, size)
+        self.cell_days[rows] = cells.index.get_level_values("day").to_numpy()
+        self.cell_subreddits[rows] = cells.index.get_level_values("subreddit").to_numpy()
+        np.add.at(self.metrics, rows, cells[METRICS].to_numpy(dtype=np.float64))
+
+    def _term_frame(self, rows):
+        return pd.DataFrame({"day": self.term_days[rows], "subreddit": self.term_subreddits[rows],
+                             "term": self.term_words[rows], "count": self.term_counts[rows]})
+
+    def _add_terms(self, terms):
+        # Merges the batch's per-cell terms with the touched cells' current
+        # blocks, then appends the truncated result as their new blocks.
+        touched = list(terms[CELL].drop_duplicates().itertuples(index=False, name=None))
+        blocks = [self.term_blocks[key] for key in touched if key in self.term_blocks]
+        old = np.concatenate([np.arange(start, stop) for start, stop in blocks]) if blocks else np.zeros(0, dtype=np.int64)
+        merged = terms
+        if len(old):
+            self.term_live[old] = False
+            self.dead_terms += len(old)
+            merged = pd.concat([self._term_frame(old), terms]).groupby(CELL + ["term"], as_index=False)["count"].sum()
+        merged = self._truncate(merged)
+        start = self.term_size
+        stop = start + len(merged)
+        self.term_days = _grow(self.term_days, stop)
+        self.term_subreddits = _grow(self.term_subreddits, stop)
+        self.term_words = _grow(self.term_words, stop)
+        self.term_counts = _grow(self.term_counts, stop)
+        self.term_live = _grow(self.term_live, stop)
+        self.term_days[start:stop] = merged["day"].to_numpy()
+        self.term_subreddits[start:stop] = merged["subreddit"].to_numpy()
+        self.term_words[start:stop] = merged["term"].to_numpy()
+        self.term_counts[start:stop] = merged["count"].to_numpy()
+        self.term_live[start:stop] = True
+        self.term_size = stop
+        # _truncate sorts by cell, so each cell's rows are contiguous.
+        codes, keys = pd.factorize(pd.MultiIndex.from_arrays([merged["day"], merged["subreddit"]]), sort=False)
+        bounds = np.flatnonzero(np.diff(codes, prepend=-1, append=-1)) + start
+        for key, block_start, block_stop in zip(keys, bounds[:-1], bounds[1:]):
+            self.term_blocks[key] = (int(block_start), int(block_stop))
+        if self.dead_terms > self.term_size - self.dead_terms:
+            self._compact_terms()
+
+    def _compact_terms(self):
+        live = np.flatnonzero(self.term_live[:self.term_size])
+        offsets = np.cumsum(self.term_live[:self.term_size]) - 1
+        self.term_days = self.term_days[live]
+        self.term_subreddits = self.term_subreddits[live]
+        self.term_words = self.term_words[live]
+        self.term_counts = self.term_counts[live]
+        self.term_live = np.ones(len(live), dtype=bool)
+        self.term_blocks = {key: (int(offsets[start]), int(offsets[stop - 1]) + 1)
+                            for key, (start, stop) in self.term_blocks.items()}
+        self.term_size = len(live)
+        self.dead_terms = 0
+
+    def _cells_frame(self):
+        size = len(self.cell_rows)
+        frame = pd.DataFrame(self.metrics[:size], columns=METRICS)
+        frame.insert(0, "subreddit", self.cell_subreddits[:size])
+        frame.insert(0, "day", self.cell_days[:size])
+        return frame
+
+    def _terms_frame(self):
+        return self._term_frame(np.flatnonzero(self.term_live[:self.term_size]))
+
+    def _select(self, frame, start, end, subreddits):
+        days = frame["day"]
+        names = frame["subreddit"]
+        mask = np.ones(len(frame), dtype=bool)
+        if start is not None:
+            mask &= np.asarray(days >= _day_number(start))
+        if end is not None:
+            mask &= np.asarray(days <= _day_number(end))
+        if subreddits:
+            mask &= np.asarray(pd.Index(names).isin(subreddits))
+        return frame[mask]
+
+    def query(self, granularity="day", start=None, end=None, subreddits=None, by_subreddit=False, top_terms=0):
+        # One row per period (and subreddit with by_subreddit) with summed
+        # metrics, avg_score, avg_sentiment and, with top_terms, its top terms.
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity '{granularity}'. Use one of {list(GRANULARITIES)}")
+        with self.lock:
+            cells = self._cells_frame()
+            terms = self._terms_frame() if top_terms else None
+        cells = self._select(cells, start, end, subreddits)
+        terms = self._select(terms, start, end, subreddits) if top_terms else None
+        keys = ["period", "subreddit"] if by_subreddit else ["period"]
+        if cells.empty:
+            return []
+        cells["period"] = _period_labels(cells["day"], granularity)
+        rows = cells.groupby(keys)[METRICS].sum().reset_index()
+        rows["avg_score"] = (rows["score_sum"] / rows["posts"]).round(3)
+        rows["avg_sentiment"] = (rows["sentiment_sum"] / rows["sentiment_posts"].where(rows["sentiment_posts"] > 0)).round(4)
+        for column in ["posts", "score_sum", "comments_sum", "sentiment_posts"]:
+            rows[column] = rows[column].astype(np.int64)
+        rows["sentiment_sum"] = rows["sentiment_sum"].astype(float).round(4)
+        result = rows.astype(object).where(rows.notna(), None).to_dict(orient="records")
+        if top_terms and terms is not None and len(terms):
+            terms = terms.assign(period=_period_labels(terms["day"], granularity))
+            summed = terms.groupby(keys + ["term"], as_index=False)["count"].sum()
+            summed = summed.sort_values(keys + ["count", "term"], ascending=[True] * len(keys) + [False, True])
+            top = summed.groupby(keys, sort=False).head(top_terms)
+            lookup = {}
+            for record in top.to_dict(orient="records"):
+                key = tuple(record[k] for k in keys)
+                lookup.setdefault(key, []).append({"word": record["term"], "count": int(record["count"])})
+            for row in result:
+                row["top_terms"] = lookup.get(tuple(row[k] for k in keys), [])
+        return result
+
+    def subreddit_totals(self, start=None, end=None, top_n=10):
+        with self.lock:
+            cells = self._cells_frame()
+        cells = self._select(cells, start, end, None)
+        totals = cells.groupby("subreddit")["posts"].sum().sort_values(ascending=False, kind="stable")
+        return {name: int(count) for name, count in totals.head(top_n).items()}
+
+    def term_series(self, term, granularity="day", start=None, end=None, subreddits=None):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity '{granularity}'. Use one of {list(GRANULARITIES)}")
+        with self.lock:
+            terms = self._terms_frame()
+        terms = self._select(terms, start, end, subreddits)
+        terms = terms[terms["term"] == term.lower()]
+        periods = _period_labels(terms["day"], granularity)
+        return {period: int(count) for period, count in terms.groupby(periods)["count"].sum().items()}
+
+    def stats(self):
+        with self.lock:
+            return {"posts": self.posts, "cells": len(self.cell_rows), "term_rows": self.term_size - self.dead_terms,
+                    "term_limit": self.term_limit}
+
+
+def build_rollup(df, sentiment=None, term_limit=100, batch_size=200000):
+    cube = RollupCube(term_limit=term_limit)
+    for start in range(0, len(df), batch_size):
+        chunk = df.iloc[start:start + batch_size]
+        cube.add(chunk, None if sentiment is None else sentiment.iloc[start:start + batch_size])
+    return cube
@@ -0,0 +1,89 @@
+import json
+import os
+import sqlite3
+import threading
+
+
+class SeenIndex:
+    # Persistent dedupe index for the post archive. IDs live in an SQLite table
+    # keyed by post id, and the archive byte offset that has been indexed is kept
+    # alongside them so startup only has to scan lines appended since last run.
+    def __init__(self, db_path, archive_path=None):
+        self.db_path = db_path
+        self.archive_path = archive_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen_ids (id TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        if archive_path:
+            self.sync_with_archive()
+
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def sync_with_archive(self):
+        with self.lock:
+            if not os.path.exists(self.archive_path):
+                return
+            size = os.path.getsize(self.archive_path)
+            offset = int(self._get_meta("archive_offset", 0))
+            if size < offset:
+                # Archive was truncated or replaced, so the indexed offset is meaningless.
+                self.conn.execute("DELETE FROM seen_ids")
+                offset = 0
+            if size == offset:
+                return
+            batch = []
+            with open(self.archive_path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    try:
+                        post_id = json.loads(line).get("id")
+                    except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+                        continue
+                    if post_id:
+                        batch.append((post_id,))
+                    if len(batch) >= 50000:
+                        self.conn.executemany("INSERT OR IGNORE INTO seen_ids (id) VALUES (?)", batch)
+                        batch = []
+            if batch:
+                self.conn.executemany("INSERT OR IGNORE INTO seen_ids (id) VALUES (?)", batch)
+            self._set_meta("archive_offset", offset)
+            self.conn.commit()
+
+    def __contains__(self, post_id):
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM seen_ids WHERE id = ?", (post_id,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM seen_ids").fetchone()[0]
+
+    def filter_new(self, post_ids):
+        with self.lock:
+            return [
+                post_id for post_id in post_ids
+                if self.conn.execute("SELECT 1 FROM seen_ids WHERE id = ?", (post_id,)).fetchone() is None
+            ]
+
+    def add_many(self, post_ids, archive_offset=None):
+        with self.lock:
+            self.conn.executemany("INSERT OR IGNORE INTO seen_ids (id) VALUES (?)", [(i,) for i in post_ids])
+            if archive_offset is not None:
+                self._set_meta("archive_offset", archive_offset)
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
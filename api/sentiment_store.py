@@ -0,0 +1,134 @@
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+_sia = None
+
+
+def ensure_vader_lexicon():
+    import nltk
+    try:
+        nltk.data.find("sentiment/vader_lexicon.zip")
+    except LookupError:
+        nltk.download("vader_lexicon", quiet=True)
+
+
+def _get_analyzer():
+    global _sia
+    if _sia is None:
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        _sia = SentimentIntensityAnalyzer()
+    return _sia
+
+
+def _score_chunk(texts):
+    sia = _get_analyzer()
+    return [sia.polarity_scores(text)["compound"] for text in texts]
+
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=8).hexdigest()
+
+
+class SentimentStore:
+    # VADER compound scores persisted in SQLite, keyed by post id together with
+    # a hash of the scored text, so an edited post is scored again.
+    def __init__(self, db_path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores (id TEXT PRIMARY KEY, text_hash TEXT, compound REAL) WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        with self.lock:
+            for i in range(0, len(keys), 900):
+                batch = keys[i:i + 900]
+                placeholders = ",".join("?" for _ in batch)
+                for key, digest, compound in self.conn.execute(
+                    f"SELECT id, text_hash, compound FROM scores WHERE id IN ({placeholders})", batch
+                ):
+                    found[key] = (digest, compound)
+        return found
+
+    def put_many(self, rows):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scores (id, text_hash, compound) VALUES (?, ?, ?)", rows
+            )
+            self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def score_posts(df, store, workers=None, chunk_size=2000, text_column="text"):
+    # Returns compound scores aligned with df. Only posts whose id is new or
+    # whose text hash changed are scored, in chunks across a process pool;
+    # small batches are scored in-process to skip the pool start-up cost.
+    texts = df[text_column].fillna("").astype(str).tolist()
+    hashes = [text_hash(text) for text in texts]
+    if "id" in df.columns:
+        keys = [str(k) if pd.notna(k) else f"h:{h}" for k, h in zip(df["id"].tolist(), hashes)]
+    else:
+        keys = [f"h:{h}" for h in hashes]
+
+    known = store.get_many(set(keys))
+    scores = np.empty(len(df), dtype=float)
+    todo = []
+    for i, (key, digest) in enumerate(zip(keys, hashes)):
+        hit = known.get(key)
+        if hit is not None and hit[0] == digest:
+            scores[i] = hit[1]
+        else:
+            todo.append(i)
+
+    if todo:
+        ensure_vader_lexicon()
+        chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+        workers = workers or os.cpu_count() or 1
+        if len(chunks) == 1 or workers == 1:
+            results = [_score_chunk([texts[i] for i in chunk]) for chunk in chunks]
+        else:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as pool:
+                results = list(pool.map(_score_chunk, ([texts[i] for i in chunk] for chunk in chunks)))
+        rows = []
+        for chunk, chunk_scores in zip(chunks, results):
+            for i, compound in zip(chunk, chunk_scores):
+                scores[i] = compound
+                rows.append((keys[i], hashes[i], compound))
+        store.put_many(rows)
+
+    return pd.Series(scores, index=df.index, name="sentiment")
+
+
+def sentiment_breakdown(scores):
+    total = len(scores)
+    if total == 0:
+        return {"positive": 0.0, "neutral": 0.0, "negative": 0.0}
+    positive = int((scores >= POSITIVE_THRESHOLD).sum())
+    negative = int((scores <= NEGATIVE_THRESHOLD).sum())
+    return {
+        "positive": round(100 * positive / total, 1),
+        "neutral": round(100 * (total - positive - negative) / total, 1),
+        "negative": round(100 * negative / total, 1),
+    }
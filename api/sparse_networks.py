@@ -0,0 +1,118 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def _factorize(values):
+    # Categorical columns are coded by their sorted labels, as object ones are.
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.cat.remove_unused_categories()
+        values = values.cat.reorder_categories(values.cat.categories.sort_values())
+    return pd.factorize(values, sort=True)
+
+
+def incidence_matrix(df, row_column, col_column, binary=True):
+    # Sparse row_column x col_column contingency matrix plus its row/column
+    # labels; binary=True keeps presence only, as groupby(...).unique() does.
+    pairs = df[[row_column, col_column]].dropna()
+    row_codes, row_labels = _factorize(pairs[row_column])
+    col_codes, col_labels = _factorize(pairs[col_column])
+    matrix = sparse.coo_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (row_codes, col_codes)),
+        shape=(len(row_labels), len(col_labels)),
+    ).tocsr()
+    matrix.sum_duplicates()
+    if binary:
+        matrix.data[:] = 1
+    return matrix, np.asarray(row_labels), np.asarray(col_labels)
+
+
+class SparseContingency:
+    # CSR-backed replacement for a dense pd.crosstab / unstack count table. It
+    # keeps the DataFrame accessors the narrative code relies on (shape, empty,
+    # row/column totals, top-N) and converts to dense only on request.
+    def __init__(self, matrix, row_labels, col_labels):
+        self.matrix = matrix.tocsr()
+        self.row_labels = np.asarray(row_labels)
+        self.col_labels = np.asarray(col_labels)
+
+    @classmethod
+    def from_frame(cls, df, row_column, col_column):
+        matrix, rows, cols = incidence_matrix(df, row_column, col_column, binary=False)
+        return cls(matrix, rows, cols)
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def empty(self):
+        return self.matrix.shape[0] == 0 or self.matrix.shape[1] == 0
+
+    @property
+    def nnz(self):
+        return self.matrix.nnz
+
+    def row_nunique(self):
+        return pd.Series(np.diff(self.matrix.indptr), index=self.row_labels)
+
+    def row_totals(self):
+        return pd.Series(np.asarray(self.matrix.sum(axis=1)).ravel(), index=self.row_labels)
+
+    def col_totals(self):
+        return pd.Series(np.asarray(self.matrix.sum(axis=0)).ravel(), index=self.col_labels)
+
+    def top_rows(self, n=10):
+        return self.row_totals().sort_values(ascending=False).head(n)
+
+    def top_columns(self, n=10):
+        return self.col_totals().sort_values(ascending=False).head(n)
+
+    def row(self, label):
+        i = int(np.searchsorted(self.row_labels, label))
+        if i >= len(self.row_labels) or self.row_labels[i] != label:
+            raise KeyError(label)
+        row = self.matrix.getrow(i)
+        return pd.Series(row.data, index=self.col_labels[row.indices])
+
+    def top_per_row(self, n=1):
+        # For each row label, its n largest columns as {row: [(column, count), ...]}.
+        top = {}
+        for i, label in enumerate(self.row_labels):
+            start, end = self.matrix.indptr[i], self.matrix.indptr[i + 1]
+            order = np.argsort(-self.matrix.data[start:end], kind="stable")[:n]
+            top[label] = [(self.col_labels[self.matrix.indices[start + j]], int(self.matrix.data[start + j])) for j in order]
+        return top
+
+    def filter_rows(self, mask):
+        mask = np.asarray(mask, dtype=bool)
+        return SparseContingency(self.matrix[mask], self.row_labels[mask], self.col_labels).drop_empty_columns()
+
+    def drop_empty_columns(self):
+        keep = np.diff(self.matrix.tocsc().indptr) > 0
+        return SparseContingency(self.matrix[:, keep], self.row_labels, self.col_labels[keep])
+
+    def to_dense(self):
+        return pd.DataFrame(self.matrix.toarray(), index=self.row_labels, columns=self.col_labels)
+
+
+def author_copost_adjacency(df, min_shared_urls=2):
+    # One sparse product gives, for every author pair, the number of distinct
+    # URLs both posted. Only the upper triangle is kept and the threshold is
+    # applied on the sparse result, before any graph is built.
+    incidence, authors, _ = incidence_matrix(df, "author", "url")
+    shared = sparse.triu(incidence @ incidence.T, k=1, format="csr")
+    shared.data[shared.data < min_shared_urls] = 0
+    shared.eliminate_zeros()
+    return shared, authors
+
+
+def build_author_copost_network(df, min_shared_urls=2, return_sparse=False):
+    adjacency, authors = author_copost_adjacency(df, min_shared_urls)
+    if return_sparse:
+        return adjacency, authors
+    coo = adjacency.tocoo()
+    G = nx.Graph()
+    G.add_weighted_edges_from(zip(authors[coo.row].tolist(), authors[coo.col].tolist(), coo.data.tolist()))
+    return G
@@ -0,0 +1,203 @@
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from api.columnar import parse_record
+from api.metrics import stage
+from api.preprocessing import add_derived_columns, extract_domain
+
+REQUIRED_COLUMNS = ["id", "subreddit", "author", "title", "selftext", "url", "created_utc", "score", "num_comments"]
+
+
+def iter_records(path, offset=0):
+    # Post dicts from a JSONL dump, one line at a time, parsed like every
+    # other reader (columnar.parse_record): {"data": {...}} wrappers are
+    # unwrapped and lines that are not JSON objects are skipped.
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            record = parse_record(line)
+            if record is not None:
+                yield record
+
+
+def iter_chunks(path, chunk_size=50000):
+    # DataFrames of at most chunk_size posts from a .jsonl dump or an .arrow
+    # file (memory-mapped, one record batch at a time), so only one chunk is
+    # materialized at once.
+    if path.endswith(".arrow"):
+        import pyarrow as pa
+        with pa.memory_map(path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for start in range(0, batch.num_rows, chunk_size):
+                    yield batch.slice(start, chunk_size).to_pandas()
+        return
+    chunk = []
+    for record in iter_records(path):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame(chunk)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk)
+
+
+def preprocess_chunk(chunk):
+    for column in REQUIRED_COLUMNS:
+        if column not in chunk.columns:
+            chunk[column] = None
+    return add_derived_columns(chunk)
+
+
+def _fold(total, partial):
+    return partial if total is None else total.add(partial, fill_value=0)
+
+
+def _ranked(counts, top_n=None):
+    # Largest first; ties are broken by label so the result does not depend
+    # on how the input was chunked.
+    counts = counts.astype(np.int64).sort_index(kind="stable").sort_values(ascending=False, kind="stable")
+    return counts if top_n is None else counts.head(top_n)
+
+
+class StreamingAggregates:
+    # The per-post analytics of new_reddit's report as partial aggregates,
+    # folded one chunk at a time: post counts per author, subreddit, link
+    # domain and day, the top posts of every day, per-author sums and
+    # (author, subreddit) pairs, and TF-IDF term statistics. Memory grows with
+    # the number of distinct keys (authors, days, terms), not with posts.
+    def __init__(self, top_posts=5, tfidf=True):
+        self.top_posts = top_posts
+        self.posts = 0
+        self.authors = None
+        self.subreddits = None
+        self.domains = None
+        self.daily = None
+        self.day_top = None
+        self.author_sums = None
+        self.author_subreddits = None
+        self.term_stats = None
+        if tfidf:
+            from api.term_stats import IncrementalTfidf
+            self.term_stats = IncrementalTfidf()
+
+    def add(self, chunk):
+        # `chunk` has been through preprocess_chunk.
+        chunk.index = pd.RangeIndex(self.posts, self.posts + len(chunk))
+        self.posts += len(chunk)
+        self.authors = _fold(self.authors, chunk["author"].value_counts())
+        self.subreddits = _fold(self.subreddits, chunk["subreddit"].value_counts())
+        links = chunk["url"].notna() & chunk["url"].str.startswith("http")
+        self.domains = _fold(self.domains, extract_domain(chunk.loc[links, "url"]).value_counts())
+
+        dates = chunk["datetime"].dt.date
+        self.daily = _fold(self.daily, dates.value_counts())
+        top = chunk.assign(date=dates).sort_values("score", ascending=False, kind="stable")
+        top = top.groupby("date", sort=False).head(self.top_posts)
+        if self.day_top is not None:
+            top = pd.concat([self.day_top, top]).sort_values("score", ascending=False, kind="stable")
+            top = top.groupby("date", sort=False).head(self.top_posts)
+        self.day_top = top
+
+        sums = chunk.groupby("author").agg(
+            post_count=("author", "count"),
+            score_sum=("score", "sum"),
+            score_n=("score", "count"),
+            comments_sum=("num_comments", "sum"),
+            comments_n=("num_comments", "count"),
+        )
+        self.author_sums = _fold(self.author_sums, sums)
+        self.author_subreddits = _fold(self.author_subreddits, chunk.groupby(["author", "subreddit"]).size())
+        if self.term_stats is not None:
+            self.term_stats.add_documents(chunk["text"].tolist())
+
+    def top_authors(self, top_n=20):
+        return _ranked(self.authors, top_n).rename_axis("author").rename("count")
+
+    def subreddit_counts(self, top_n=None):
+        return _ranked(self.subreddits, top_n).rename_axis("subreddit").rename("count")
+
+    def top_links(self, top_n=10):
+        return _ranked(self.domains, top_n).rename_axis("domain").rename("count")
+
+    def daily_counts(self):
+        return self.daily.astype(np.int64).sort_index().rename_axis("date")
+
+    def flashpoint(self, top_n=5):
+        # Busiest day (the earliest on ties) and its top posts by score.
+        if self.daily is None or self.daily.empty:
+            return None, pd.DataFrame()
+        daily = self.daily_counts()
+        spike_day = daily.idxmax()
+        posts = self.day_top[self.day_top["date"] == spike_day]
+        return spike_day, posts.sort_values("score", ascending=False, kind="stable").head(top_n)
+
+    def author_stats(self):
+        sums = self.author_sums
+        stats = pd.DataFrame({
+            "post_count": sums["post_count"].astype(np.int64),
+            "avg_score": sums["score_sum"] / sums["score_n"].where(sums["score_n"] > 0),
+            "avg_comments": sums["comments_sum"] / sums["comments_n"].where(sums["comments_n"] > 0),
+            "subreddits": self.author_subreddits.groupby(level=0).size().reindex(sums.index, fill_value=0),
+        })
+        stats.index.name = "author"
+        return stats.sort_index(kind="stable").sort_values("post_count", ascending=False, kind="stable")
+
+    def topics(self, top_n=10):
+        return pd.DataFrame(self.term_stats.top_terms(top_n), columns=["word", "score"])
+
+    def document_frequencies(self, top_n=None):
+        return dict(self.term_stats.doc_freq.most_common(top_n))
+
+
+def stream_analytics(path, chunk_size=50000, top_posts=5, tfidf=True):
+    aggregates = StreamingAggregates(top_posts=top_posts, tfidf=tfidf)
+    for chunk in iter_chunks(path, chunk_size):
+        with stage("stream.chunk", len(chunk)):
+            aggregates.add(preprocess_chunk(chunk))
+    return aggregates
+
+
+def streaming_report(aggregates, top_n=10):
+    # JSON-ready summary of the folded aggregates.
+    spike_day, spike_posts = aggregates.flashpoint()
+    return {
+        "posts": aggregates.posts,
+        "top_authors": {str(k): int(v) for k, v in aggregates.top_authors(20).items()},
+        "subreddit_counts": {str(k): int(v) for k, v in aggregates.subreddit_counts().items()},
+        "top_links": {str(k): int(v) for k, v in aggregates.top_links(top_n).items()},
+        "daily_counts": {str(k): int(v) for k, v in aggregates.daily_counts().items()},
+        "flashpoint": {
+            "day": None if spike_day is None else str(spike_day),
+            "posts": [
+                {"title": p["title"], "author": p["author"], "subreddit": p["subreddit"], "score": int(p["score"])}
+                for p in spike_posts.to_dict(orient="records")
+            ],
+        },
+        "author_stats": [
+            {"author": author, "post_count": int(row.post_count),
+             "avg_score": None if pd.isna(row.avg_score) else round(float(row.avg_score), 3),
+             "avg_comments": None if pd.isna(row.avg_comments) else round(float(row.avg_comments), 3),
+             "subreddits": int(row.subreddits)}
+            for author, row in aggregates.author_stats().head(100).iterrows()
+        ],
+        "topics": aggregates.topics(top_n).to_dict(orient="records") if aggregates.term_stats is not None else [],
+        "document_frequencies": aggregates.document_frequencies(100) if aggregates.term_stats is not None else {},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report analytics over a Reddit dump in bounded-size chunks")
+    parser.add_argument("path", help=".jsonl dump or .arrow file")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--no-tfidf", action="store_true")
+    parser.add_argument("--output", default="streaming_report.json")
+    args = parser.parse_args()
+    report = streaming_report(stream_analytics(args.path, args.chunk_size, tfidf=not args.no_tfidf))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Folded {report['posts']} posts into {args.output}; busiest day {report['flashpoint']['day']}")
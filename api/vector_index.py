@@ -0,0 +1,258 @@
+import math
+import os
+import pickle
+import threading
+from array import array
+
+import numpy as np
+import pandas as pd
+
+HASH_FEATURES = 2 ** 20
+# Bumped whenever encode() changes, so saved indexes are rebuilt.
+ENCODING = 2
+FIELDS = ("id", "subreddit", "author", "title", "snippet", "score", "created_utc")
+SNIPPET_CHARS = 300
+
+
+def post_texts(posts):
+    title = posts["title"].fillna("").astype(str) if "title" in posts.columns else pd.Series("", index=posts.index)
+    if "selftext" in posts.columns:
+        return (title + " " + posts["selftext"].fillna("").astype(str)).str.strip()
+    return title
+
+
+def _column(posts, name, default):
+    if name in posts.columns:
+        return posts[name].to_numpy(dtype=object, na_value=default)
+    return np.full(len(posts), default, dtype=object)
+
+
+def post_metadata(posts):
+    # One FIELDS tuple per post. Archive records from /posts carry a
+    # millisecond "date" and no selftext instead of created_utc.
+    created = _column(posts, "created_utc", None)
+    if "date" in posts.columns:
+        dates = posts["date"].to_numpy(dtype=object, na_value=None)
+        created = [c if c is not None else (d / 1000 if d is not None else None) for c, d in zip(created, dates)]
+    snippets = [text[:SNIPPET_CHARS] for text in _column(posts, "selftext", "")]
+    return list(zip(
+        [str(i) for i in _column(posts, "id", "")], [str(s) for s in _column(posts, "subreddit", "")],
+        [str(a) for a in _column(posts, "author", "")], [str(t) for t in _column(posts, "title", "")], snippets,
+        [int(s) if s is not None else 0 for s in _column(posts, "score", None)],
+        [float(c) if c is not None else None for c in created],
+    ))
+
+
+def _kmeans(vectors, nlist, iterations=10, seed=0):
+    # Spherical k-means on unit vectors: centroids are renormalized means, and
+    # an emptied cluster is reseeded from a random vector.
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms > 0, norms, 1)
+    return centroids.astype(np.float32)
+
+
+def _nearest(vectors, centroids, chunk_size=8192):
+    return np.concatenate([
+        (vectors[i:i + chunk_size] @ centroids.T).argmax(axis=1) for i in range(0, len(vectors), chunk_size)
+    ]) if len(vectors) else np.empty(0, dtype=np.int64)
+
+
+class VectorIndex:
+    # Approximate nearest-neighbour search over posts. A post's title and
+    # selftext are encoded as a hashed TF-IDF vector: terms are hashed into
+    # 2**20 buckets, weighted by sublinear tf times an idf fitted when the
+    # index is built, and folded into `dim` dimensions (bucket i % dim) with a
+    # +/-1 sign per bucket taken from a second, independent murmur hash of
+    # its index, so colliding terms cancel rather than pile up; the vectors
+    # are then L2-normalized. From ivf_min posts on, vectors are grouped into
+    # about sqrt(n) k-means cells (IVF) and a search scans only the nprobe
+    # cells nearest the query; below that, every vector is scanned. Inserts
+    # are encoded with the same idf and go to their nearest cell; the cells
+    # are retrained once the index has grown 4x since they were built.
+    def __init__(self, dim=256, ivf_min=20000, seed=0):
+        self.dim = dim
+        self.ivf_min = ivf_min
+        self.seed = seed
+        self.idf = None
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.size = 0
+        self.metadata = []
+        self.ids = set()
+        self.centroids = None
+        self.lists = []
+        self.trained_size = 0
+        self.extra = {}
+        self.lock = threading.Lock()
+        self._encoder = None
+        from sklearn.utils import murmurhash3_32
+        columns = np.arange(HASH_FEATURES, dtype=np.int32)
+        self._bucket = columns % dim
+        self._sign = np.where(murmurhash3_32(columns, seed=1, positive=True) & 1, 1.0, -1.0).astype(np.float32)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, post_id):
+        return post_id in self.ids
+
+    def _hashed_counts(self, texts):
+        if self._encoder is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            self._encoder = HashingVectorizer(n_features=HASH_FEATURES, alternate_sign=False, norm=None,
+                                              stop_words="english", dtype=np.float32)
+        return self._encoder.transform(texts)
+
+    def _fit_counts(self, counts):
+        # Smoothed idf, as TfidfVectorizer computes it.
+        df = np.bincount(counts.indices, minlength=HASH_FEATURES)
+        self.idf = (np.log((1 + counts.shape[0]) / (1 + df)) + 1).astype(np.float32)
+
+    def fit(self, texts):
+        self._fit_counts(self._hashed_counts(texts))
+        return self
+
+    def _fold(self, counts):
+        from scipy.sparse import csr_matrix
+        weights = (1 + np.log(counts.data)) * self.idf[counts.indices] * self._sign[counts.indices]
+        folded = csr_matrix((weights, self._bucket[counts.indices], counts.indptr), shape=(counts.shape[0], self.dim))
+        folded.sum_duplicates()
+        out = folded.toarray().astype(np.float32)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms > 0, norms, 1)
+
+    def encode(self, texts, chunk_size=50000):
+        if self.idf is None:
+            self.fit(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.concatenate([
+            self._fold(self._hashed_counts(texts[start:start + chunk_size]))
+            for start in range(0, len(texts), chunk_size)
+        ])
+
+    def _train(self):
+        n = self.size
+        nlist = max(1, int(math.sqrt(n)))
+        sample = self.vectors[:n]
+        if n > nlist * 64:
+            sample = sample[np.random.default_rng(self.seed).choice(n, nlist * 64, replace=False)]
+        self.centroids = _kmeans(sample, nlist, seed=self.seed)
+        assign = _nearest(self.vectors[:n], self.centroids)
+        order = np.argsort(assign, kind="stable").astype(np.uint32)
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self.lists = [array("I", order[bounds[c]:bounds[c + 1]].tobytes()) for c in range(nlist)]
+        self.trained_size = n
+
+    def add(self, posts, fit=False):
+        # posts: a DataFrame with id, title and optionally selftext, subreddit,
+        # author, score and created_utc (or the archive's date). Ids already in
+        # the index are skipped. With fit, the idf is fitted on these posts
+        # first, from the same term counts. Returns how many posts were added.
+        if posts is None or len(posts) == 0:
+            return 0
+        ids = posts["id"].astype(str)
+        with self.lock:
+            fresh = ~ids.duplicated().to_numpy() & np.array([i not in self.ids for i in ids], dtype=bool)
+        if not fresh.any():
+            return 0
+        posts = posts[fresh]
+        texts = post_texts(posts).tolist()
+        if fit:
+            counts = self._hashed_counts(texts)
+            self._fit_counts(counts)
+            vectors = self._fold(counts)
+        else:
+            vectors = self.encode(texts)
+        metadata = post_metadata(posts)
+        with self.lock:
+            # Another thread may have added some of these meanwhile.
+            keep = [i for i, row in enumerate(metadata) if row[0] not in self.ids]
+            if len(keep) < len(metadata):
+                vectors, metadata = vectors[keep], [metadata[i] for i in keep]
+            start, end = self.size, self.size + len(vectors)
+            if end > len(self.vectors):
+                grown = np.zeros((max(end, 2 * len(self.vectors)), self.dim), dtype=np.float32)
+                grown[:start] = self.vectors[:start]
+                self.vectors = grown
+            self.vectors[start:end] = vectors
+            self.metadata.extend(metadata)
+            self.ids.update(row[0] for row in metadata)
+            self.size = end
+            if (self.centroids is None and end >= self.ivf_min) or (self.centroids is not None and end >= 4 * self.trained_size):
+                self._train()
+            elif self.centroids is not None:
+                for row, cell in zip(range(start, end), _nearest(vectors, self.centroids).tolist()):
+                    self.lists[cell].append(row)
+        return len(metadata)
+
+    def search(self, query, k=5, nprobe=16, exact=False):
+        # [(cosine similarity, {field: value}), ...], most similar first.
+        q = self.encode([query])[0] if self.idf is not None else None
+        if q is None or not q.any():
+            return []
+        with self.lock:
+            if exact or self.centroids is None:
+                rows = np.arange(self.size)
+            else:
+                cells = np.argsort(-(self.centroids @ q))[:nprobe]
+                rows = np.concatenate([np.frombuffer(self.lists[c], dtype=np.uint32) for c in cells]).astype(np.int64)
+            if rows.size == 0:
+                return []
+            scores = self.vectors[rows] @ q
+            top = np.argpartition(-scores, min(k, rows.size) - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(float(scores[i]), dict(zip(FIELDS, self.metadata[rows[i]]))) for i in top.tolist()]
+
+    def stats(self):
+        with self.lock:
+            return {"posts": self.size, "dim": self.dim, "cells": 0 if self.centroids is None else len(self.centroids),
+                    "trained_on": self.trained_size, "vector_mb": round(self.size * self.dim * 4 / 2 ** 20, 1)}
+
+    def save(self, path):
+        with self.lock:
+            state = {
+                "dim": self.dim, "ivf_min": self.ivf_min, "seed": self.seed, "idf": self.idf,
+                "vectors": self.vectors[:self.size].copy(), "metadata": list(self.metadata),
+                "centroids": self.centroids, "lists": [cell.tobytes() for cell in self.lists],
+                "trained_size": self.trained_size, "extra": dict(self.extra), "encoding": ENCODING,
+            }
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("encoding") != ENCODING:
+            raise ValueError(f"{path} was built with another encoding; it has to be rebuilt")
+        index = cls(dim=state["dim"], ivf_min=state["ivf_min"], seed=state["seed"])
+        index.idf = state["idf"]
+        index.vectors = state["vectors"]
+        index.size = len(index.vectors)
+        index.metadata = state["metadata"]
+        index.ids = {row[0] for row in index.metadata}
+        index.centroids = state["centroids"]
+        for raw in state["lists"]:
+            cell = array("I")
+            cell.frombytes(raw)
+            index.lists.append(cell)
+        index.trained_size = state["trained_size"]
+        index.extra = state["extra"]
+        return index
+
+
+def build_vector_index(posts, dim=256, ivf_min=20000):
+    index = VectorIndex(dim=dim, ivf_min=ivf_min)
+    index.add(posts, fit=True)
+    return index
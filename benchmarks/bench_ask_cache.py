@@ -0,0 +1,64 @@
+import argparse
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from benchmarks.harness import load_api
+
+QUERIES = {
+    "topic_trends": "What are the top trending topics?",
+    "top_authors": "Who are the most active authors?",
+    "subreddit_activity": "Which subreddit is most active?",
+    "sentiment_overview": "Summarize sentiment",
+    "flashpoints": "Were there any spikes?",
+    "domain_trends": "Which domains are shared most?",
+    "controversial_posts": "Show controversial posts",
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def measure(client, code, query, repeats, cold):
+    latencies = []
+    for _ in range(repeats):
+        if cold:
+            code.analytics.invalidate()
+        start = time.perf_counter()
+        client.post("/ask", json={"query": query}).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/ask latency with and without materialized analytics")
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    code, _ = load_api(corpus_size=args.posts)
+    client = TestClient(code.app)
+    results = []
+    incremental = code.analytics.analytics["topic_trends"]
+    for name, query in QUERIES.items():
+        # "before" is the old recompute-per-query behaviour: the cache is
+        # invalidated ahead of every request and topic trends refit TF-IDF on
+        # the whole frame, as they did before the incremental term model.
+        code.analytics.analytics["topic_trends"] = code.detect_topic_trends
+        before = measure(client, code, query, args.repeats, cold=True)
+        code.analytics.analytics["topic_trends"] = incremental
+        code.analytics.refresh(*code.current_dataset())
+        after = measure(client, code, query, args.repeats, cold=False)
+        row = {"analytic": name, "before": before, "after": after}
+        results.append(row)
+        print(json.dumps(row))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from api.llm_cache import StubModel
+from benchmarks.harness import load_api, serve
+
+QUERIES = [
+    "What are the top trending topics?",
+    "Who are the most active authors?",
+    "Which subreddit is most active?",
+    "Summarize sentiment",
+    "Were there any spikes?",
+    "Which domains are shared most?",
+    "Show controversial posts",
+    "Give me a narrative summary",
+]
+HANDLERS = {"inline": "/ask_inline", "offloaded": "/ask"}
+
+
+def load(base_url, path, clients, requests_per_client):
+    return asyncio.run(run(base_url, path, clients, requests_per_client))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))] if values else None
+
+
+def summary(latencies):
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+async def run(base_url, path, clients, requests_per_client):
+    latencies = []
+    probe_latencies = []
+    errors = 0
+    done = asyncio.Event()
+    limits = httpx.Limits(max_connections=clients + 1, max_keepalive_connections=clients + 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        async def worker(offset):
+            nonlocal errors
+            for i in range(requests_per_client):
+                query = QUERIES[(offset + i) % len(QUERIES)]
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, json={"query": query})
+                    errors += response.status_code != 200
+                except httpx.HTTPError:
+                    # A stalled loop lets keep-alive connections time out under load.
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        async def probe():
+            # A trivial endpoint; its latency shows how long the event loop stalls.
+            while not done.is_set():
+                start = time.perf_counter()
+                try:
+                    await client.get("/ready")
+                except httpx.HTTPError:
+                    pass
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        # Open every client's connection first, so setup is not timed as latency.
+        await asyncio.gather(*(client.get("/ready") for _ in range(clients)))
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        **summary(latencies),
+        "probe": summary(probe_latencies),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mixed /ask load with the handler inline on the event loop vs offloaded")
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--clients", default="1,10,100")
+    parser.add_argument("--handlers", default="inline,offloaded")
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    code, _ = load_api(corpus_size=args.posts)
+    # Sentiment scoring and LLM caching are not what is measured here.
+    code.analytics.analytics["sentiment_overview"] = lambda df: {"positive": 0.0, "neutral": 100.0, "negative": 0.0}
+    code.analytics.refresh(*code.current_dataset())
+    code.model = StubModel(latency=args.llm_latency)
+
+    @code.app.post("/ask_inline")
+    async def ask_inline(request: code.QueryRequest):
+        # The previous handler: the whole answer computed on the event loop.
+        return {"answer": code.answer_query(request.query.lower())}
+
+    server, base_url = serve(code.app)
+    results = []
+    # Clients run in a separate process so they do not share the server's GIL.
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as clients_pool:
+        for clients in (int(c) for c in args.clients.split(",")):
+            for label in args.handlers.split(","):
+                path = HANDLERS[label]
+                stats = clients_pool.submit(load, base_url, path, clients, args.requests_per_client).result()
+                row = {"clients": clients, "handler": label, **stats}
+                results.append(row)
+                print(json.dumps(row))
+    server.should_exit = True
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
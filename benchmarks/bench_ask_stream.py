@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import time
+
+import httpx
+
+from api.llm_cache import CachedModel, LLMCache, StubModel
+from benchmarks.harness import load_api, serve
+
+QUERY = "Give me a narrative summary"
+
+
+def measure_ask(base_url):
+    start = time.perf_counter()
+    httpx.post(f"{base_url}/ask", json={"query": QUERY}, timeout=300).raise_for_status()
+    elapsed = time.perf_counter() - start
+    return {"ttfb_s": round(elapsed, 3), "first_token_s": round(elapsed, 3), "total_s": round(elapsed, 3)}
+
+
+def measure_stream(base_url):
+    start = time.perf_counter()
+    first_event = first_token = None
+    events = 0
+    with httpx.stream("POST", f"{base_url}/ask/stream", json={"query": QUERY}, timeout=300) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line.startswith("event:"):
+                continue
+            events += 1
+            now = time.perf_counter() - start
+            first_event = now if first_event is None else first_event
+            if line == "event: token" and first_token is None:
+                first_token = now
+    return {
+        "ttfb_s": round(first_event, 3),
+        "first_token_s": round(first_token, 3),
+        "total_s": round(time.perf_counter() - start, 3),
+        "events": events,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Narrative /ask vs /ask/stream time-to-first-byte against a stub LLM")
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--latencies", default="1,3,6", help="stub generation seconds")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    code, workdir = load_api(corpus_size=args.posts)
+    # Sentiment scoring is not what is measured here.
+    code.analytics.analytics["sentiment_overview"] = lambda df: {"positive": 0.0, "neutral": 100.0, "negative": 0.0}
+    code.analytics.refresh(*code.current_dataset())
+    cache = LLMCache(os.path.join(workdir, "bench_llm_cache.db"))
+    server, base_url = serve(code.app)
+
+    results = []
+    for latency in (float(x) for x in args.latencies.split(",")):
+        code.model = CachedModel(StubModel(latency=latency), f"stub:{latency}", cache)
+        cache.clear()
+        ask = measure_ask(base_url)
+        cache.clear()
+        stream = measure_stream(base_url)
+        row = {"llm_latency_s": latency, "ask": ask, "ask_stream": stream}
+        results.append(row)
+        print(json.dumps(row))
+    server.should_exit = True
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks.harness import load_api, serve
+
+# What the dashboard loads, as the /ask question it sends today.
+DASHBOARD = {
+    "topic_trends": "What are the top trending topics?",
+    "top_authors": "Who are the most active authors?",
+    "subreddit_activity": "Which subreddit community is most active?",
+    "flashpoints": "Were there any flashpoints or spikes?",
+    "domain_trends": "Which domains are shared most?",
+    "controversial_posts": "Show the controversial posts",
+}
+FILTERS = {
+    "subreddits": {"subreddits": ["politics", "worldnews", "news"]},
+    "keyword": {"keyword": "tariff"},
+    "date_range": {"start": "2025-01-15", "end": "2025-02-15"},
+    "combined": {"subreddits": ["politics"], "keyword": "election", "start": "2025-02-01"},
+}
+
+
+def median_ms(call, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1000, 2)
+
+
+def separate(code, df, names, filters, as_object=False):
+    # What N filtered requests would each do: select the rows again, then run
+    # one analytic over them. as_object counts labels as plain strings, the
+    # reference the batch results are checked against.
+    from api.batch_analytics import post_days, select_rows
+    functions = {
+        "topic_trends": lambda sub: code.detect_topic_trends(sub) if len(sub) else [],
+        "top_authors": code.top_authors,
+        "subreddit_activity": code.subreddit_activity,
+        "flashpoints": code.flashpoint_detection,
+        "domain_trends": code.domain_trends,
+        "controversial_posts": code.controversial_posts,
+    }
+    results = {}
+    for name in names:
+        dated = filters.get("start") or filters.get("end") or name == "flashpoints"
+        sub = df.iloc[select_rows(df, post_days(df) if dated else None, **filters)]
+        if as_object:
+            sub = sub.astype({column: object for column in ("author", "subreddit", "domain")})
+        results[name] = functions[name](sub)
+    return results
+
+
+def fused(code, df, names, filters, index=None):
+    from api.batch_analytics import post_days, select_rows
+    days = post_days(df)
+    return code.batch_results(df, names, select_rows(df, days, index=index, **filters), days)
+
+
+def payloads(code, results):
+    from fastapi.encoders import jsonable_encoder
+    return jsonable_encoder({name: code._analytic_payload(name, value) for name, value in results.items()})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard load as one /ask per analytic vs one /analytics batch")
+    parser.add_argument("--sizes", default="20000,200000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["WARMUP_ON_STARTUP"] = "0"
+    names = list(DASHBOARD)
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        code, _ = load_api(corpus_size=size)
+        df, version = code.current_dataset()
+        index = code.get_keyword_index()
+        for name in names:
+            code.analytics.get(name, df, version)
+        server, base_url = serve(code.app)
+        with httpx.Client(base_url=base_url, timeout=300) as client:
+            def ask_each():
+                for query in DASHBOARD.values():
+                    client.post("/ask", json={"query": query}).raise_for_status()
+
+            def batch():
+                client.post("/analytics", json={"analytics": names}).raise_for_status()
+
+            row = {"posts": size, "unfiltered": {"requests_ask": len(names), "ask_each_ms": median_ms(ask_each, args.repeat),
+                                                 "requests_batch": 1, "batch_ms": median_ms(batch, args.repeat)}}
+            row["unfiltered"]["speedup"] = round(row["unfiltered"]["ask_each_ms"] / row["unfiltered"]["batch_ms"], 2)
+
+            row["filtered"] = {}
+            for label, filters in FILTERS.items():
+                expected = payloads(code, separate(code, df, names, filters, as_object=True))
+                actual = payloads(code, fused(code, df, names, filters))
+                separate_ms = median_ms(lambda: separate(code, df, names, filters), args.repeat)
+                fused_ms = median_ms(lambda: fused(code, df, names, filters), args.repeat)
+                http_ms = median_ms(lambda: client.post("/analytics", json={"analytics": names, **filters}).raise_for_status(),
+                                    args.repeat)
+                # The one TF-IDF fit dominates both; the rest is what fusing saves.
+                counts = [name for name in names if name != "topic_trends"]
+                separate_counts_ms = median_ms(lambda: separate(code, df, counts, filters), args.repeat)
+                fused_counts_ms = median_ms(lambda: fused(code, df, counts, filters), args.repeat)
+                row["filtered"][label] = {"separate_ms": separate_ms, "fused_ms": fused_ms, "http_batch_ms": http_ms,
+                                          "speedup": round(separate_ms / fused_ms, 2),
+                                          "without_topics": {"separate_ms": separate_counts_ms, "fused_ms": fused_counts_ms,
+                                                             "speedup": round(separate_counts_ms / fused_counts_ms, 2)},
+                                          "identical": expected == actual}
+                if "keyword" in filters:
+                    indexed = payloads(code, fused(code, df, names, filters, index))
+                    indexed_counts_ms = median_ms(lambda: fused(code, df, counts, filters, index), args.repeat)
+                    row["filtered"][label]["keyword_index"] = {
+                        "fused_ms": median_ms(lambda: fused(code, df, names, filters, index), args.repeat),
+                        "without_topics_fused_ms": indexed_counts_ms,
+                        "speedup_vs_scan_without_topics": round(fused_counts_ms / indexed_counts_ms, 2),
+                        "identical": indexed == expected,
+                    }
+        server.should_exit = True
+        results.append(row)
+        print(json.dumps(row), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from api.render_service import RenderService, render_chart
+from benchmarks.harness import load_api
+
+REQUESTS = [
+    ("post_trends", None),
+    ("top_subreddits", None),
+    ("top_authors", None),
+    ("author_network", None),
+    ("topic_rise", {"keyword": "market"}),
+    ("sentiment_shift", {"keyword": "market"}),
+    ("sentiment_by_link", {"link_keyword": "com"}),
+]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - start) * 1000, 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chart rendering: serial per call vs cached process-pool render service")
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    code, _ = load_api(corpus_size=args.posts)
+    df, version = code.current_dataset()
+    # Sentiment is not what is measured here; a cheap stand-in keeps it out.
+    df = df.assign(sentiment=(df["score"] % 7 - 3) / 3)
+
+    _, serial_ms = timed(lambda: [render_chart(plot_type, df, params) for plot_type, params in REQUESTS])
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = RenderService(cache_dir=cache_dir, workers=args.workers)
+        # Start the pool outside the timings, as a long-running server would.
+        list(service._get_pool().map(int, range(args.workers)))
+        _, cold_ms = timed(lambda: service.render_many(REQUESTS, df, version))
+        _, warm_ms = timed(lambda: service.render_many(REQUESTS, df, version))
+        service.close()
+        restarted = RenderService(cache_dir=cache_dir, workers=args.workers)
+        _, disk_ms = timed(lambda: restarted.render_many(REQUESTS, df, version))
+        _, json_ms = timed(lambda: [restarted.series(plot_type, df, version, params) for plot_type, params in REQUESTS])
+        restarted.close()
+
+    result = {
+        "posts": args.posts,
+        "charts": len(REQUESTS),
+        "workers": args.workers,
+        "serial_render_ms": serial_ms,
+        "service_cold_ms": cold_ms,
+        "service_memory_hit_ms": warm_ms,
+        "service_disk_hit_ms": disk_ms,
+        "series_json_hit_ms": json_ms,
+    }
+    print(json.dumps(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from api.columnar import convert_jsonl_to_arrow
+from benchmarks.harness import REPO_ROOT
+from benchmarks.synthetic import write_corpus
+
+# Each loader runs in a fresh interpreter so its peak RSS is not polluted by
+# the previous one. The JSONL path is the one api/code.py used at import time.
+# Times and memory exclude importing pandas/pyarrow themselves.
+LOADERS = {
+    "jsonl": """
+import json, pandas as pd
+with open(PATH) as f:
+    data = [json.loads(line) for line in f]
+df = pd.DataFrame(data)
+""",
+    "arrow_all_columns": """
+from api.columnar import load_columns, POST_COLUMNS
+df = load_columns(PATH, POST_COLUMNS)
+""",
+    "arrow_author_subreddit": """
+from api.columnar import load_columns
+df = load_columns(PATH, ["author", "subreddit"])
+""",
+    # The analytics frame the API serves: the whole table through pandas and
+    # then compacted (as load_dataset did), vs converted column by column
+    # from the memory-mapped table.
+    "api_frame_via_pandas": """
+from api.columnar import load_columns, POST_COLUMNS
+from api.preprocessing import add_derived_columns, compact_posts
+df = compact_posts(add_derived_columns(load_columns(PATH, POST_COLUMNS)))
+""",
+    "api_frame_from_arrow": """
+from api.columnar import open_table
+from api.preprocessing import compact_from_arrow
+df = compact_from_arrow(open_table(PATH))
+""",
+}
+
+# ru_maxrss survives exec on Linux, so the child reads its own VmHWM instead.
+RUNNER = """
+import time, json, sys
+import pandas, pyarrow
+from benchmarks.memory import current_rss_mb, peak_rss_mb
+PATH = sys.argv[1]
+baseline, current = peak_rss_mb(), current_rss_mb()
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"rows": len(df), "load_s": elapsed, "peak_rss_mb": peak_rss_mb() - baseline, "rss_mb": current_rss_mb() - current}}))
+"""
+
+
+def run_loader(name, path):
+    out = subprocess.run(
+        [sys.executable, "-c", RUNNER.format(body=LOADERS[name]), path],
+        capture_output=True, text=True, check=True, cwd=REPO_ROOT,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time and memory: JSONL parsing vs memory-mapped Arrow")
+    parser.add_argument("--sizes", default="8000,1000000,10000000")
+    parser.add_argument("--workdir")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="reddit-columnar-")
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        jsonl = os.path.join(workdir, f"data_{size}.jsonl")
+        write_corpus(jsonl, size)
+        start = time.perf_counter()
+        arrow = convert_jsonl_to_arrow(jsonl)
+        convert_s = time.perf_counter() - start
+        row = {
+            "posts": size,
+            "jsonl_mb": round(os.path.getsize(jsonl) / 2**20, 1),
+            "arrow_mb": round(os.path.getsize(arrow) / 2**20, 1),
+            "convert_s": round(convert_s, 3),
+        }
+        for name in LOADERS:
+            path = jsonl if name == "jsonl" else arrow
+            measured = run_loader(name, path)
+            row[name] = {"load_s": round(measured["load_s"], 3), "peak_rss_mb": round(measured["peak_rss_mb"], 1),
+                         "rss_mb": round(measured["rss_mb"], 1)}
+        results.append(row)
+        print(json.dumps(row))
+        os.remove(jsonl)
+        os.remove(arrow)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.memory import peak_rss_mb
+from benchmarks.synthetic import DOMAINS, SUBREDDITS
+
+
+def distinct_strings(labels, codes):
+    # One str object per row, as json.loads produces, rather than shared ones.
+    encoded = [label.encode() for label in labels]
+    return np.array([encoded[k].decode() for k in codes.tolist()], dtype=object)
+
+
+def synthetic_frame(n, seed=0):
+    # The columns compact_posts changes, with the corpus generator's
+    # distributions. Title, selftext and text are left out: they are stored
+    # the same way before and after, and would not fit alongside at 10M rows.
+    rng = np.random.default_rng(seed)
+    authors = (rng.pareto(1.2, n) + 1).astype(np.int64) % 5000
+    has_link = rng.random(n) < 0.6
+    domains = rng.integers(0, len(DOMAINS), n)
+    domain_labels = DOMAINS + ["www.reddit.com"]
+    domains[~has_link] = len(DOMAINS)
+    df = pd.DataFrame({
+        "subreddit": distinct_strings(SUBREDDITS, rng.integers(0, len(SUBREDDITS), n)),
+        "author": distinct_strings([f"user_{i}" for i in range(5000)], authors),
+        "url": np.array([f"https://{domain_labels[d]}/article/{i}" for i, d in enumerate(domains.tolist())], dtype=object),
+        "created_utc": 1735689600 + rng.integers(0, 90 * 86400, n),
+        "score": rng.exponential(50, n).astype(np.int64),
+        "num_comments": rng.exponential(20, n).astype(np.int64),
+        "word_count": rng.integers(4, 75, n),
+        "domain": distinct_strings(domain_labels, domains),
+    })
+    df["datetime"] = pd.to_datetime(df["created_utc"], unit="s")
+    return df
+
+
+def memory_mb(df):
+    return {str(k): round(v / 2 ** 20, 1) for k, v in df.memory_usage(deep=True, index=False).items()}
+
+
+def best_of(function, df, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(df)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory and groupby time of object vs compact post columns")
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_BACKEND", "stub")
+    from api.code import domain_trends, subreddit_activity, top_authors
+    from api.new_reddit import author_stats
+    from api.preprocessing import compact_posts
+
+    start = time.perf_counter()
+    plain = synthetic_frame(args.rows)
+    print(f"generated {args.rows} rows in {time.perf_counter() - start:.1f}s", flush=True)
+    start = time.perf_counter()
+    compact = compact_posts(plain)
+    compact_seconds = time.perf_counter() - start
+
+    before, after = memory_mb(plain), memory_mb(compact)
+    memory = {
+        "columns": {column: {"before_mb": before[column], "after_mb": after[column]} for column in before},
+        "before_mb": round(sum(before.values()), 1),
+        "after_mb": round(sum(after.values()), 1),
+        "compact_seconds": round(compact_seconds, 2),
+    }
+    print(json.dumps(memory), flush=True)
+
+    queries = {
+        "top_authors": top_authors,
+        "subreddit_activity": subreddit_activity,
+        "domain_trends": domain_trends,
+        "author_stats": author_stats,
+        "subreddit_by_day": lambda df: df.groupby([df["created_utc"] // 86400, "subreddit"], observed=True).size(),
+    }
+    timings = []
+    for name, query in queries.items():
+        plain_seconds, expected = best_of(query, plain, args.repeat)
+        compact_seconds, result = best_of(query, compact, args.repeat)
+        if isinstance(expected, dict):
+            same = expected == result
+        else:
+            expected, result = expected.copy(), result.copy()
+            for frame in (expected, result):
+                frame.index = frame.index.to_flat_index().astype(object)
+            same = expected.sort_index().astype("float64").equals(result.sort_index().astype("float64"))
+        row = {"query": name, "object_ms": round(plain_seconds * 1000, 1), "compact_ms": round(compact_seconds * 1000, 1),
+               "speedup": round(plain_seconds / compact_seconds, 2), "identical": bool(same)}
+        timings.append(row)
+        print(json.dumps(row), flush=True)
+
+    results = {"rows": args.rows, "memory": memory, "groupby": timings, "peak_rss_mb": round(peak_rss_mb(), 1)}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
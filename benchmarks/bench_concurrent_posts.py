@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import time
+
+from fastapi.testclient import TestClient
+
+from api.rate_limit import TokenBucket
+from benchmarks.fake_praw import FakeReddit
+from benchmarks.harness import load_api
+
+
+def max_requests_in_window(times, window):
+    times = sorted(times)
+    best = 0
+    lo = 0
+    for hi, t in enumerate(times):
+        while t - times[lo] >= window:
+            lo += 1
+        best = max(best, hi - lo + 1)
+    return best
+
+
+def run_mode(code, client, subreddits, limit, concurrent, workers, latency, rate, capacity, failing):
+    fake = FakeReddit(posts_per_subreddit=limit, latency=latency)
+    fake.failing = set(failing)
+    code.reddit = fake
+    code.rate_limiter = TokenBucket(rate, capacity=capacity)
+    archive = os.path.abspath(f"archive_{'concurrent' if concurrent else 'sequential'}.jsonl")
+    for path in (archive, archive + ".db", archive + ".checkpoints.db"):
+        if os.path.exists(path):
+            os.remove(path)
+    code.OUTPUT_FILE = archive
+    # Each mode gets its own seen index and checkpoints, so the second mode
+    # is not stopped short by the first one's newest-post checkpoints.
+    code.seen_index = code.SeenIndex(archive + ".db", archive)
+    code.checkpoints = code.CheckpointStore(archive + ".checkpoints.db")
+
+    start = time.perf_counter()
+    resp = client.post("/posts", json={
+        "subreddits": subreddits, "limit": limit, "concurrent": concurrent, "max_workers": workers,
+    })
+    elapsed = time.perf_counter() - start
+    resp.raise_for_status()
+    body = resp.json()
+    code.seen_index.close()
+    code.checkpoints.close()
+
+    window = 1.0
+    allowed = int(capacity + rate * window)
+    observed = max_requests_in_window(fake.request_times, window)
+    return {
+        "mode": "concurrent" if concurrent else "sequential",
+        "elapsed_s": round(elapsed, 3),
+        "requests": len(fake.request_times),
+        "posts": len(body["posts"]),
+        "errors": body["errors"],
+        "max_requests_per_second": observed,
+        "allowed_per_second": allowed,
+        "quota_ok": observed <= allowed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sequential vs concurrent /posts against a fake PRAW client")
+    parser.add_argument("--subreddits", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake listing request")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=10.0, help="token bucket refill, requests per second")
+    parser.add_argument("--capacity", type=float, default=5.0)
+    parser.add_argument("--fail", default="", help="comma separated subreddits that should error")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    code, _ = load_api()
+    client = TestClient(code.app)
+    subreddits = [f"sub{i}" for i in range(args.subreddits)]
+    failing = [s for s in args.fail.split(",") if s]
+    results = [
+        run_mode(code, client, subreddits + failing, args.limit, concurrent, args.workers,
+                 args.latency, args.rate, args.capacity, failing)
+        for concurrent in (False, True)
+    ]
+    results.append({"speedup": round(results[0]["elapsed_s"] / results[1]["elapsed_s"], 2)})
+    for row in results:
+        print(json.dumps(row))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,85 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from api.sparse_networks import SparseContingency
+from benchmarks.synthetic import DOMAINS, SUBREDDITS
+
+
+def legacy_crossposting(df, min_subs=2):
+    user_subs = df.groupby("author")["subreddit"].nunique()
+    crossover_users = user_subs[user_subs >= min_subs].index.tolist()
+    cross_df = df[df["author"].isin(crossover_users)]
+    return pd.crosstab(cross_df["author"], cross_df["subreddit"])
+
+
+def legacy_domains(df):
+    df = df[df["domain"].notna()]
+    return df.groupby("subreddit")["domain"].value_counts().unstack(fill_value=0)
+
+
+def sparse_crossposting(df, min_subs=2):
+    matrix = SparseContingency.from_frame(df, "author", "subreddit")
+    return matrix.filter_rows(matrix.row_nunique().to_numpy() >= min_subs)
+
+
+def make_frame(posts, seed=0):
+    rng = np.random.default_rng(seed)
+    authors = rng.zipf(1.5, posts) % max(1000, posts // 5)
+    subreddits = np.array(SUBREDDITS + [f"sub_{i}" for i in range(200)])
+    domains = np.array(DOMAINS + [f"site{i}.example" for i in range(2000)])
+    return pd.DataFrame({
+        "author": pd.Series(authors).map("user_{}".format),
+        "subreddit": subreddits[rng.integers(0, len(subreddits), posts)],
+        "domain": domains[rng.integers(0, len(domains), posts)],
+    })
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    result = fn(df)
+    return result, round(time.perf_counter() - start, 3)
+
+
+def sparse_mb(table):
+    m = table.matrix
+    return round((m.data.nbytes + m.indices.nbytes + m.indptr.nbytes) / 2**20, 2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-posting and domain tables: dense crosstab vs sparse CSR")
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--legacy-max", type=int, default=1000000)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = []
+    for posts in (int(s) for s in args.sizes.split(",")):
+        df = make_frame(posts)
+        cross, cross_s = timed(sparse_crossposting, df)
+        domains, domains_s = timed(lambda d: SparseContingency.from_frame(d, "subreddit", "domain"), df)
+        row = {
+            "posts": posts,
+            "crossposting_shape": list(cross.shape),
+            "crossposting_nnz": int(cross.nnz),
+            "sparse_crossposting_s": cross_s,
+            "sparse_crossposting_mb": sparse_mb(cross),
+            "dense_crossposting_mb": round(cross.shape[0] * cross.shape[1] * 8 / 2**20, 2),
+            "sparse_domains_s": domains_s,
+            "sparse_domains_mb": sparse_mb(domains),
+            "dense_domains_mb": round(domains.shape[0] * domains.shape[1] * 8 / 2**20, 2),
+        }
+        if posts <= args.legacy_max:
+            legacy, row["legacy_crossposting_s"] = timed(legacy_crossposting, df)
+            legacy_d, row["legacy_domains_s"] = timed(legacy_domains, df)
+            row["identical"] = bool(
+                (cross.to_dense().values == legacy.values).all() and (domains.to_dense().values == legacy_d.values).all()
+            )
+        results.append(row)
+        print(json.dumps(row))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
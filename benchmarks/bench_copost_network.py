@@ -0,0 +1,77 @@
+import argparse
+import json
+import time
+from collections import Counter
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from api.sparse_networks import build_author_copost_network
+
+
+def legacy_copost_network(df, min_shared_urls=2):
+    url_authors = df.groupby('url')['author'].unique()
+    edge_counter = Counter()
+    for authors in url_authors:
+        for i in range(len(authors)):
+            for j in range(i+1, len(authors)):
+                pair = tuple(sorted((authors[i], authors[j])))
+                edge_counter[pair] += 1
+    G = nx.Graph()
+    for (a1, a2), weight in edge_counter.items():
+        if weight >= min_shared_urls:
+            G.add_edge(a1, a2, weight=weight)
+    return G
+
+
+def make_frame(posts, seed=0):
+    # Heavy-tailed authors and URLs, so popular links are shared by many authors.
+    rng = np.random.default_rng(seed)
+    authors = rng.zipf(1.6, posts) % max(1000, posts // 20)
+    urls = rng.zipf(1.4, posts) % max(1000, posts // 4)
+    return pd.DataFrame({
+        "author": pd.Series(authors).map("user_{}".format),
+        "url": pd.Series(urls).map("https://example.com/a/{}".format),
+    })
+
+
+def same_graph(a, b):
+    if a.number_of_edges() != b.number_of_edges():
+        return False
+    return all(b.has_edge(u, v) and b[u][v]["weight"] == d["weight"] for u, v, d in a.edges(data=True))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Author co-post network: Python pair loops vs sparse product")
+    parser.add_argument("--sizes", default="100000,1000000,10000000")
+    parser.add_argument("--legacy-max", type=int, default=1000000)
+    parser.add_argument("--min-shared-urls", type=int, default=2)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = []
+    for posts in (int(s) for s in args.sizes.split(",")):
+        df = make_frame(posts)
+        start = time.perf_counter()
+        adjacency, _ = build_author_copost_network(df, args.min_shared_urls, return_sparse=True)
+        sparse_s = time.perf_counter() - start
+        start = time.perf_counter()
+        graph = build_author_copost_network(df, args.min_shared_urls)
+        graph_s = time.perf_counter() - start
+        row = {
+            "posts": posts,
+            "edges": int(adjacency.nnz),
+            "sparse_adjacency_s": round(sparse_s, 3),
+            "sparse_to_graph_s": round(graph_s, 3),
+        }
+        if posts <= args.legacy_max:
+            start = time.perf_counter()
+            legacy = legacy_copost_network(df, args.min_shared_urls)
+            row["legacy_s"] = round(time.perf_counter() - start, 3)
+            row["identical"] = same_graph(legacy, graph)
+        results.append(row)
+        print(json.dumps(row))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
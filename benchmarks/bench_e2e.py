@@ -0,0 +1,241 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.harness import REPO_ROOT
+from benchmarks.memory import current_rss_mb, peak_rss_mb
+from benchmarks.synthetic import write_corpus
+
+ASK_INTENTS = {
+    "trending": "What are the top trending topics?",
+    "authors": "Who are the most influential authors?",
+    "subreddits": "Which subreddit community is most active?",
+    "sentiment": "What is the overall sentiment?",
+    "flashpoints": "Were there any flashpoints or spikes?",
+    "domains": "Which domains are shared most?",
+    "controversial": "Show the controversial posts",
+    "narrative": "Give me a narrative summary",
+    "unknown": "Hello there",
+}
+# (metric, True if larger is worse) as checked by --baseline.
+COMPARED = [("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput_rps", False), ("peak_rss_mb", True)]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def timing_stats(cold, latencies, elapsed):
+    # The first call (cold caches, pool start-up, LLM cache miss) is reported
+    # on its own; percentiles and throughput cover the calls after it.
+    return {
+        "requests": len(latencies) + 1,
+        "cold_ms": round(cold * 1000, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        **{f"p{q}_ms": round(percentile(latencies, q) * 1000, 2) for q in (50, 95, 99)},
+    }
+
+
+def timed_calls(call, requests):
+    start = time.perf_counter()
+    call()
+    cold = time.perf_counter() - start
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests - 1):
+        call_start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - call_start)
+    return cold, latencies, time.perf_counter() - start
+
+
+def run_scenario(workdir, scenario, options):
+    # Runs in a fresh process per scenario, so peak RSS belongs to this
+    # endpoint or analytic alone. Worker processes (VADER, charts) are not
+    # included in it.
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["STUB_LLM_LATENCY"] = str(options["llm_latency"])
+    os.environ["LLM_CACHE_FILE"] = os.path.join(workdir, "llm_cache.db")
+    from fastapi.testclient import TestClient
+    from benchmarks.harness import load_api
+    code, _ = load_api(workdir)
+    df, _ = code.current_dataset()
+    loaded_rss = current_rss_mb()
+    client = TestClient(code.app)
+    errors = []
+    kind, name = scenario.split(":", 1)
+
+    if kind == "ask":
+        def call():
+            resp = client.post("/ask", json={"query": ASK_INTENTS[name]})
+            if resp.status_code != 200 or resp.json()["answer"].startswith("Error"):
+                errors.append(resp.text[:200])
+    elif kind == "analytic":
+        function = code.analytics.analytics[name]
+
+        def call():
+            function(df)
+    else:
+        from api.rate_limit import TokenBucket
+        from benchmarks.fake_praw import FakeReddit
+        fake = FakeReddit(posts_per_subreddit=0, latency=options["praw_latency"])
+        code.reddit = fake
+        code.rate_limiter = TokenBucket(1e9, capacity=1e9)
+        subreddits = [f"sub{i}" for i in range(options["subreddits"])]
+
+        def call():
+            # Each request finds `limit` new posts in every subreddit.
+            fake.publish(options["posts_limit"])
+            resp = client.post("/posts", json={"subreddits": subreddits, "limit": options["posts_limit"]})
+            body = resp.json()
+            if resp.status_code != 200 or body["errors"]:
+                errors.append(resp.text[:200])
+            elif len(body["posts"]) != options["posts_limit"] * len(subreddits):
+                errors.append(f"expected {options['posts_limit'] * len(subreddits)} posts, got {len(body['posts'])}")
+
+    cold, latencies, elapsed = timed_calls(call, options["requests"])
+    return {
+        "posts": len(df),
+        "scenario": scenario,
+        **timing_stats(cold, latencies, elapsed),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "loaded_rss_mb": round(loaded_rss, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def analytic_names():
+    import api.code
+    return list(api.code.analytics.analytics)
+
+
+def scenarios(only=None):
+    names = ["posts:fetch"] + [f"ask:{intent}" for intent in ASK_INTENTS]
+    names += [f"analytic:{name}" for name in analytic_names()]
+    if only:
+        names = [name for name in names if any(name.startswith(prefix) for prefix in only)]
+    return names
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(sizes, names, options, seed=0):
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for size in sizes:
+        corpus_dir = tempfile.mkdtemp(prefix="reddit-e2e-corpus-")
+        corpus = write_corpus(os.path.join(corpus_dir, "data.jsonl"), size, seed=seed)
+        for name in names:
+            # Every scenario gets its own copy of the corpus and state files.
+            workdir = tempfile.mkdtemp(prefix="reddit-e2e-")
+            shutil.copy(corpus, os.path.join(workdir, "data.jsonl"))
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                row = pool.submit(run_scenario, workdir, name, options).result()
+            shutil.rmtree(workdir, ignore_errors=True)
+            results.append(row)
+            print(json.dumps(row), flush=True)
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+    return results
+
+
+def compare(baseline, results, tolerance, min_delta_ms):
+    # A metric regresses when it is worse than the baseline by more than
+    # `tolerance` (relative); timing changes under min_delta_ms per request
+    # are noise.
+    previous = {(row["posts"], row["scenario"]): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        old = previous.get((row["posts"], row["scenario"]))
+        if old is None:
+            continue
+        for metric, larger_is_worse in COMPARED:
+            before, after = old.get(metric), row.get(metric)
+            if not before or after is None:
+                continue
+            ratio = after / before
+            worse = ratio > 1 + tolerance if larger_is_worse else ratio < 1 / (1 + tolerance)
+            # Throughput is compared as time per request for the noise floor.
+            if metric.endswith("_ms"):
+                worse = worse and abs(after - before) >= min_delta_ms
+            elif metric == "throughput_rps":
+                worse = worse and abs(1000 / after - 1000 / before) >= min_delta_ms
+            print(f"{row['posts']:>9} {row['scenario']:<32} {metric:<15} {before:>10} -> {after:<10} "
+                  f"x{ratio:.2f}{'  REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append({"posts": row["posts"], "scenario": row["scenario"], "metric": metric,
+                                    "before": before, "after": after})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end /posts, /ask and analytic benchmarks on synthetic corpora")
+    parser.add_argument("--sizes", default="2000,20000", help="comma separated corpus sizes")
+    parser.add_argument("--requests", type=int, default=20, help="calls per scenario, the first one reported as cold")
+    parser.add_argument("--only", default="", help="comma separated scenario prefixes, e.g. ask:,analytic:top_authors")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="stub LLM seconds per uncached prompt")
+    parser.add_argument("--subreddits", type=int, default=5)
+    parser.add_argument("--posts-limit", type=int, default=25)
+    parser.add_argument("--praw-latency", type=float, default=0.0, help="seconds per fake listing request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    parser.add_argument("--results", help="compare this earlier output with --baseline instead of running")
+    parser.add_argument("--baseline", help="earlier --output to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    if args.requests < 2:
+        parser.error("--requests must be at least 2")
+
+    if args.results:
+        with open(args.results) as f:
+            report = json.load(f)
+    else:
+        options = {
+            "requests": args.requests,
+            "llm_latency": args.llm_latency,
+            "subreddits": args.subreddits,
+            "posts_limit": args.posts_limit,
+            "praw_latency": args.praw_latency,
+        }
+        sizes = [int(size) for size in args.sizes.split(",")]
+        names = scenarios([prefix for prefix in args.only.split(",") if prefix])
+        report = {
+            "commit": git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "options": {**options, "sizes": sizes, "seed": args.seed},
+            "results": run_suite(sizes, names, options, args.seed),
+        }
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+
+    failed = [row for row in report["results"] if row["errors"]]
+    for row in failed:
+        print(f"{row['scenario']} at {row['posts']} posts: {row['errors']} errors, first: {row['first_error']}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"comparing {report.get('commit')} against baseline {baseline.get('commit')}")
+        regressions = compare(baseline, report["results"], args.tolerance, args.min_delta_ms)
+        print(f"{len(regressions)} regressions")
+        if regressions:
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,79 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from api.flashpoints import build_detectors
+
+
+def legacy_flashpoints(df):
+    daily_post_counts = df.groupby(pd.to_datetime(df["created_utc"], unit="s").dt.date).size()
+    spikes = daily_post_counts[daily_post_counts > daily_post_counts.mean() + daily_post_counts.std()]
+    return spikes.to_dict()
+
+
+def make_frame(posts, days, spike_day, spike_factor, seed=0):
+    # Steady traffic across 50 subreddits plus one subreddit bursting on spike_day.
+    rng = np.random.default_rng(seed)
+    timestamps = rng.uniform(0, days * 86400, posts)
+    subreddits = rng.choice([f"sub_{i}" for i in range(50)], posts)
+    burst = int(posts / days / 50 * spike_factor)
+    timestamps = np.concatenate([timestamps, spike_day * 86400 + rng.uniform(0, 86400, burst)])
+    subreddits = np.concatenate([subreddits, np.full(burst, "sub_0")])
+    order = np.argsort(timestamps, kind="stable")
+    return pd.DataFrame({"created_utc": timestamps[order], "subreddit": subreddits[order]})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flashpoints: full rescan per arrival vs online detector")
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--spike-factor", type=float, default=8.0)
+    parser.add_argument("--arrivals", type=int, default=2000, help="posts streamed in one at a time")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    spike_day = args.days - 1
+    df = make_frame(args.posts, args.days, spike_day, args.spike_factor)
+    history = df[df["created_utc"] < spike_day * 86400]
+    stream = df[df["created_utc"] >= spike_day * 86400].head(args.arrivals)
+
+    start = time.perf_counter()
+    detectors = build_detectors(history, granularities=("day",))
+    bulk_s = time.perf_counter() - start
+    detector = detectors["day"]
+
+    flagged_after = None
+    latencies = []
+    for i, (subreddit, created_utc) in enumerate(zip(stream["subreddit"].tolist(), stream["created_utc"].tolist())):
+        start = time.perf_counter()
+        detector.add(subreddit, created_utc)
+        latencies.append(time.perf_counter() - start)
+        if flagged_after is None and detector.current("sub_0"):
+            flagged_after = i + 1
+
+    rescan_latencies = []
+    for n in np.linspace(len(history) + 1, len(history) + len(stream), 5).astype(int):
+        start = time.perf_counter()
+        legacy_flashpoints(df.iloc[:n])
+        rescan_latencies.append(time.perf_counter() - start)
+
+    result = {
+        "history_posts": len(history),
+        "streamed_posts": len(stream),
+        "bulk_build_s": round(bulk_s, 3),
+        "online_update_us_mean": round(float(np.mean(latencies)) * 1e6, 2),
+        "online_update_us_p99": round(float(np.percentile(latencies, 99)) * 1e6, 2),
+        "rescan_per_arrival_ms_mean": round(float(np.mean(rescan_latencies)) * 1000, 2),
+        "spike_flagged_after_posts": flagged_after,
+        "hour_and_day_detectors_build_s": None,
+    }
+    start = time.perf_counter()
+    build_detectors(df)
+    result["hour_and_day_detectors_build_s"] = round(time.perf_counter() - start, 3)
+    print(json.dumps(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.harness import REPO_ROOT
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+# Modules api/code.py must not pull in at import time; they belong to warm-up.
+HEAVY_MODULES = ("pandas", "sklearn", "langchain", "google.generativeai", "praw", "pyarrow", "matplotlib", "nltk")
+
+
+def profile_import(module, workdir):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=workdir,
+        env={**os.environ, "PYTHONPATH": REPO_ROOT, "WARMUP_ON_STARTUP": "0"},
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append({"module": name, "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                         "depth": len(indent) // 2})
+    top_level = [r for r in rows if r["depth"] == 0]
+    return {
+        "module": module,
+        "wall_s": round(wall, 3),
+        "import_s": round(sum(r["cumulative_us"] for r in top_level) / 1e6, 3),
+        "heavy_modules_loaded": sorted({
+            heavy for heavy in HEAVY_MODULES for r in rows
+            if r["module"] == heavy or r["module"].startswith(heavy + ".")
+        }),
+        "slowest": sorted(rows, key=lambda r: r["cumulative_us"], reverse=True)[:15],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="-X importtime profile of the API module")
+    parser.add_argument("--module", default="api.code")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", help="previous JSON result to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed fractional slowdown of median import time vs the baseline")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="reddit-importtime-")
+    runs = [profile_import(args.module, workdir) for _ in range(args.runs)]
+    runs.sort(key=lambda r: r["import_s"])
+    result = runs[len(runs) // 2]
+    result["runs"] = [r["import_s"] for r in runs]
+    print(json.dumps({k: v for k, v in result.items() if k != "slowest"}))
+    for row in result["slowest"]:
+        print(f"{row['cumulative_us'] / 1000:10.1f} ms  {row['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    failed = bool(result["heavy_modules_loaded"])
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        limit = baseline["import_s"] * (1 + args.max_regression)
+        print(f"baseline {baseline['import_s']}s, limit {limit:.3f}s, now {result['import_s']}s")
+        failed = failed or result["import_s"] > limit
+    sys.exit(1 if failed else 0)
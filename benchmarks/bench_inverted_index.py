@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from api.inverted_index import InvertedIndex, keyword_mask
+from api.preprocessing import add_derived_columns
+from benchmarks.memory import current_rss_mb
+from benchmarks.synthetic import make_record
+
+KEYWORDS = ["trump", "musk", "tariff", "ukraine", "election", "trade war", '"court ruling" law']
+# Ways a word shows up inside or around longer tokens, where a substring scan
+# and whole-token matching disagree.
+AFFIXES = [("", "ism"), ("", "s"), ("anti", ""), ("", "'s"), ("", "_2025"), ("#", ""), ("", "-led"), ("", "")]
+
+
+def affixed_texts(texts, rng):
+    out = []
+    for text in texts:
+        words = []
+        for word in text.split():
+            prefix, suffix = rng.choice(AFFIXES)
+            word = prefix + word + suffix
+            words.append(word.upper() if rng.random() < 0.1 else word)
+        out.append(" ".join(words))
+    return out
+
+
+def timed(fn, repeats=5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inverted keyword index vs str.contains scans")
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--positions", action="store_true", help="keep token positions for phrase queries")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    df = add_derived_columns(pd.DataFrame([make_record(i, rng) for i in range(args.posts)]))
+    half = len(df) // 2
+
+    rss_before = current_rss_mb()
+    index = InvertedIndex(positions=args.positions)
+    start = time.perf_counter()
+    index.add_documents(df["text"].iloc[:half].tolist())
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    index.add_documents(df["text"].iloc[half:].tolist())
+    append_s = time.perf_counter() - start
+    index_rss_mb = current_rss_mb() - rss_before
+
+    path = os.path.join(tempfile.mkdtemp(), "keyword_index.pkl")
+    start = time.perf_counter()
+    index.save(path)
+    save_s = time.perf_counter() - start
+    start = time.perf_counter()
+    restored = InvertedIndex.load(path)
+    load_s = time.perf_counter() - start
+
+    result = {
+        "posts": len(df),
+        "build_s_first_half": round(build_s, 3),
+        "append_s_second_half": round(append_s, 3),
+        "save_s": round(save_s, 3),
+        "load_s": round(load_s, 3),
+        "positions": args.positions,
+        "index_mb": round(os.path.getsize(path) / 2**20, 1),
+        "index_rss_mb": round(index_rss_mb, 1),
+        "queries": [],
+    }
+    for keyword in KEYWORDS:
+        substring_s, substring_mask = timed(
+            lambda: df["text"].str.contains(keyword.replace('"', ""), case=False, na=False).to_numpy())
+        scan_s, scan_mask = timed(lambda: keyword_mask(df, keyword))
+        index_s, index_mask = timed(lambda: keyword_mask(df, keyword, restored))
+        result["queries"].append({
+            "query": keyword,
+            "substring_scan_ms": round(substring_s * 1000, 3),
+            "token_scan_ms": round(scan_s * 1000, 3),
+            "index_ms": round(index_s * 1000, 3),
+            "substring_matches": int(substring_mask.sum()),
+            "index_matches": int(index_mask.sum()),
+            "scan_agrees": bool(np.array_equal(scan_mask, index_mask)),
+        })
+
+    # The fallback scan and the index must select the same posts when the
+    # keywords also appear inside longer words.
+    sample = df.iloc[:min(len(df), 20000)]
+    tricky = pd.DataFrame({"text": affixed_texts(sample["text"].tolist(), rng)})
+    tricky_index = InvertedIndex(positions=args.positions)
+    tricky_index.add_documents(tricky["text"].tolist())
+    result["affixed_agreement"] = {
+        keyword: bool(np.array_equal(keyword_mask(tricky, keyword), keyword_mask(tricky, keyword, tricky_index)))
+        for keyword in KEYWORDS + ["trumps", "anti", "2025"]
+    }
+    print(json.dumps(result, indent=2))
+    if not all(q["scan_agrees"] for q in result["queries"]) or not all(result["affixed_agreement"].values()):
+        raise SystemExit("keyword scan and index disagree")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
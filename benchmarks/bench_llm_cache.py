@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from api.llm_cache import CachedModel, LLMCache, StubModel
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def run(model, prompts):
+    latencies = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        model.generate_content(prompt)
+        latencies.append(time.perf_counter() - start)
+    return {
+        "total_s": round(sum(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Narrative LLM calls with and without the content-addressed cache")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--distinct-prompts", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub model seconds per call")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    prompts = [f"Narrative for dataset version {rng.randrange(args.distinct_prompts)}" for _ in range(args.calls)]
+    uncached = StubModel(latency=args.latency)
+    before = run(uncached, prompts)
+    with tempfile.TemporaryDirectory() as workdir:
+        cache = LLMCache(os.path.join(workdir, "llm_cache.db"))
+        stub = StubModel(latency=args.latency)
+        after = run(CachedModel(stub, "stub:bench", cache), prompts)
+        stats = cache.stats()
+        cache.close()
+        restarted = LLMCache(os.path.join(workdir, "llm_cache.db"))
+        restart = run(CachedModel(StubModel(latency=args.latency), "stub:bench", restarted), prompts)
+        restarted.close()
+
+    result = {
+        "calls": args.calls,
+        "distinct_prompts": args.distinct_prompts,
+        "stub_latency_s": args.latency,
+        "uncached": {**before, "model_calls": uncached.calls},
+        "cached": {**after, "model_calls": stub.calls, "hits": stats["hits"], "misses": stats["misses"]},
+        "after_restart": restart,
+    }
+    print(json.dumps(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
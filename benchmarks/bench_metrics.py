@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import statistics
+import time
+from contextlib import nullcontext
+
+from fastapi.testclient import TestClient
+
+from api.metrics import profiled, registry, stage
+from benchmarks.harness import load_api
+
+QUERIES = [
+    "What are the top trending topics?",
+    "Who are the most active authors?",
+    "What is the overall sentiment?",
+    "Give me a narrative summary",
+]
+
+
+def per_call_ns(make_context, calls):
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        with make_context():
+            pass
+    return (time.perf_counter_ns() - start) / calls
+
+
+def stage_overhead(calls):
+    # Cost of one `with stage(...)` block around nothing, against an empty
+    # context manager.
+    rows = {}
+    registry.enabled = False
+    rows["baseline_ns"] = per_call_ns(nullcontext, calls)
+    rows["disabled_ns"] = per_call_ns(lambda: stage("bench.noop"), calls)
+    registry.enabled = True
+    rows["enabled_ns"] = per_call_ns(lambda: stage("bench.noop"), calls)
+    with profiled():
+        rows["enabled_profiled_ns"] = per_call_ns(lambda: stage("bench.noop"), calls)
+    return {k: round(v, 1) for k, v in rows.items()}
+
+
+def ask_latency(client, rounds):
+    # Warm /ask requests in three modes, interleaved per round so drift
+    # affects all of them alike.
+    modes = {
+        "disabled": (False, {}),
+        "enabled": (True, {}),
+        "enabled_profiled": (True, {"X-Profile": "1"}),
+    }
+    latencies = {mode: [] for mode in modes}
+    for _ in range(rounds):
+        for mode, (enabled, headers) in modes.items():
+            registry.enabled = enabled
+            for query in QUERIES:
+                start = time.perf_counter()
+                client.post("/ask", json={"query": query}, headers=headers).raise_for_status()
+                latencies[mode].append(time.perf_counter() - start)
+    registry.enabled = True
+    result = {}
+    for mode, values in latencies.items():
+        values.sort()
+        result[mode] = {
+            "requests": len(values),
+            "mean_ms": round(statistics.mean(values) * 1000, 3),
+            "p50_ms": round(values[len(values) // 2] * 1000, 3),
+            "p95_ms": round(values[int(len(values) * 0.95)] * 1000, 3),
+        }
+    base = result["disabled"]["mean_ms"]
+    for mode in ("enabled", "enabled_profiled"):
+        result[mode]["overhead_pct"] = round((result[mode]["mean_ms"] - base) / base * 100, 2)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost of stage instrumentation, disabled vs enabled vs profiled")
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--calls", type=int, default=1000000)
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = {"stage": stage_overhead(args.calls)}
+    print(json.dumps(results["stage"]))
+
+    os.environ["LLM_BACKEND"] = "stub"
+    code, _ = load_api(corpus_size=args.posts)
+    client = TestClient(code.app)
+    for query in QUERIES:
+        client.post("/ask", json={"query": query}).raise_for_status()
+    results["ask"] = ask_latency(client, args.rounds)
+    for mode, row in results["ask"].items():
+        print(json.dumps({"mode": mode, **row}))
+
+    start = time.perf_counter()
+    body = client.get("/metrics").text
+    results["metrics_scrape"] = {"ms": round((time.perf_counter() - start) * 1000, 2), "lines": body.count("\n")}
+    print(json.dumps(results["metrics_scrape"]))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
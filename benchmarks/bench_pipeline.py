@@ -0,0 +1,100 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic import write_corpus
+
+OUTPUTS = ["post_trends.html", "top_subreddits.html", "top_authors.html", "author_network.html",
+           "gemini_summary.txt", "narrative_story_with_examples.txt"]
+
+
+def run(workdir, workers, latency):
+    # One report in a fresh process, so the LLM client and caches start cold.
+    os.chdir(workdir)
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["STUB_LLM_LATENCY"] = str(latency)
+    from api.new_reddit import REPORT_WORKERS, main
+    workers = workers or REPORT_WORKERS
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = main(workers=workers, profile=False)
+    elapsed = time.perf_counter() - start
+    h = hashlib.sha256()
+    for name in OUTPUTS:
+        with open(name, "rb") as f:
+            h.update(f.read())
+    return {
+        "workers": workers,
+        "elapsed_s": round(elapsed, 2),
+        "ran": [r["stage"] for r in records if r["status"] == "ran"],
+        "cached": len([r for r in records if r["status"] == "cached"]),
+        "failed": [r["stage"] for r in records if r["status"] in ("failed", "skipped")],
+        "slowest": sorted(((r["stage"], round(r["seconds"], 2)) for r in records), key=lambda x: -x[1])[:3],
+        "outputs": h.hexdigest()[:16],
+    }
+
+
+def change_scores(path, every=100):
+    # Same posts and text, new scores for one post in `every`.
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    for record in records[::every]:
+        record["score"] += 7
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report from scratch, serial vs parallel, and cached reruns")
+    parser.add_argument("--sizes", default="20000,100000")
+    parser.add_argument("--workers", type=int, help="default: REPORT_WORKERS")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="seconds per stub LLM call")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    root = tempfile.mkdtemp(prefix="reddit-pipeline-")
+    results = []
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            serial_dir, parallel_dir = os.path.join(root, f"serial_{size}"), os.path.join(root, f"parallel_{size}")
+            os.makedirs(serial_dir)
+            os.makedirs(parallel_dir)
+            data = write_corpus(os.path.join(parallel_dir, "reddit_data.jsonl"), size)
+            shutil.copy(data, serial_dir)
+
+            def scenario(name, workdir, workers):
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    row = pool.submit(run, workdir, workers, args.llm_latency).result()
+                row = {"size": size, "scenario": name, **row}
+                results.append(row)
+                print(json.dumps(row), flush=True)
+                return row
+
+            serial = scenario("cold_serial", serial_dir, 1)
+            parallel = scenario("cold_parallel", parallel_dir, args.workers)
+            scenario("unchanged", parallel_dir, args.workers)
+            change_scores(data)
+            scenario("scores_changed", parallel_dir, args.workers)
+            write_corpus(os.path.join(root, "extra.jsonl"), size // 100, seed=1, start=size)
+            with open(os.path.join(root, "extra.jsonl")) as src, open(data, "a") as dst:
+                dst.write(src.read())
+            scenario("posts_added", parallel_dir, args.workers)
+            check = {"size": size, "parallel_speedup": round(serial["elapsed_s"] / parallel["elapsed_s"], 2),
+                     "identical_outputs": serial["outputs"] == parallel["outputs"]}
+            results.append(check)
+            print(json.dumps(check), flush=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_praw import FakeReddit
+from benchmarks.harness import load_api
+from benchmarks.synthetic import write_archive
+
+
+def legacy_seen_ids(path):
+    # The pre-index behaviour: re-read the whole archive to rebuild the id set.
+    seen_ids = set()
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                seen_ids.add(json.loads(line.strip()).get("id"))
+            except json.JSONDecodeError:
+                continue
+    return seen_ids
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def run(sizes, subreddits, limit, repeats, legacy_max):
+    code, workdir = load_api()
+    client = TestClient(code.app)
+    results = []
+    for size in sizes:
+        archive = os.path.join(workdir, f"archive_{size}.jsonl")
+        db_path = archive + ".db"
+        for path in (db_path, db_path + "-wal", db_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        write_archive(archive, size)
+
+        start = time.perf_counter()
+        code.seen_index = code.SeenIndex(db_path, archive)
+        index_build = time.perf_counter() - start
+        code.OUTPUT_FILE = archive
+        code.reddit = FakeReddit(posts_per_subreddit=limit)
+
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            resp = client.post("/posts", json={"subreddits": subreddits, "limit": limit})
+            latencies.append(time.perf_counter() - start)
+            resp.raise_for_status()
+
+        row = {
+            "archive_posts": size,
+            "index_build_s": round(index_build, 3),
+            "posts_p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "posts_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+        if size <= legacy_max:
+            start = time.perf_counter()
+            for _ in subreddits:
+                legacy_seen_ids(archive)
+            row["legacy_rescan_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        results.append(row)
+        print(json.dumps(row))
+        code.seen_index.close()
+        os.remove(archive)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/posts latency against archive size")
+    parser.add_argument("--sizes", default="10000,100000,1000000,10000000")
+    parser.add_argument("--subreddits", default="politics,worldnews,news,technology,economics")
+    parser.add_argument("--limit", type=int, default=25)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--legacy-max", type=int, default=1000000,
+                        help="largest archive to also time the old full-rescan dedupe on")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    results = run([int(s) for s in args.sizes.split(",")], args.subreddits.split(","),
+                  args.limit, args.repeats, args.legacy_max)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
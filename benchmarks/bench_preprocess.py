@@ -0,0 +1,72 @@
+import argparse
+import json
+import random
+import time
+
+import pandas as pd
+
+from api.preprocessing import add_derived_columns
+from benchmarks.synthetic import make_record
+
+
+def legacy_preprocess(df):
+    df = df.copy()
+    df["datetime"] = pd.to_datetime(df["created_utc"], unit='s')
+    df["text"] = df["title"].fillna("") + " " + df["selftext"].fillna("")
+    df["word_count"] = df["text"].apply(lambda x: len(str(x).split()))
+    df["domain"] = df["url"].apply(lambda x: x.split('/')[2] if pd.notna(x) and "http" in x else None)
+    return df
+
+
+def vectorized_preprocess(df):
+    return add_derived_columns(df.copy())
+
+
+def make_frame(rows, seed=0):
+    rng = random.Random(seed)
+    records = [make_record(i, rng) for i in range(rows)]
+    for i, record in enumerate(records):
+        # Cover the awkward inputs: missing text, non-http and missing URLs.
+        if i % 50 == 0:
+            record["selftext"] = None
+        if i % 70 == 0:
+            record["url"] = "self.politics"
+        if i % 90 == 0:
+            record["url"] = None
+    return pd.DataFrame(records)
+
+
+def best_of(fn, df, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rows per second of preprocess(): per-row lambdas vs vectorized")
+    parser.add_argument("--rows", default="10000,100000,1000000")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = []
+    for rows in (int(r) for r in args.rows.split(",")):
+        df = make_frame(rows)
+        legacy_s, legacy = best_of(legacy_preprocess, df, args.repeats)
+        vector_s, vector = best_of(vectorized_preprocess, df, args.repeats)
+        pd.testing.assert_frame_equal(legacy, vector)
+        row = {
+            "rows": rows,
+            "legacy_rows_per_s": round(rows / legacy_s),
+            "vectorized_rows_per_s": round(rows / vector_s),
+            "speedup": round(legacy_s / vector_s, 2),
+            "identical": True,
+        }
+        results.append(row)
+        print(json.dumps(row))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,71 @@
+import argparse
+import json
+import time
+
+
+from api.rollup import build_rollup
+from benchmarks.harness import load_api
+
+
+def timed_ms(fn, repeats=5):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return round((time.perf_counter() - start) / repeats * 1000, 2)
+
+
+def raw_queries(df):
+    # The per-call regrouping the dashboard functions do today.
+    month = df["datetime"].dt.to_period("M")
+    return {
+        "posts_per_day": lambda: df.groupby(df["datetime"].dt.date).size(),
+        "subreddit_activity": lambda: df["subreddit"].value_counts().head(10).to_dict(),
+        "monthly_by_subreddit": lambda: df.groupby([month, "subreddit"], observed=True).agg(
+            posts=("id", "size"), score=("score", "sum"), comments=("num_comments", "sum")),
+        "keyword_monthly": lambda: df[df["text"].str.contains("market", case=False, na=False)].groupby(month).size(),
+    }
+
+
+def cube_queries(cube):
+    return {
+        "posts_per_day": lambda: cube.query("day"),
+        "subreddit_activity": lambda: cube.subreddit_totals(top_n=10),
+        "monthly_by_subreddit": lambda: cube.query("month", by_subreddit=True),
+        "keyword_monthly": lambda: cube.term_series("market", "month"),
+        "monthly_top_terms": lambda: cube.query("month", top_terms=10),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard queries: regrouping raw posts vs the rollup cube")
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--append", type=int, default=500)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    code, _ = load_api(corpus_size=args.posts + args.append)
+    df, _ = code.current_dataset()
+    base, tail = df.iloc[:args.posts], df.iloc[args.posts:]
+
+    start = time.perf_counter()
+    cube = build_rollup(base)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    cube.add(tail)
+    append_ms = (time.perf_counter() - start) * 1000
+
+    raw = {name: timed_ms(fn) for name, fn in raw_queries(df).items()}
+    rolled = {name: timed_ms(fn) for name, fn in cube_queries(cube).items()}
+    result = {
+        "posts": len(df),
+        "cube": cube.stats(),
+        "build_s": round(build_s, 3),
+        "append_ms": round(append_ms, 2),
+        "appended_posts": len(tail),
+        "raw_ms": raw,
+        "rollup_ms": rolled,
+    }
+    print(json.dumps(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from api.preprocessing import add_derived_columns
+from api.sentiment_store import SentimentStore, _score_chunk, ensure_vader_lexicon, score_posts
+from benchmarks.synthetic import make_record
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Row-by-row VADER vs chunked process-pool scoring with a persistent store")
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--new-fraction", type=float, default=0.01, help="share of posts added before the rerun")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    ensure_vader_lexicon()
+    rng = random.Random(0)
+    total = int(args.posts * (1 + args.new_fraction))
+    df = add_derived_columns(pd.DataFrame([make_record(i, rng) for i in range(total)]))
+    first = df.iloc[:args.posts]
+
+    start = time.perf_counter()
+    legacy = first["text"].apply(lambda x: _score_chunk([str(x)])[0])
+    legacy_s = time.perf_counter() - start
+
+    store = SentimentStore(os.path.join(tempfile.mkdtemp(), "sentiment_scores.db"))
+    start = time.perf_counter()
+    cold = score_posts(first, store, workers=args.workers)
+    cold_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    warm = score_posts(df, store, workers=args.workers)
+    warm_s = time.perf_counter() - start
+
+    result = {
+        "posts": args.posts,
+        "workers": args.workers,
+        "row_by_row_s": round(legacy_s, 3),
+        "pool_cold_s": round(cold_s, 3),
+        "rerun_with_new_posts_s": round(warm_s, 3),
+        "new_posts_on_rerun": total - args.posts,
+        "scores_match": bool((legacy.round(6) == cold.round(6)).all() and (warm.iloc[:args.posts].round(6) == cold.round(6)).all()),
+    }
+    print(json.dumps(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,105 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.memory import current_rss_mb, peak_rss_mb
+from benchmarks.synthetic import write_corpus
+
+
+def digest(counts):
+    # Order-independent fingerprint of a label -> count mapping.
+    items = sorted((str(k), int(v)) for k, v in counts.items())
+    return hashlib.sha256(json.dumps(items).encode()).hexdigest()[:16]
+
+
+def run(mode, path, chunk_size):
+    # One mode in a fresh process, so VmHWM is that mode's own peak.
+    os.environ["LLM_BACKEND"] = "stub"
+    import api.new_reddit as nr
+    from api.streaming import stream_analytics
+    baseline_rss = current_rss_mb()
+    start = time.perf_counter()
+    if mode == "in_memory":
+        df = nr.preprocess(nr.load_reddit_data(path))
+        authors = nr.get_top_authors(df, None)
+        subreddits = df["subreddit"].value_counts()
+        links = nr.extract_top_links(df, None)
+        daily = df.groupby(df["datetime"].dt.date).size()
+        spike_day, _ = nr.detect_flashpoints(df)
+        stats = nr.author_stats(df)
+        topics = nr.detect_topics_tfidf(df)
+        posts = len(df)
+    else:
+        aggregates = stream_analytics(path, chunk_size)
+        authors = aggregates.top_authors(None)
+        subreddits = aggregates.subreddit_counts()
+        links = aggregates.top_links(None)
+        daily = aggregates.daily_counts()
+        spike_day, _ = aggregates.flashpoint()
+        stats = aggregates.author_stats()
+        topics = aggregates.topics()
+        posts = aggregates.posts
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "posts": posts,
+        "elapsed_s": round(elapsed, 2),
+        "posts_per_s": round(posts / elapsed),
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "growth_mb": round(peak_rss_mb() - baseline_rss, 1),
+        "check": {
+            "authors": digest(authors),
+            "subreddits": digest(subreddits),
+            "links": digest(links),
+            "daily": digest(daily),
+            "spike_day": str(spike_day),
+            "author_stats": digest(stats["post_count"] * 1000 + stats["subreddits"]),
+            "top_topics": sorted(topics["word"].head(5)),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak memory of the in-memory report analytics vs chunked streaming")
+    parser.add_argument("--sizes", default="100000,300000,900000")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--modes", default="in_memory,streaming")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="reddit-streaming-")
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            path = write_corpus(os.path.join(workdir, f"data_{size}.jsonl"), size)
+            rows = {}
+            for mode in args.modes.split(","):
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    rows[mode] = pool.submit(run, mode, path, args.chunk_size).result()
+                row = {"size": size, "file_mb": round(os.path.getsize(path) / 2 ** 20, 1), **rows[mode]}
+                row.pop("check")
+                results.append(row)
+                print(json.dumps(row), flush=True)
+            if len(rows) == 2:
+                # Top TF-IDF terms are compared loosely: chunked idf drifts by
+                # up to ~0.1%, which can swap near-tied terms.
+                a, b = rows["in_memory"]["check"], rows["streaming"]["check"]
+                exact = {k: a[k] == b[k] for k in a if k != "top_topics"}
+                overlap = len(set(a["top_topics"]) & set(b["top_topics"]))
+                check = {"size": size, "identical": exact, "top5_topic_overlap": overlap}
+                results.append(check)
+                print(json.dumps(check), flush=True)
+            os.remove(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
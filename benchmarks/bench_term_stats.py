@@ -0,0 +1,82 @@
+import argparse
+import json
+import time
+
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from api.term_stats import IncrementalTfidf
+from benchmarks.synthetic import make_record
+
+
+def batch_top_terms(texts, top_n):
+    vectorizer = TfidfVectorizer(stop_words="english", max_features=1000)
+    scores = vectorizer.fit_transform(texts).sum(axis=0).A1
+    words = vectorizer.get_feature_names_out()
+    ranked = pd.DataFrame({"word": words, "score": scores}).sort_values(by="score", ascending=False).head(top_n)
+    return ranked.to_dict(orient="records")
+
+
+def compare(batch, incremental):
+    batch_words = [r["word"] for r in batch]
+    inc_words = [r["word"] for r in incremental]
+    batch_scores = {r["word"]: r["score"] for r in batch}
+    rel_errors = [
+        abs(r["score"] - batch_scores[r["word"]]) / batch_scores[r["word"]]
+        for r in incremental if r["word"] in batch_scores
+    ]
+    return {
+        "top_n_overlap": len(set(batch_words) & set(inc_words)) / len(batch_words),
+        "same_order": batch_words == inc_words,
+        "max_rel_score_error": round(max(rel_errors), 5) if rel_errors else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental TF-IDF vs batch refit")
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--initial", type=float, default=0.5, help="fraction bulk loaded before appending")
+    parser.add_argument("--append-batch", type=int, default=100)
+    parser.add_argument("--top-n", type=int, default=15)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    import random
+    rng = random.Random(0)
+    texts = []
+    for i in range(args.posts):
+        record = make_record(i, rng)
+        texts.append(record["title"] + " " + record["selftext"])
+
+    model = IncrementalTfidf()
+    split = int(len(texts) * args.initial)
+    start = time.perf_counter()
+    model.add_documents(texts[:split])
+    bulk_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(split, len(texts), args.append_batch):
+        model.add_documents(texts[i:i + args.append_batch])
+    append_s = time.perf_counter() - start
+    appended = len(texts) - split
+
+    start = time.perf_counter()
+    incremental = model.top_terms(args.top_n)
+    query_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = batch_top_terms(texts, args.top_n)
+    refit_s = time.perf_counter() - start
+
+    result = {
+        "posts": args.posts,
+        "bulk_load_s": round(bulk_s, 3),
+        "append_us_per_post": round(append_s / max(1, appended) * 1e6, 2),
+        "top_terms_query_ms": round(query_s * 1000, 3),
+        "batch_refit_s": round(refit_s, 3),
+        **compare(batch, incremental),
+    }
+    print(json.dumps(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.memory import current_rss_mb, peak_rss_mb
+from benchmarks.synthetic import make_archive_post, make_record
+
+
+def percentiles_ms(times):
+    times = np.asarray(times) * 1000
+    return {"p50_ms": round(float(np.percentile(times, 50)), 3), "p95_ms": round(float(np.percentile(times, 95)), 3)}
+
+
+def timed_queries(search, queries):
+    times, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        times.append(time.perf_counter() - start)
+    return times, results
+
+
+def recall(approx, exact):
+    # Share of the exact top-k ids the approximate search also returned.
+    hits = total = 0
+    for a, e in zip(approx, exact):
+        expected = {meta["id"] for _, meta in e}
+        hits += len(expected & {meta["id"] for _, meta in a})
+        total += len(expected)
+    return round(hits / total, 3) if total else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector index build, search latency and recall, inserts and save/load")
+    parser.add_argument("--sizes", default="20000,200000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="4,16,64")
+    parser.add_argument("--batch", type=int, default=100, help="posts per insert, about one /posts call")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    from api.vector_index import build_vector_index, post_texts, VectorIndex
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        rng = random.Random(0)
+        posts = pd.DataFrame([make_record(i, rng) for i in range(size)])
+        # Questions made from the start of random titles, as a user might phrase them.
+        queries = [" ".join(title.split()[:4]) for title in posts["title"].sample(args.queries, random_state=1)]
+        row = {"posts": size}
+
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        index = build_vector_index(posts)
+        row["build"] = {"seconds": round(time.perf_counter() - start, 3), **index.stats(),
+                        "rss_growth_mb": round(current_rss_mb() - rss_before, 1), "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+        exact_times, exact = timed_queries(lambda q: index.search(q, args.k, exact=True), queries)
+        row["search"] = {"exact": percentiles_ms(exact_times)}
+        for nprobe in (int(n) for n in args.nprobe.split(",")):
+            times, found = timed_queries(lambda q: index.search(q, args.k, nprobe=nprobe), queries)
+            row["search"][f"ivf_nprobe_{nprobe}"] = {**percentiles_ms(times), f"recall@{args.k}": recall(found, exact)}
+
+        # The keyword path /ask had before: a case-insensitive scan of every post.
+        text = post_texts(posts)
+        keyword_times, _ = timed_queries(lambda q: np.flatnonzero(text.str.contains(q.split()[0], case=False, na=False)),
+                                         queries[:20])
+        row["search"]["keyword_scan"] = percentiles_ms(keyword_times)
+
+        batches = [pd.DataFrame([make_archive_post(size + b * args.batch + i, rng) for i in range(args.batch)])
+                   for b in range(20)]
+        start = time.perf_counter()
+        for batch in batches:
+            index.add(batch)
+        elapsed = time.perf_counter() - start
+        row["insert"] = {"batch": args.batch, "batches": len(batches), "posts_per_s": round(len(batches) * args.batch / elapsed),
+                         "ms_per_batch": round(elapsed / len(batches) * 1000, 2)}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "vector_index.pkl")
+            start = time.perf_counter()
+            index.save(path)
+            save_s = time.perf_counter() - start
+            start = time.perf_counter()
+            loaded = VectorIndex.load(path)
+            load_s = time.perf_counter() - start
+            row["persist"] = {"save_s": round(save_s, 3), "load_s": round(load_s, 3),
+                              "file_mb": round(os.path.getsize(path) / 2 ** 20, 1),
+                              "identical": loaded.search(queries[0], args.k) == index.search(queries[0], args.k)}
+        del index, loaded
+        results.append(row)
+        print(json.dumps(row), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
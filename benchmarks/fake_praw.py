@@ -0,0 +1,79 @@
+import time
+from types import SimpleNamespace
+
+
+class FakeSubmission:
+    def __init__(self, subreddit, post_id, created_utc, index):
+        self.id = post_id
+        self.name = f"t3_{post_id}"
+        self.subreddit = SimpleNamespace(display_name=subreddit)
+        self.author = f"author_{index % 97}"
+        self.title = f"Post {index} in r/{subreddit} about the economy"
+        self.selftext = "Some body text for the fake submission."
+        self.created_utc = created_utc
+        self.score = index % 300
+        self.ups = self.score
+        self.downs = 0
+        self.num_comments = index % 40
+        self.url = f"https://example.com/{subreddit}/{post_id}"
+        self.permalink = f"/r/{subreddit}/comments/{post_id}/"
+
+
+class FakeSubreddit:
+    def __init__(self, client, name):
+        self.client = client
+        self.display_name = name
+
+    def new(self, limit=100, params=None):
+        return self.client.listing(self.display_name, limit, params or {})
+
+
+class FakeReddit:
+    # Stands in for praw.Reddit. Each subreddit has `posts_per_subreddit` posts,
+    # newest first, and every listing page of `page_size` items costs `latency` seconds.
+    # Post numbers grow with age rank reversed, so publish() adds newer posts on top.
+    def __init__(self, posts_per_subreddit=1000, latency=0.0, page_size=100):
+        self.posts_per_subreddit = posts_per_subreddit
+        self.latency = latency
+        self.page_size = page_size
+        self.request_times = []
+        self.failing = set()
+
+    def publish(self, count):
+        self.posts_per_subreddit += count
+
+    def subreddit(self, name):
+        return FakeSubreddit(self, name)
+
+    def _post_id(self, name, index):
+        return f"{name.lower()}_{self.posts_per_subreddit - index:07d}"
+
+    def _page(self, name, start):
+        self.request_times.append(time.monotonic())
+        if self.latency:
+            time.sleep(self.latency)
+        if name in self.failing:
+            raise RuntimeError(f"received 404 HTTP response for r/{name}")
+        end = min(start + self.page_size, self.posts_per_subreddit)
+        now = 1735689600 + self.posts_per_subreddit * 60
+        return [
+            FakeSubmission(name, self._post_id(name, i), now - i * 60, self.posts_per_subreddit - i)
+            for i in range(start, end)
+        ]
+
+    def _index_of(self, name, fullname):
+        return self.posts_per_subreddit - int(fullname.rsplit("_", 1)[1])
+
+    def listing(self, name, limit, params=None):
+        params = params or {}
+        limit = self.posts_per_subreddit if limit is None else limit
+        produced = 0
+        start = self._index_of(name, params["after"]) + 1 if params.get("after") else 0
+        while produced < limit and start < self.posts_per_subreddit:
+            page = self._page(name, start)
+            start += len(page)
+            for post in page:
+                if produced >= limit:
+                    return
+                produced += 1
+                yield post
@@ -0,0 +1,39 @@
+import importlib
+import os
+import sys
+import socket
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import write_corpus
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_api(workdir=None, corpus_size=2000, seed=0):
+    # api/code.py reads its data files relative to the working directory, so the
+    # app is imported from inside a scratch directory holding a synthetic corpus.
+    workdir = workdir or tempfile.mkdtemp(prefix="reddit-bench-")
+    if not os.path.exists(os.path.join(workdir, "data.jsonl")):
+        write_corpus(os.path.join(workdir, "data.jsonl"), corpus_size, seed=seed)
+    os.chdir(workdir)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    if "api.code" in sys.modules:
+        return importlib.reload(sys.modules["api.code"]), workdir
+    return importlib.import_module("api.code"), workdir
+
+
+def serve(app, host="127.0.0.1"):
+    # Runs the app under a real uvicorn server in a background thread. The
+    # in-process TestClient buffers whole responses, which hides streaming.
+    import uvicorn
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://{host}:{port}"
@@ -0,0 +1,84 @@
+import json
+import random
+
+SUBREDDITS = [
+    "politics", "worldnews", "news", "Conservative", "Liberal", "technology",
+    "economics", "science", "europe", "AskReddit", "moderatepolitics", "neoliberal",
+]
+DOMAINS = [
+    "reuters.com", "apnews.com", "bbc.co.uk", "nytimes.com", "foxnews.com", "cnn.com",
+    "theguardian.com", "i.redd.it", "youtube.com", "twitter.com", "substack.com",
+]
+WORDS = (
+    "trump musk election vote tariff economy market china russia ukraine war court "
+    "policy climate energy tesla twitter government budget congress senate border "
+    "inflation jobs strike protest media debate campaign poll ai tech data privacy "
+    "law ruling bill tax health vaccine crisis deal trade rally speech report"
+).split()
+
+
+def _base36(n):
+    chars = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = chars[r] + out
+        if n == 0:
+            return out
+
+
+def post_id(i):
+    return _base36(36 ** 5 + i)
+
+
+def _sentence(rng, lo, hi):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(lo, hi)))
+
+
+def make_record(i, rng, start_utc=1735689600, span_seconds=90 * 86400):
+    has_link = rng.random() < 0.6
+    return {
+        "id": post_id(i),
+        "subreddit": rng.choice(SUBREDDITS),
+        "author": f"user_{int(rng.paretovariate(1.2)) % 5000}",
+        "title": _sentence(rng, 4, 14),
+        "selftext": "" if has_link else _sentence(rng, 0, 60),
+        "url": f"https://{rng.choice(DOMAINS)}/article/{i}" if has_link else f"https://www.reddit.com/r/x/comments/{post_id(i)}/",
+        "created_utc": start_utc + rng.randrange(span_seconds),
+        "score": int(rng.expovariate(1 / 50)),
+        "num_comments": int(rng.expovariate(1 / 20)),
+    }
+
+
+def make_archive_post(i, rng):
+    record = make_record(i, rng)
+    return {
+        "id": record["id"],
+        "subreddit": record["subreddit"],
+        "author": record["author"],
+        "title": record["title"],
+        "date": record["created_utc"] * 1000,
+        "score": record["score"],
+        "ups": record["score"],
+        "downs": 0,
+        "num_comments": record["num_comments"],
+        "url": record["url"],
+        "permalink": f"/r/{record['subreddit']}/comments/{record['id']}/",
+        "word_count": len(record["title"].split()) + len(record["selftext"].split()),
+    }
+
+
+def write_corpus(path, n, seed=0, start=0):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for i in range(start, start + n):
+            f.write(json.dumps(make_record(i, rng)) + "\n")
+    return path
+
+
+def write_archive(path, n, seed=0, start=0):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for i in range(start, start + n):
+            f.write(json.dumps(make_archive_post(i, rng)) + "\n")
+    return path